@@ -0,0 +1,19 @@
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .api import FileResult, Session, Violation
+
+__all__ = [
+    "FileResult",
+    "Session",
+    "Violation",
+]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported lazily, so that the command line does not import the API.
+    if name in __all__:
+        from . import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,134 @@
+import ast
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Union
+
+from .detector import _IllegalImportDetected, _ImportCollector
+from .dist_index import _DistIndex
+from .engine import (
+    DEFAULT_ENGINE,
+    _check_files,
+    _errs_of_indices,
+    _illegal_indices,
+    _is_under,
+    _normalize_path,
+    _requires_full_scan,
+    _Target,
+    _targets,
+    _targets_of_paths,
+)
+from .pyproject import SCOPE_MAIN, _PyProject
+
+__all__ = [
+    "FileResult",
+    "Session",
+    "Violation",
+]
+
+
+class Violation(NamedTuple):
+    """
+    An import of a module not in dependencies.
+    """
+
+    path: Path
+    lineno: int
+    line: str
+    module: str
+
+
+class FileResult(NamedTuple):
+    path: Path
+    violations: List[Violation]
+
+    @property
+    def ok(self) -> bool:
+        return len(self.violations) == 0
+
+
+def _violation(e: _IllegalImportDetected) -> Violation:
+    return Violation(e._path, e._lineno, e._line, e._module)
+
+
+class Session:
+    """
+    Check files of a project in the same process.
+
+    `pyproject.toml` is loaded and distributions are resolved on the first check, and reused by later checks.  Call
+    `reload()` after changing `pyproject.toml` or installed distributions.
+
+    Paths are relative to the current directory, as in the command line.  Errors are raised as exceptions.
+    """
+
+    _root: Path
+    _jobs: int
+    _engine: str
+    _index: Optional[_DistIndex]
+    _pyproject: Optional[_PyProject]
+    _scope_to_module_to_proj: Optional[dict[str, dict[str, str]]]  # type: ignore  # reason: dict
+
+    def __init__(
+        self, root: Union[str, Path] = ".", jobs: int = 1, engine: str = DEFAULT_ENGINE, index: Optional[_DistIndex] = None
+    ) -> None:
+        self._root = Path(root)
+        self._jobs = jobs
+        self._engine = engine
+        self._index = index
+        self._pyproject = None
+        self._scope_to_module_to_proj = None
+
+    def reload(self) -> None:
+        self._pyproject = None
+        self._scope_to_module_to_proj = None
+
+    def _load(self) -> None:
+        if self._pyproject is not None:
+            return
+
+        pyproject = _PyProject.load(self._root)
+        if pyproject.is_err():
+            raise pyproject.unwrap_err()
+        scope_to_module_to_proj = pyproject.unwrap().load_scope_module_to_proj(self._index)
+        if scope_to_module_to_proj.is_err():
+            raise scope_to_module_to_proj.unwrap_err()
+        self._pyproject = pyproject.unwrap()
+        self._scope_to_module_to_proj = scope_to_module_to_proj.unwrap()
+
+    def check_paths(self, paths: Optional[Iterable[Union[str, Path]]] = None) -> List[FileResult]:
+        """
+        Check the files, or all files if `paths` is `None`.  Files out of target directories or ignored are skipped.
+        """
+        self._load()
+        assert self._pyproject is not None and self._scope_to_module_to_proj is not None
+
+        scopes = list(self._scope_to_module_to_proj.keys())
+        paths_ = None if paths is None else [Path(path) for path in paths]
+        if (paths_ is None) or _requires_full_scan(self._pyproject, paths_):
+            targets: Iterable[_Target] = _targets(self._pyproject, scopes)
+        else:
+            targets = _targets_of_paths(self._pyproject, scopes, paths_)
+        xs = _check_files(self._scope_to_module_to_proj, targets, self._jobs, None, self._engine)
+        if xs.is_err():
+            raise xs.unwrap_err()
+        return [FileResult(path, [_violation(e) for e in es]) for (path, es) in xs.unwrap()]
+
+    def check_source(self, path: Union[str, Path], text: str) -> List[Violation]:
+        """
+        Check `text` as the content of `path`, e.g. an unsaved buffer of an editor.  The file need not exist.
+
+        `path` decides the scopes to check against.  Paths out of target directories are checked against the main scope.
+        """
+        self._load()
+        assert self._pyproject is not None and self._scope_to_module_to_proj is not None
+
+        path_ = _normalize_path(Path(path))
+        # fmt: off
+        scopes = [scope
+                  for scope in self._scope_to_module_to_proj.keys()
+                  if any(_is_under(path_, dir_) for dir_ in self._pyproject.scope_target_dirs(scope))] or [SCOPE_MAIN]
+        text = text.replace("\r\n", "\n")
+        imports = _ImportCollector(ast.parse(text, str(path_))).collect()
+        # fmt: off
+        scope_to_indices = dict((scope, _illegal_indices(self._scope_to_module_to_proj[scope], imports))
+                                for scope in scopes)
+        errs = _errs_of_indices(self._scope_to_module_to_proj, scope_to_indices, path_, imports, text.split("\n"))
+        return [_violation(e) for e in errs]
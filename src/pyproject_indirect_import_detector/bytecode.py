@@ -0,0 +1,190 @@
+import logging as _logging
+
+# noqa idiom
+if True:
+    logger = _logging.getLogger(__name__)
+    logger.addHandler(_logging.NullHandler())
+
+
+import marshal
+import re
+from pathlib import Path
+from types import CodeType
+from typing import List, Optional, Tuple
+
+from .detector import _extract_bytes, _Import
+from .profiling import _phase
+from .reader import _BOM, _normalize_newlines
+
+# Lines which may start an import statement.  The compiler drops imports in dead code, e.g. under `if False:`, which `ast`
+# reports, so bytecode is used only if it has an import on each of these lines.  Strings and comments may match too, which
+# only makes it fall back.
+_IMPORT_LINE = re.compile(rb"(?:^|[;:])[ \t]*(?:import[ \t\\]|from[ \t.]*[\w.]*[ \t]*(?:import\b|\\))", re.MULTILINE)
+
+# Flags of the header of `.pyc`, as PEP 552.
+_FLAG_HASH_BASED = 0b01
+_HEADER_SIZE = 16
+
+
+class _CannotUseBytecode(Exception):
+    pass
+
+
+def _read_fresh_pyc(path: Path, data: bytes) -> Optional[bytes]:
+    """
+    The marshalled code in `__pycache__` of the source, if it is compiled from `data` by this python.  `None` if missing or
+    stale.  Timestamp-based ones are checked by the mtime and the size of the source, and hash-based ones by the hash of
+    `data`, whether or not they are marked to be checked.
+    """
+    # Imported lazily.  Only for the engine.
+    import importlib.util
+
+    try:
+        pyc = importlib.util.cache_from_source(str(path), optimization="")
+        with open(pyc, "rb") as f:
+            b = f.read()
+    except (OSError, NotImplementedError):
+        return None
+
+    if len(b) < _HEADER_SIZE or b[:4] != importlib.util.MAGIC_NUMBER:
+        return None
+    flags = int.from_bytes(b[4:8], "little")
+    if flags & _FLAG_HASH_BASED:
+        if b[8:16] != importlib.util.source_hash(data):
+            return None
+    else:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        mtime = int.from_bytes(b[8:12], "little")
+        size = int.from_bytes(b[12:16], "little")
+        if (mtime, size) != (int(st.st_mtime) & 0xFFFFFFFF, st.st_size & 0xFFFFFFFF):
+            return None
+    return b[_HEADER_SIZE:]
+
+
+def _arg(code: bytes, i: int, extended_arg: int) -> Tuple[int, int]:
+    """
+    The argument of the instruction at `i` with its `EXTENDED_ARG` prefixes, and the offset of the instruction before it.
+    """
+    arg = code[i + 1]
+    shift = 8
+    i -= 2
+    while i >= 0 and code[i] == extended_arg:
+        arg |= code[i + 1] << shift
+        shift += 8
+        i -= 2
+    return (arg, i)
+
+
+def _import_names(code: CodeType) -> List[Tuple[int, str, int, Tuple[str, ...]]]:
+    """
+    `IMPORT_NAME`s of a code object, not nested ones, as `(index of the instruction, name, level, fromlist)`.  `fromlist` is
+    empty for `import` and `*`.
+    """
+    # Imported lazily.  Only for the engine.
+    import opcode
+
+    import_name = opcode.opmap["IMPORT_NAME"]
+    load_const = opcode.opmap["LOAD_CONST"]
+    # Since python 3.14, small ints are not constants.
+    load_small_int = opcode.opmap.get("LOAD_SMALL_INT")
+    extended_arg = opcode.EXTENDED_ARG
+
+    ret = []
+    co_code = code.co_code
+    i = co_code.find(import_name)
+    while i != -1:
+        # Arguments may have the same value.
+        if i % 2 == 0:
+            # `LOAD_CONST level`, `LOAD_CONST fromlist`, then `IMPORT_NAME name`.
+            (name_arg, fromlist_i) = _arg(co_code, i, extended_arg)
+            if fromlist_i < 0 or co_code[fromlist_i] != load_const:
+                raise _CannotUseBytecode("unexpected instructions before IMPORT_NAME")
+            (fromlist_arg, level_i) = _arg(co_code, fromlist_i, extended_arg)
+            if level_i < 0:
+                raise _CannotUseBytecode("unexpected instructions before IMPORT_NAME")
+            (level_arg, _) = _arg(co_code, level_i, extended_arg)
+            if co_code[level_i] == load_const:
+                level = code.co_consts[level_arg]
+            elif co_code[level_i] == load_small_int:
+                level = level_arg
+            else:
+                raise _CannotUseBytecode("unexpected instructions before IMPORT_NAME")
+            fromlist = code.co_consts[fromlist_arg]
+            if fromlist is None:
+                fromlist = ()
+            elif not isinstance(fromlist, tuple):
+                raise _CannotUseBytecode("unexpected fromlist of IMPORT_NAME")
+            ret.append((i // 2, code.co_names[name_arg], level, tuple(x for x in fromlist if x != "*")))
+        i = co_code.find(import_name, i + 1)
+    return ret
+
+
+def _imports_of_code(code: CodeType) -> List[_Import]:
+    """
+    Imports in a code object and nested ones, in the same order as `ast`.
+
+    Statements with an import are located by `co_positions()`, which gives the span of the statement to its instructions.
+    """
+    if not hasattr(code, "co_positions"):
+        raise _CannotUseBytecode("no positions of instructions before python 3.11")
+
+    # (lineno, col_offset, end_lineno, end_col_offset, name, level, fromlist)
+    found: List[Tuple[int, int, int, int, str, int, Tuple[str, ...]]] = []
+    stack = [code]
+    while len(stack) != 0:
+        co = stack.pop()
+        names = _import_names(co)
+        if len(names) != 0:
+            positions = list(co.co_positions())
+            for (i, name, level, fromlist) in names:
+                (lineno, end_lineno, col_offset, end_col_offset) = positions[i]
+                if lineno is None or end_lineno is None or col_offset is None or end_col_offset is None:
+                    raise _CannotUseBytecode("no position of import, e.g. by `-X no_debug_ranges`")
+                found.append((lineno, col_offset, end_lineno, end_col_offset, name, level, fromlist))
+        stack += [x for x in co.co_consts if isinstance(x, CodeType)]
+
+    # E.g. imports in `finally:` are compiled for both normal and exceptional paths.  `import a, a` is also one.
+    if len(set(found)) != len(found):
+        raise _CannotUseBytecode("duplicated import")
+    # Statements in the order of source.  Names of a statement keep their order, as the sort is stable.
+    found.sort(key=lambda x: (x[0], x[1]))
+    # fmt: off
+    return [_Import(lineno, col_offset, end_lineno, end_col_offset, "." * level + name, fromlist)
+            for (lineno, col_offset, end_lineno, end_col_offset, name, level, fromlist) in found]
+
+
+def _check_no_dead_import(data: bytes, imports: List[_Import]) -> None:
+    """
+    Raises `_CannotUseBytecode` if a line may start an import not in `imports`.  `data` has newlines normalized.
+    """
+    linenos = set(imp.lineno for imp in imports)
+    (pos, lineno) = (0, 1)
+    for m in _IMPORT_LINE.finditer(data):
+        lineno += data.count(b"\n", pos, m.start())
+        pos = m.start()
+        if lineno not in linenos:
+            raise _CannotUseBytecode(f"line {lineno} may have an import dropped by the compiler")
+
+
+def _extract_file_by_bytecode(path: Path, data: bytes) -> List[_Import]:
+    """
+    Same as `_extract_file()`, but reads imports from the fresh `.pyc` in `__pycache__` without parsing the source, e.g. when
+    tests were just run.  Falls back to `ast.parse()` if there is no fresh one, or it cannot tell the same imports as `ast`.
+    """
+    with _phase("read"):
+        marshalled = _read_fresh_pyc(path, data)
+    if marshalled is None:
+        return _extract_bytes(data)
+
+    try:
+        with _phase("bytecode"):
+            code = marshal.loads(marshalled)
+            imports = _imports_of_code(code)
+            _check_no_dead_import(_normalize_newlines(data[len(_BOM) :] if data.startswith(_BOM) else data), imports)
+            return imports
+    except (_CannotUseBytecode, ValueError, EOFError, TypeError, IndexError) as err:
+        logger.debug(f"{path}: falling back to ast: {err}")
+        return _extract_bytes(data)
@@ -0,0 +1,207 @@
+import logging as _logging
+
+# noqa idiom
+if True:
+    logger = _logging.getLogger(__name__)
+    logger.addHandler(_logging.NullHandler())
+
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional
+
+from .detector import _Import
+
+# Bump this if the format of entries or the semantics of `_Import` change.
+_CACHE_VERSION = 3
+_CACHE_FILE_NAME = "files.json"
+_DEFAULT_MAX_ENTRIES = 100_000
+# Number of `module_to_proj` fingerprints kept per file.  A file is usually checked in one scope, so it is small.
+_MAX_VERDICTS_PER_ENTRY = 4
+
+
+def _fingerprint(module_to_proj: dict[str, str]) -> str:  # type: ignore  # reason: dict
+    """
+    Fingerprint of a resolved `module_to_proj` map.  Verdicts are valid only for the same fingerprint.
+    """
+    h = hashlib.sha256()
+    for (m, p) in sorted(module_to_proj.items()):
+        h.update(m.encode())
+        h.update(b"\0")
+        h.update(p.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _stat_key(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _imports_of_entry(entry: dict[str, Any]) -> List[_Import]:  # type: ignore  # reason: dict
+    # JSON has no tuple.
+    # fmt: off
+    return [_Import(lineno, col_offset, end_lineno, end_col_offset, module, tuple(names))
+            for (lineno, col_offset, end_lineno, end_col_offset, module, names) in entry["imports"]]
+
+
+class _FileCache:
+    """
+    On-disk cache of imports extracted from each file and of verdicts for each `module_to_proj`.
+
+    Entries are valid while `(mtime, size, inode)` of files is unchanged.  Content hashes of the bytes parsed are kept, so that
+    verdicts survive a change of stat alone.
+    """
+
+    _dir: Path
+    _max_entries: int
+    _entries: dict[str, dict[str, Any]]  # type: ignore  # reason: dict
+    _generation: int
+    # Stat taken by `lookup_imports()` before reading, used by `store_imports()`.
+    _pending: dict[str, Optional[List[int]]]  # type: ignore  # reason: dict
+    _seen: set[str]  # type: ignore  # reason: set
+    hits: int
+    misses: int
+    verdict_hits: int
+    verdict_misses: int
+
+    def __init__(self, dir_: Path, max_entries: int = _DEFAULT_MAX_ENTRIES) -> None:
+        self._dir = dir_
+        self._max_entries = max_entries
+        self._entries = {}
+        self._generation = 0
+        self._pending = {}
+        self._seen = set()
+        self.hits = 0
+        self.misses = 0
+        self.verdict_hits = 0
+        self.verdict_misses = 0
+
+    @classmethod
+    def load(cls, dir_: Path, max_entries: int = _DEFAULT_MAX_ENTRIES) -> "_FileCache":
+        this = cls(dir_, max_entries)
+        path = dir_ / _CACHE_FILE_NAME
+        try:
+            with open(path, "r") as f:
+                t = json.load(f)
+        except FileNotFoundError:
+            return this
+        except (OSError, ValueError) as err:
+            logger.warning(f"ignoring broken cache {path}: {err}")
+            return this
+
+        if not isinstance(t, dict) or t.get("version") != _CACHE_VERSION:
+            return this
+        this._entries = t["entries"]
+        this._generation = t["generation"] + 1
+        return this
+
+    def lookup_imports(self, path: Path) -> Optional[List[_Import]]:
+        """
+        Returns cached imports of `path` if its stat is unchanged.  On a miss, the caller reads and parses the file, and passes
+        the hash of the bytes it read to `store_imports()`, so that the file is read once.
+        """
+        key = str(path)
+        self._seen.add(key)
+        # Take stat before reading, so that a modification during this run is detected next time.
+        stat = _stat_key(path)
+        entry = self._entries.get(key)
+        if entry is not None and stat is not None and entry["stat"] == stat:
+            self.hits += 1
+            entry["used"] = self._generation
+            return _imports_of_entry(entry)
+
+        self.misses += 1
+        self._pending[key] = stat
+        return None
+
+    def store_imports(self, path: Path, imports: List[_Import], h: str) -> None:
+        """
+        `h` is `_content_hash()` of the bytes `imports` were extracted from.
+        """
+        key = str(path)
+        stat = self._pending.pop(key)
+        entry = self._entries.get(key)
+        # Verdicts depend only on imports.  Keep them if the content is unchanged, e.g. the file is only touched.
+        verdicts = entry["verdicts"] if (entry is not None) and (entry["hash"] == h) else {}
+        self._entries[key] = {
+            "stat": stat,
+            "hash": h,
+            "imports": [list(imp) for imp in imports],
+            "verdicts": verdicts,
+            "used": self._generation,
+        }
+
+    def lookup_verdict(self, path: Path, fingerprint: str) -> Optional[List[int]]:
+        """
+        Returns indices of illegal imports in the cached imports of `path`.
+        """
+        entry = self._entries.get(str(path))
+        verdict = None if entry is None else entry["verdicts"].get(fingerprint)
+        if verdict is None:
+            self.verdict_misses += 1
+        else:
+            self.verdict_hits += 1
+        return verdict
+
+    def store_verdict(self, path: Path, fingerprint: str, indices: List[int]) -> None:
+        entry = self._entries.get(str(path))
+        if entry is None:
+            return
+        verdicts = entry["verdicts"]
+        verdicts.pop(fingerprint, None)
+        verdicts[fingerprint] = indices
+        # Dicts keep insertion order.  Drop the oldest ones.
+        while len(verdicts) > _MAX_VERDICTS_PER_ENTRY:
+            del verdicts[next(iter(verdicts))]
+
+    def _evict(self) -> None:
+        # Entries for deleted files.
+        # fmt: off
+        deleted = [key
+                   for key in self._entries
+                   if (key not in self._seen) and (not Path(key).exists())]
+        for key in deleted:
+            del self._entries[key]
+
+        # Least recently used entries beyond the cap.
+        n = len(self._entries) - self._max_entries
+        if n > 0:
+            keys = sorted(self._entries, key=lambda key: self._entries[key]["used"])[:n]
+            for key in keys:
+                del self._entries[key]
+
+    def save(self) -> None:
+        self._evict()
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        t = {
+            "version": _CACHE_VERSION,
+            "generation": self._generation,
+            "entries": self._entries,
+        }
+        # Write atomically, so that concurrent runs never see a half-written file.
+        (fd, tmp) = tempfile.mkstemp(dir=self._dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(t, f, separators=(",", ":"))
+            os.replace(tmp, self._dir / _CACHE_FILE_NAME)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def stats(self) -> str:
+        return (
+            f"Cache: {self.hits} hits, {self.misses} misses"
+            f" (verdicts: {self.verdict_hits} hits, {self.verdict_misses} misses)"
+        )
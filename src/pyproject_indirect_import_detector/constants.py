@@ -0,0 +1,5 @@
+from pathlib import Path
+
+# Here rather than in `cache` and `daemon`, so that the command line imports them only when they are used.
+DEFAULT_CACHE_DIR = Path(".indirect-import-cache")
+DEFAULT_SOCKET_PATH = DEFAULT_CACHE_DIR / "daemon.sock"
@@ -0,0 +1,500 @@
+import logging as _logging
+
+# noqa idiom
+if True:
+    logger = _logging.getLogger(__name__)
+    logger.addHandler(_logging.NullHandler())
+
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, List, Optional, Set, Tuple
+
+from .detector import _IllegalImportDetected
+from .dist_index import _METADATA_DIR_SUFFIXES, _DistIndex
+from .engine import DEFAULT_ENGINE, _check_files, _Target, _targets
+from .pyproject import _PyProject
+from .walker import DEFAULT_EXCLUDE_DIRS
+
+if TYPE_CHECKING:
+    from .explain import _Explainer
+
+
+# Wait a little after the first event, so that a burst of events (e.g. `git checkout`) is processed at once.
+_DEBOUNCE_SECONDS = 0.05
+_POLL_INTERVAL_SECONDS = 1.0
+
+
+def _environment_dirs(search_paths: Optional[List[str]] = None) -> List[Path]:
+    """
+    Directories containing metadata of distributions, i.e. `search_paths` or `sys.path`.  The map is re-resolved if they
+    change.
+    """
+    return [Path(x) for x in (sys.path if search_paths is None else search_paths) if x != "" and os.path.isdir(x)]
+
+
+class _Changes:
+    """
+    Changes noticed by a watcher.
+    """
+
+    paths: Set[Path]
+    # Files or directories are created, deleted or moved.  Target files must be walked again.
+    structure: bool
+    # `pyproject.toml` or the environment changed.  Module maps must be resolved again.
+    reload: bool
+
+    def __init__(self) -> None:
+        self.paths = set()
+        self.structure = False
+        self.reload = False
+
+    def empty(self) -> bool:
+        return len(self.paths) == 0 and not self.structure and not self.reload
+
+
+class _State:
+    """
+    Resolved module maps and results of each file, kept in memory across checks.
+    """
+
+    _root: Path
+    _engine: str
+    _search_paths: Optional[List[str]]
+    _pyproject: Optional[_PyProject]
+    _index: Optional[_DistIndex]
+    # Built on the first violation, and again after reloading.
+    _explainer: Optional["_Explainer"]
+    _scope_to_module_to_proj: dict[str, dict[str, str]]  # type: ignore  # reason: dict
+    _targets: List[_Target]
+    _path_to_errs: dict[Path, List[_IllegalImportDetected]]  # type: ignore  # reason: dict
+    target_dirs: List[Path]
+    n_checked: int
+
+    def __init__(self, root: Path, engine: str = DEFAULT_ENGINE, search_paths: Optional[List[str]] = None) -> None:
+        self._root = root
+        self._engine = engine
+        self._search_paths = search_paths
+        self._pyproject = None
+        self._index = None
+        self._explainer = None
+        self._scope_to_module_to_proj = {}
+        self._targets = []
+        self._path_to_errs = {}
+        self.target_dirs = []
+        self.n_checked = 0
+
+    @property
+    def search_paths(self) -> Optional[List[str]]:
+        """
+        Directories distributions are searched in, or `None` for `sys.path`.  Watchers watch them for installs.
+        """
+        return self._search_paths
+
+    @property
+    def targets(self) -> List[_Target]:
+        return self._targets
+
+    def load(self) -> None:
+        pyproject_ = _PyProject.load(self._root)
+        if pyproject_.is_err():
+            raise pyproject_.unwrap_err()
+        self._pyproject = pyproject_.unwrap()
+
+        # Scanned again on reload, as distributions may have been installed.  Kept to explain violations.
+        self._index = _DistIndex.scan(self._search_paths)
+        self._explainer = None
+        scope_to_module_to_proj_ = self._pyproject.load_scope_module_to_proj(self._index)
+        if scope_to_module_to_proj_.is_err():
+            raise scope_to_module_to_proj_.unwrap_err()
+        self._scope_to_module_to_proj = scope_to_module_to_proj_.unwrap()
+
+        self._path_to_errs = {}
+        self._walk()
+
+    def _walk(self, recheck: Optional[Set[Path]] = None) -> None:
+        assert self._pyproject is not None
+        recheck = set() if recheck is None else recheck
+        scopes = list(self._scope_to_module_to_proj.keys())
+        self._targets = list(_targets(self._pyproject, scopes))
+        # fmt: off
+        self.target_dirs = sorted(set(dir_
+                                      for scope in scopes
+                                      for dir_ in self._pyproject.scope_target_dirs(scope)))
+        alive = set(path for (path, _) in self._targets)
+        for path in list(self._path_to_errs.keys()):
+            if path not in alive:
+                del self._path_to_errs[path]
+        # fmt: off
+        self._check([target
+                     for target in self._targets
+                     if (target[0] not in self._path_to_errs) or (target[0] in recheck)])
+
+    def _check(self, targets: List[_Target]) -> None:
+        # Check one by one, so that a file being edited, e.g. with a syntax error, does not stop checking others.
+        for target in targets:
+            path = target[0]
+            try:
+                res = _check_files(self._scope_to_module_to_proj, [target], 1, None, self._engine)
+            except (OSError, SyntaxError, ValueError) as err:
+                logger.warning(f"{path}: {err}")
+                self._path_to_errs.pop(path, None)
+                continue
+            if res.is_err():
+                raise res.unwrap_err()
+            for (path, errs) in res.unwrap():
+                self._annotate(errs)
+                self._path_to_errs[path] = errs
+            self.n_checked += 1
+
+    def _annotate(self, errs: List[_IllegalImportDetected]) -> None:
+        if len(errs) == 0:
+            return
+        if self._explainer is None:
+            # Imported lazily.  Only needed if there is a violation.
+            from .explain import _Explainer
+
+            assert (self._index is not None) and (self._pyproject is not None)
+            self._explainer = _Explainer(self._index, self._pyproject.dependencies(True))
+        self._explainer.annotate(errs)
+
+    def update(self, changes: _Changes) -> None:
+        if changes.reload:
+            logger.info("reloading module maps")
+            self.load()
+        elif changes.structure:
+            self._walk(changes.paths)
+        else:
+            # fmt: off
+            self._check([target
+                         for target in self._targets
+                         if target[0] in changes.paths])
+
+    def results(self) -> List[Tuple[Path, List[_IllegalImportDetected]]]:
+        # fmt: off
+        return [(path, self._path_to_errs[path])
+                for (path, _) in self._targets
+                # Files that could not be checked are omitted.  See `_check()`.
+                if path in self._path_to_errs]
+
+
+def _snapshot(state: _State, pyproject_path: Path) -> dict[Path, Any]:  # type: ignore  # reason: dict
+    ret = {}
+    for path in [pyproject_path] + _environment_dirs(state.search_paths):
+        try:
+            ret[path] = path.stat().st_mtime_ns
+        except OSError:
+            ret[path] = None
+    for (path, _) in state.targets:
+        try:
+            st = path.stat()
+            ret[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            ret[path] = None
+    # Directory mtimes change when entries are created or deleted.
+    for dir_ in state.target_dirs:
+        for (d, dirs, _) in os.walk(dir_):
+            dirs[:] = [x for x in dirs if x not in DEFAULT_EXCLUDE_DIRS]
+            try:
+                ret[Path(d)] = os.stat(d).st_mtime_ns
+            except OSError:
+                ret[Path(d)] = None
+    return ret
+
+
+class _PollingWatcher:
+    """
+    Notice changes by comparing `stat()` of files periodically.  Used if inotify is not available.
+    """
+
+    _state: _State
+    _pyproject_path: Path
+    _snapshot: dict[Path, Any]  # type: ignore  # reason: dict
+    _interval: float
+
+    def __init__(self, state: _State, root: Path, interval: float = _POLL_INTERVAL_SECONDS) -> None:
+        self._state = state
+        self._pyproject_path = root / "pyproject.toml"
+        self._interval = interval
+        self._snapshot = _snapshot(state, self._pyproject_path)
+
+    def rewatch(self) -> None:
+        self._snapshot = _snapshot(self._state, self._pyproject_path)
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(min(timeout, self._interval))
+
+    def poll(self) -> _Changes:
+        new = _snapshot(self._state, self._pyproject_path)
+        changes = _Changes()
+        environment_dirs = set(_environment_dirs(self._state.search_paths))
+        for path in set(self._snapshot.keys()) | set(new.keys()):
+            if self._snapshot.get(path) == new.get(path):
+                continue
+            if path == self._pyproject_path or path in environment_dirs:
+                changes.reload = True
+            elif path.suffix == ".py" and path in new and path in self._snapshot and new[path] is not None:
+                changes.paths.add(path)
+            else:
+                changes.structure = True
+        self._snapshot = new
+        return changes
+
+
+# See inotify(7).
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+_IN_STRUCTURE_MASK = _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _InotifyWatcher:
+    """
+    Notice changes by inotify(7).  Only available on Linux.
+    """
+
+    _libc: Any
+    _fd: int
+    _state: _State
+    _root: Path
+    _wd_to_dir: dict[int, Path]  # type: ignore  # reason: dict
+    _root_wd: Optional[int]
+    _environment_wds: Set[int]
+
+    def __init__(self, state: _State, root: Path) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or libc_name is None:
+            raise OSError("inotify is not available")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._state = state
+        self._root = root
+        self._wd_to_dir = {}
+        self._root_wd = None
+        self._environment_wds = set()
+        self.rewatch()
+
+    def _add_watch(self, dir_: Path) -> Optional[int]:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dir_), _IN_MASK)
+        if wd < 0:
+            logger.debug(f"inotify_add_watch failed: {dir_}")
+            return None
+        self._wd_to_dir[wd] = dir_
+        return int(wd)
+
+    def rewatch(self) -> None:
+        # Watches of the same directory return the same descriptor, so adding them again is harmless.
+        self._root_wd = self._add_watch(self._root)
+        for dir_ in _environment_dirs(self._state.search_paths):
+            wd = self._add_watch(dir_)
+            if wd is not None:
+                self._environment_wds.add(wd)
+        for target_dir in self._state.target_dirs:
+            for (d, dirs, _) in os.walk(target_dir):
+                dirs[:] = [x for x in dirs if x not in DEFAULT_EXCLUDE_DIRS]
+                self._add_watch(Path(d))
+
+    def _read(self, changes: _Changes) -> None:
+        try:
+            buf = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        i = 0
+        while i < len(buf):
+            (wd, mask, _, len_) = _EVENT_HEADER.unpack_from(buf, i)
+            name = os.fsdecode(buf[i + _EVENT_HEADER.size : i + _EVENT_HEADER.size + len_].rstrip(b"\0"))
+            i += _EVENT_HEADER.size + len_
+
+            dir_ = self._wd_to_dir.get(wd)
+            if dir_ is None:
+                continue
+            # A directory can be both the root and an environment directory, e.g. with an editable install.
+            if wd in self._environment_wds and name.endswith(_METADATA_DIR_SUFFIXES):
+                changes.reload = True
+            elif wd == self._root_wd and name == "pyproject.toml":
+                changes.reload = True
+            else:
+                if mask & (_IN_STRUCTURE_MASK | _IN_ISDIR):
+                    changes.structure = True
+                # Editors often save by renaming a temporary file.  So moved files must be checked again.
+                if name.endswith(".py"):
+                    changes.paths.add(dir_ / name)
+
+    def wait(self, timeout: float) -> None:
+        (rs, _, _) = select.select([self._fd], [], [], timeout)
+        if len(rs) != 0:
+            time.sleep(_DEBOUNCE_SECONDS)
+
+    def poll(self) -> _Changes:
+        changes = _Changes()
+        while len(select.select([self._fd], [], [], 0)[0]) != 0:
+            self._read(changes)
+        return changes
+
+
+def _make_watcher(state: _State, root: Path, polling: bool) -> Any:
+    if not polling:
+        try:
+            return _InotifyWatcher(state, root)
+        except OSError as err:
+            logger.info(f"falling back to polling: {err}")
+    return _PollingWatcher(state, root)
+
+
+class _Daemon:
+    """
+    Keep `_State` up to date by a watcher.  All accesses to the state and the watcher are serialized by a lock.
+
+    Watchers `wait()` for changes without consuming them, and `poll()` takes them without blocking.  Only waiting is outside
+    the lock, so that changes are taken and applied at once, and `results()` never misses ones taken by another thread.
+    """
+
+    _state: _State
+    _watcher: Any
+    _lock: threading.Lock
+
+    def __init__(
+        self, root: Path, engine: str = DEFAULT_ENGINE, polling: bool = False, search_paths: Optional[List[str]] = None
+    ) -> None:
+        self._state = _State(root, engine, search_paths)
+        self._state.load()
+        self._watcher = _make_watcher(self._state, root, polling)
+        self._lock = threading.Lock()
+
+    def _apply(self, changes: _Changes) -> bool:
+        if changes.empty():
+            return False
+        logger.debug(f"changes: paths = {changes.paths}, structure = {changes.structure}, reload = {changes.reload}")
+        try:
+            self._state.update(changes)
+        except Exception as err:
+            # E.g. `pyproject.toml` is being edited.  Keep the last results and retry at the next change.
+            logger.error(f"failed to update: {err}")
+            return False
+        if changes.structure or changes.reload:
+            self._watcher.rewatch()
+        return True
+
+    def wait_and_update(self, timeout: float) -> bool:
+        """
+        Wait for changes and apply them.  Returns whether something changed.
+        """
+        self._watcher.wait(timeout)
+        with self._lock:
+            return self._apply(self._watcher.poll())
+
+    def results(self) -> List[Tuple[Path, List[_IllegalImportDetected]]]:
+        with self._lock:
+            # Apply pending changes, so that a check right after saving a file sees it.
+            self._apply(self._watcher.poll())
+            return self._state.results()
+
+    def watch(self, on_change: Callable[[List[Tuple[Path, List[_IllegalImportDetected]]]], None]) -> None:
+        on_change(self.results())
+        while True:
+            if self.wait_and_update(_POLL_INTERVAL_SECONDS):
+                on_change(self.results())
+
+
+def _encode_error(e: _IllegalImportDetected) -> List[Any]:
+    provider = None if e._provider is None else [e._provider.name, e._provider.chain]
+    return [e._lineno, e._line, e._module, provider, e._python_versions]
+
+
+def _decode_error(path: Path, x: List[Any]) -> _IllegalImportDetected:
+    # Imported lazily, as `_annotate()`.
+    from .explain import _Provider
+
+    (lineno, line, module, provider, python_versions) = x
+    e = _IllegalImportDetected(path, lineno, line, module)
+    e._provider = None if provider is None else _Provider(provider[0], provider[1])
+    e._python_versions = python_versions
+    return e
+
+
+def _encode_results(xs: List[Tuple[Path, List[_IllegalImportDetected]]]) -> bytes:
+    # fmt: off
+    t = [[str(path), [_encode_error(e) for e in es]]
+         for (path, es) in xs]
+    return json.dumps({"results": t}).encode() + b"\n"
+
+
+def _decode_results(data: bytes) -> List[Tuple[Path, List[_IllegalImportDetected]]]:
+    t = json.loads(data)
+    if "error" in t:
+        raise RuntimeError(f"daemon: {t['error']}")
+    # fmt: off
+    return [(p, [_decode_error(p, x) for x in es])
+            for (p, es) in ((Path(path), es) for (path, es) in t["results"])]
+
+
+def _serve(daemon: _Daemon, socket_path: Path) -> None:
+    """
+    Serve results over a Unix socket while watching changes.  A request is a line `check`.
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            request = self.rfile.readline().strip()
+            if request != b"check":
+                self.wfile.write(json.dumps({"error": f"unknown request: {request!r}"}).encode() + b"\n")
+                return
+            try:
+                self.wfile.write(_encode_results(daemon.results()))
+            except Exception as err:
+                self.wfile.write(json.dumps({"error": str(err)}).encode() + b"\n")
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        socket_path.unlink()
+    server = socketserver.UnixStreamServer(str(socket_path), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"listening on {socket_path}")
+    try:
+        while True:
+            daemon.wait_and_update(_POLL_INTERVAL_SECONDS)
+    finally:
+        server.shutdown()
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+def _request(socket_path: Path, timeout: float = 60.0) -> List[Tuple[Path, List[_IllegalImportDetected]]]:
+    """
+    Get results from a running daemon.  Raises `OSError` if no daemon is running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(socket_path))
+        s.sendall(b"check\n")
+        chunks = []
+        while True:
+            chunk = s.recv(1 << 16)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+    return _decode_results(b"".join(chunks))
@@ -7,10 +7,16 @@ if True:
 
 
 import ast
-import re
+import sys
 import tokenize
 from pathlib import Path
-from typing import Any, List
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from .module_index import _missing_module
+from .profiling import _phase
+
+if TYPE_CHECKING:
+    from .explain import _Provider
 
 
 def _read_file(path: Path) -> str:
@@ -19,76 +25,208 @@ def _read_file(path: Path) -> str:
 
 
 class _IllegalImportDetected:
+    # Results of huge code bases have lots of these.  No `__dict__`, and strings are interned.  Errors of a file share its
+    # `Path`.
+    __slots__ = ("_path", "_lineno", "_line", "_module", "_provider", "_python_versions")
+
     _path: Path
     _lineno: int
     _line: str
     _module: str
+    # Set by `_Explainer` if a distribution provides the module.  Shared by errors of the same module.
+    _provider: Optional["_Provider"]
+    # Set by `_StdlibMatrix` if the module is in stdlib of some of the python versions checked, to the others.
+    _python_versions: Optional[List[str]]
 
     def __init__(self, path: Path, lineno: int, line: str, module: str) -> None:
         self._path = path
         self._lineno = lineno
-        self._line = line
-        self._module = module
+        # The same import lines, e.g. `import yaml`, are repeated over files.
+        self._line = sys.intern(line)
+        self._module = sys.intern(module)
+        self._provider = None
+        self._python_versions = None
+
+    def _hints(self) -> List[str]:
+        """
+        Sentences telling more about the error, if any.
+        """
+        ret = []
+        if self._provider is not None:
+            ret.append(self._provider.describe())
+        if self._python_versions is not None:
+            ret.append(f"Not in stdlib of python {', '.join(self._python_versions)}.")
+        return ret
 
     def __str__(self) -> str:
+        hints = "".join(f"    {hint}\n" for hint in self._hints())
         return (
             "Error:\n"
             f"    {self._path}:{self._lineno}: {self._line}\n"
             f"    {self._module} is imported, but not in dependency.\n"
-            ""
+            f"{hints}"
         )
 
 
-class _Detector(ast.NodeVisitor):
+class _Import(NamedTuple):
+    """
+    An import statement (or one name of `import a, b`) found in a file.
+
+    The statement spans from (`lineno`, `col_offset`) to (`end_lineno`, `end_col_offset`).  Its source is built by `line()`
+    only for illegal imports, as most imports are legal.  `module` is as written in the source, e.g. `.module` for a
+    relative import.  `names` are the names imported by `from ... import`, which are submodules if `module` is a namespace
+    package.  Empty for `import` and `*`.
+    """
+
+    lineno: int
+    col_offset: int
+    end_lineno: int
+    end_col_offset: int
+    module: str
+    names: Tuple[str, ...] = ()
+
+    def line(self, source: Sequence[str]) -> str:
+        return _get_source_by_pos(source, self.lineno, self.col_offset, self.end_lineno, self.end_col_offset)
+
+
+def _illegal_module(
+    module_to_proj: dict[str, str], module: str, names: Tuple[str, ...] = ()  # type: ignore  # reason: dict
+) -> Optional[str]:
+    """
+    The module missing in dependencies if importing `module` is illegal, e.g. `google.cloud` of `google.cloud.storage`.
+    `None` if legal or relative.
+    """
+    if module.startswith("."):
+        return None
+    return _missing_module(module_to_proj, module, names)
+
+
+def _validate_import(
+    module_to_proj: dict[str, str], path: Path, imp: _Import, source: Sequence[str]  # type: ignore  # reason: dict
+) -> Optional[_IllegalImportDetected]:
+    m = _illegal_module(module_to_proj, imp.module, imp.names)
+    if m is None:
+        return None
+    else:
+        return _IllegalImportDetected(path, imp.lineno, imp.line(source), m)
+
+
+def _validate_imports(
+    module_to_proj: dict[str, str], path: Path, imports: List[_Import], source: Sequence[str]  # type: ignore  # reason: dict
+) -> List[_IllegalImportDetected]:
+    """
+    Illegal imports of a file.  `source` is the lines of the file, of which only the ones of illegal imports are accessed.
+    """
+    # fmt: off
+    return [err
+            for err in (_validate_import(module_to_proj, path, imp, source) for imp in imports)
+            if err is not None]
+
+
+# Fields holding lists of statements.
+_BODY_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+
+def _body_fields_of_types() -> dict[type, Tuple[str, ...]]:  # type: ignore  # reason: dict
+    """
+    Fields holding statements of each type of statement, in the order of `_fields`, i.e. the order `ast.NodeVisitor` visits.
+    Simple statements, e.g. `Assign`, have none.
+    """
+    types = ast.stmt.__subclasses__() + [ast.ExceptHandler]
+    if hasattr(ast, "match_case"):
+        types.append(ast.match_case)
+    ret = {}
+    for t in types:
+        fields = tuple(field for field in t._fields if field in _BODY_FIELDS)
+        if len(fields) != 0:
+            ret[t] = fields
+    return ret
+
+
+_BODY_FIELDS_OF_TYPES = _body_fields_of_types()
+
+
+class _ImportCollector:
+    """
+    Collects imports in the order of appearance.
+
+    Imports are statements, so only lists of statements are walked.  Expressions, which are most of nodes, are not visited.
+    The module of `from ... import` is given by `level` and `module` of the node, and the source is not read.
+    """
+
+    _tree: Any
+
+    def __init__(self, tree: Any) -> None:
+        self._tree = tree
+
+    def collect(self) -> List[_Import]:
+        # fmt: off
+        return [_Import(node.lineno, node.col_offset, node.end_lineno, node.end_col_offset, module, names)
+                for (node, module, names) in self._import_nodes()]
+
+    def _import_nodes(self) -> List[Tuple[Any, str, Tuple[str, ...]]]:
+        """
+        Import nodes, modules and names of `from ... import`.  `import a, b` gives one for each name.
+        """
+        ret: List[Tuple[Any, str, Tuple[str, ...]]] = []
+        self._walk(self._tree.body, ret)
+        return ret
+
+    def _walk(self, stmts: List[Any], ret: List[Tuple[Any, str, Tuple[str, ...]]]) -> None:
+        for node in stmts:
+            t = type(node)
+            if t is ast.Import:
+                for name in node.names:
+                    ret.append((node, name.name, ()))
+            elif t is ast.ImportFrom:
+                names = tuple(name.name for name in node.names if name.name != "*")
+                ret.append((node, "." * node.level + (node.module or ""), names))
+            else:
+                fields = _BODY_FIELDS_OF_TYPES.get(t)
+                if fields is not None:
+                    for field in fields:
+                        self._walk(getattr(node, field), ret)
+
+
+class _Detector(_ImportCollector):
     _module_to_dict: dict[str, str]  # type: ignore  # reason: dict
     _path: Path
-    _source: List[str]
-    _tree: Any
-    _errs: List[_IllegalImportDetected]
+    _source: Sequence[str]
 
-    def __init__(self, module_to_proj: dict[str, str], path: Path, source: List[str], tree: Any) -> None:  # type: ignore  # reason: dict
+    def __init__(self, module_to_proj: dict[str, str], path: Path, source: Sequence[str], tree: Any) -> None:  # type: ignore  # reason: dict
+        super().__init__(tree)
         self._module_to_proj = module_to_proj
         self._path = path
         self._source = source
-        self._tree = tree
-        self._errs = []
 
     def detect(self) -> List[_IllegalImportDetected]:
-        self.visit(self._tree)
-
-        return self._errs
-
-    def _validate(self, module: str, node: Any, line: str) -> None:
-        logger.debug(f"module = {module}")
-
-        m = module.split(".")[0]
-
-        if module.startswith("."):
-            pass
-        elif m in self._module_to_proj:
-            pass
-        else:
-            err = _IllegalImportDetected(self._path, node.lineno, line, m)
-            self._errs.append(err)
-
-    def visit_Import(self, node: Any) -> None:
-        line = _get_source(self._source, node)
-        for name in node.names:
-            self._validate(name.name, node, line)
-
-    def visit_ImportFrom(self, node: Any) -> None:
-        # `ast.NodeVisitor` does not give information to distinguish "from .module import ..." and "from module import ...".
-        # So we parse source code by ourselves.
-        line = _get_source(self._source, node)
-        p = re.compile("from +([^ ]+)")
-        m = p.match(line)
-        assert m is not None
-        module = m.group(1)
-        self._validate(module, node, line)
-
-
-def _get_source(source: List[str], node: Any) -> str:
-    lines = source[node.lineno - 1 : node.end_lineno]
-    lines[-1] = lines[-1][: node.end_col_offset]
-    lines[0] = lines[0][node.col_offset :]
+        return _validate_imports(self._module_to_proj, self._path, self.collect(), self._source)
+
+
+def _get_source(source: Sequence[str], node: Any) -> str:
+    return _get_source_by_pos(source, node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
+
+
+def _get_source_by_pos(source: Sequence[str], lineno: int, col_offset: int, end_lineno: int, end_col_offset: int) -> str:
+    lines = list(source[lineno - 1 : end_lineno])
+    lines[-1] = lines[-1][:end_col_offset]
+    lines[0] = lines[0][col_offset:]
     return " ".join([line.removesuffix("\\") for line in lines])  # type: ignore  # reason: removesuffix
+
+
+def _extract_file(path: Path, data: bytes) -> List[_Import]:
+    """
+    Imports of the file `path`, whose content is `data`.  All engines take the path and the content read by the caller, so
+    that the content is also used to show illegal imports.  This one, `ast`, needs only the content.
+    """
+    return _extract_bytes(data)
+
+
+def _extract_bytes(data: bytes) -> List[_Import]:
+    """
+    Parse the content of a file as is.  `ast.parse()` detects the encoding of bytes.
+    """
+    with _phase("parse"):
+        tree = ast.parse(data)
+    with _phase("collect"):
+        return _ImportCollector(tree).collect()
@@ -0,0 +1,250 @@
+import logging as _logging
+
+# noqa idiom
+if True:
+    logger = _logging.getLogger(__name__)
+    logger.addHandler(_logging.NullHandler())
+
+
+import argparse
+import fcntl
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+_DIST_CACHE_VERSION = 1
+_DIST_CACHE_FILE_NAME = "dists.jsonl"
+_DIST_CACHE_LOCK_NAME = "dists.lock"
+
+
+def _default_dist_cache_dir() -> Path:
+    """
+    The cache directory shared by all projects of the user, as the XDG Base Directory Specification.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "pyproject-indirect-import-detector"
+
+
+def _version_of_metadata_dir(dir_name: str) -> Optional[str]:
+    """
+    Get the version from the name of a metadata directory.  `None` if it has no version.
+
+    >>> _version_of_metadata_dir("stdlib_list-0.8.0.dist-info")
+    '0.8.0'
+    >>> _version_of_metadata_dir("toml-0.10.2-py3.9.egg-info")
+    '0.10.2'
+    >>> _version_of_metadata_dir("toml.egg-info") is None
+    True
+    """
+    parts = dir_name.rsplit(".", 1)[0].split("-")
+    return parts[1] if len(parts) >= 2 else None
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _line(key: Tuple[str, str, int], path: str, modules: List[str]) -> str:
+    (name, version, mtime) = key
+    x = {"v": _DIST_CACHE_VERSION, "name": name, "version": version, "mtime": mtime, "path": path, "modules": modules}
+    return json.dumps(x, separators=(",", ":")) + "\n"
+
+
+class _DistCache:
+    """
+    Modules of distributions, shared by all runs of all projects of the user.
+
+    Entries are keyed by the normalized name and the version, and valid only for a metadata directory of the same mtime, so
+    that reinstalling a distribution invalidates it.  Environments with the same distribution installed at different times
+    have their own entries.
+
+    The file is append-only.  New entries are appended by one `write()` of `O_APPEND` under a shared lock, so that
+    concurrent runs do not corrupt it.  `prune()` rewrites it under the exclusive lock.  Later entries win.
+    """
+
+    _dir: Path
+    # (name, version, mtime of metadata dir) -> (metadata dir, modules)
+    _entries: dict[Tuple[str, str, int], Tuple[str, List[str]]]  # type: ignore  # reason: dict
+    _pending: List[str]
+    n_lines: int
+    hits: int
+    misses: int
+
+    def __init__(self, dir_: Path) -> None:
+        self._dir = dir_
+        self._entries = {}
+        self._pending = []
+        self.n_lines = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self) -> Path:
+        return self._dir / _DIST_CACHE_FILE_NAME
+
+    def _lock(self, exclusive: bool) -> int:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._dir / _DIST_CACHE_LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return fd
+
+    @classmethod
+    def load(cls, dir_: Path) -> "_DistCache":
+        this = cls(dir_)
+        try:
+            with open(this._path(), "r") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return this
+        except OSError as err:
+            logger.warning(f"ignoring broken cache {this._path()}: {err}")
+            return this
+
+        for line in lines:
+            if line == "":
+                continue
+            try:
+                x = json.loads(line)
+                if x["v"] != _DIST_CACHE_VERSION:
+                    continue
+                this._entries[(x["name"], x["version"], x["mtime"])] = (x["path"], x["modules"])
+            except (ValueError, KeyError, TypeError):
+                # E.g. a line cut by a crash.
+                continue
+            this.n_lines += 1
+        return this
+
+    def lookup(self, name: str, metadata_dir: Path) -> Optional[List[str]]:
+        version = _version_of_metadata_dir(metadata_dir.name)
+        mtime = _mtime_ns(metadata_dir)
+        entry = None if (version is None or mtime is None) else self._entries.get((name, version, mtime))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def store(self, name: str, metadata_dir: Path, modules: List[str]) -> None:
+        version = _version_of_metadata_dir(metadata_dir.name)
+        mtime = _mtime_ns(metadata_dir)
+        if version is None or mtime is None:
+            return
+        path = str(metadata_dir.resolve())
+        self._entries[(name, version, mtime)] = (path, modules)
+        self._pending.append(_line((name, version, mtime), path, modules))
+
+    def save(self) -> None:
+        """
+        Append new entries.
+        """
+        if len(self._pending) == 0:
+            return
+        # Start with a newline, so that a line cut by a crash of another run does not break the first entry.
+        data = ("\n" + "".join(self._pending)).encode()
+        lock = self._lock(exclusive=False)
+        try:
+            fd = os.open(self._path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        finally:
+            os.close(lock)
+        self.n_lines += len(self._pending)
+        self._pending = []
+
+    def prune(self) -> int:
+        """
+        Rewrite the file without superseded entries and entries of metadata directories removed or reinstalled.  Returns the
+        number of entries removed.
+        """
+        lock = self._lock(exclusive=True)
+        try:
+            # Entries appended by others since loaded.
+            this = _DistCache.load(self._dir)
+            # fmt: off
+            entries = dict((key, (path, modules))
+                           for (key, (path, modules)) in this._entries.items()
+                           if _mtime_ns(Path(path)) == key[2])
+            (fd, tmp) = tempfile.mkstemp(dir=self._dir, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    for (key, (path, modules)) in entries.items():
+                        f.write(_line(key, path, modules))
+                os.replace(tmp, self._path())
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        finally:
+            os.close(lock)
+        self._entries = entries
+        n = this.n_lines - len(entries)
+        self.n_lines = len(entries)
+        return n
+
+    def size(self) -> int:
+        try:
+            return self._path().stat().st_size
+        except OSError:
+            return 0
+
+    def stats(self) -> str:
+        return f"Distribution cache: {self.hits} hits, {self.misses} misses"
+
+
+def _warm(cache: _DistCache, search_paths: Optional[List[str]]) -> int:
+    """
+    Resolve all distributions in the search paths into the cache.  Returns the number of distributions resolved.
+    """
+    from .dist_index import _DistIndex
+
+    index = _DistIndex.scan(search_paths, cache)
+    for name in index.names():
+        try:
+            index.modules(name)
+        except (OSError, AssertionError) as err:
+            # E.g. an egg-info without `top_level.txt` nor `RECORD`.
+            logger.warning(f"cannot resolve {name}: {err}")
+    cache.save()
+    return len(index.names())
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the cache of modules of distributions shared by projects")
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default=None,
+        help="The cache directory. (default: $XDG_CACHE_HOME/pyproject-indirect-import-detector)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    warm = subparsers.add_parser("warm", help="Resolve all installed distributions into the cache, e.g. in `Dockerfile`.")
+    warm.add_argument(
+        "--path",
+        action="append",
+        default=None,
+        help="Search the directory instead of `sys.path`.  Can be given multiple times.",
+    )
+    subparsers.add_parser("stats", help="Show the number of entries and the size of the cache.")
+    subparsers.add_parser("prune", help="Remove entries of distributions no longer installed.")
+    args = parser.parse_args()
+
+    cache = _DistCache.load(_default_dist_cache_dir() if args.dir is None else args.dir)
+    if args.command == "warm":
+        n = _warm(cache, args.path)
+        print(f"Resolved {n} distributions: {cache.hits} cached, {cache.misses} added")
+    elif args.command == "stats":
+        names = set(name for (name, _, _) in cache._entries)
+        print(f"{cache._path()}: {len(cache._entries)} entries of {len(names)} distributions")
+        print(f"{cache.n_lines} lines, {cache.size()} bytes.  `prune` removes superseded lines.")
+    elif args.command == "prune":
+        n = cache.prune()
+        print(f"Removed {n} entries, {len(cache._entries)} left")
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,396 @@
+import csv
+import os
+import re
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from .dist_cache import _DistCache
+
+_METADATA_DIR_SUFFIXES = (".dist-info", ".egg-info")
+
+
+def _normalize_name(name: str) -> str:
+    """
+    Normalize a distribution name as PEP 503.
+
+    >>> _normalize_name("Foo_Bar.baz")
+    'foo-bar-baz'
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _name_of_metadata_dir(dir_name: str) -> str:
+    """
+    Get the distribution name from the name of a metadata directory.
+
+    >>> _name_of_metadata_dir("stdlib_list-0.8.0.dist-info")
+    'stdlib-list'
+    >>> _name_of_metadata_dir("toml-0.10.2-py3.9.egg-info")
+    'toml'
+    >>> _name_of_metadata_dir("toml.egg-info")
+    'toml'
+    """
+    for suffix in _METADATA_DIR_SUFFIXES:
+        if dir_name.endswith(suffix):
+            dir_name = dir_name[: -len(suffix)]
+            break
+    # Names in metadata directories are escaped, i.e. they do not contain `-`.  So the first `-` separates version.
+    return _normalize_name(dir_name.split("-")[0])
+
+
+def _iter_record_paths(record: Path) -> Iterator[str]:
+    """
+    Read `RECORD` line by line and yield paths.
+    """
+    with open(record, "r", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) == 0:
+                continue
+            yield row[0]
+
+
+# Suffixes of module files.  Extension modules have tags, e.g. `foo.cpython-39-x86_64-linux-gnu.so`.
+_MODULE_SUFFIXES = (".py", ".so", ".pyd")
+
+
+def _module_of_path(path: str, packages: Set[str]) -> Optional[str]:
+    """
+    The dotted module a file of a distribution belongs to, at the depth the distribution provides.  I.e. the first regular
+    package on the path, or the module itself if all parents are namespace packages.  `None` if not a python module.
+
+    >>> _module_of_path("foo/bar/baz.py", {"foo"})
+    'foo'
+    >>> _module_of_path("google/protobuf/message.py", {"google/protobuf"})
+    'google.protobuf'
+    >>> _module_of_path("google/cloud/storage.py", set())
+    'google.cloud.storage'
+    >>> _module_of_path("six.py", set())
+    'six'
+    >>> _module_of_path("_cffi_backend.cpython-39-x86_64-linux-gnu.so", set())
+    '_cffi_backend'
+    >>> _module_of_path("foo.libs/libz.so", set()) is None
+    True
+    """
+    parts = path.split("/")
+    for i in range(1, len(parts)):
+        if not parts[i - 1].isidentifier():
+            return None
+        if "/".join(parts[:i]) in packages:
+            return ".".join(parts[:i])
+
+    name = parts[-1]
+    if not name.endswith(_MODULE_SUFFIXES):
+        return None
+    name = name.split(".")[0]
+    if not name.isidentifier():
+        return None
+    return ".".join(parts[:-1] + [name])
+
+
+def _get_modules_of_paths(paths: Iterable[str], namespaces: Optional[List[str]] = None) -> List[str]:
+    """
+    Dotted modules provided by files of a distribution, at the depth it provides them.  E.g. `google.protobuf` rather than
+    `google`, as `google` is a namespace package shared with other distributions.
+
+    `namespaces` are namespace packages of the old style, i.e. with `__init__.py` declaring them.
+
+    >>> _get_modules_of_paths(["google/protobuf/__init__.py", "google/protobuf/message.py", "protobuf-3.0.dist-info/RECORD"])
+    ['google.protobuf']
+    """
+    # Note that there is a possibility that a path starts with `..` if the distribution includes entrypoints.
+    # fmt: off
+    paths = [path
+             for path in paths
+             if not path.startswith("..") and not path.split("/", 1)[0].endswith(_METADATA_DIR_SUFFIXES)]
+    namespaces_ = set(ns.replace(".", "/") for ns in (namespaces or []))
+    # fmt: off
+    packages = set(path[: -len("/__init__.py")]
+                   for path in paths
+                   if path.endswith("/__init__.py")) - namespaces_
+
+    ret = set()
+    for path in paths:
+        m = _module_of_path(path, packages)
+        if m is not None:
+            ret.add(m)
+    return sorted(ret)
+
+
+def _read_lines(path: Path) -> Optional[List[str]]:
+    try:
+        with open(path, "r") as f:
+            return [line.strip() for line in f.read().splitlines() if line.strip() != ""]
+    except FileNotFoundError:
+        return None
+
+
+def _iter_installed_files(metadata_dir: Path) -> Optional[Iterable[str]]:
+    """
+    Paths of files of a distribution relative to its site, as `importlib.metadata`: `RECORD` of wheels, or
+    `installed-files.txt` or `SOURCES.txt` of egg-info.  `None` if none of them exists.
+    """
+    record = metadata_dir / "RECORD"
+    if record.exists():
+        return _iter_record_paths(record)
+    # Relative to the metadata directory.
+    installed = _read_lines(metadata_dir / "installed-files.txt")
+    if installed is not None:
+        return (os.path.normpath(os.path.join(metadata_dir.name, x)).replace(os.sep, "/") for x in installed)
+    return _read_lines(metadata_dir / "SOURCES.txt")
+
+
+def _take_until_past(paths: Iterable[str], top_level: List[str]) -> Iterator[str]:
+    """
+    Paths of sorted `paths` up to the last one under `top_level`.  Paths under a name are contiguous in sorted order.
+
+    >>> list(_take_until_past(["a/x.py", "google/protobuf/__init__.py", "google/protobuf/message.py", "six.py"], ["google"]))
+    ['a/x.py', 'google/protobuf/__init__.py', 'google/protobuf/message.py']
+    """
+    for path in paths:
+        if all((path > m) and not path.startswith(m) for m in top_level):
+            return
+        yield path
+
+
+def _get_modules_by_record(
+    metadata_dir: Path, namespaces: Optional[List[str]] = None, top_level: Optional[List[str]] = None
+) -> List[str]:
+    """
+    `top_level` are top-level modules if known.  pip writes `RECORD` sorted, so then it is read only up to them.
+    No modules are known if the distribution lists no files.
+    """
+    paths = _iter_installed_files(metadata_dir)
+    if paths is None:
+        return []
+    if (top_level is not None) and (_read_lines(metadata_dir / "INSTALLER") == ["pip"]):
+        paths = _take_until_past(paths, [m.replace(".", "/") for m in top_level])
+    return _get_modules_of_paths(paths, namespaces)
+
+
+def _get_modules_of_metadata_dir(metadata_dir: Path) -> List[str]:
+    """
+    Modules of a distribution.  `top_level.txt` is used if it exists, as it is cheaper than `RECORD`, unless the distribution
+    has a namespace package.  Then `RECORD` tells the depth of modules.
+
+    An egg-info written as a single file, e.g. by distutils, lists no modules.
+    """
+    if metadata_dir.is_file():
+        return []
+    namespaces = _read_lines(metadata_dir / "namespace_packages.txt")
+    top_level = _read_lines(metadata_dir / "top_level.txt")
+    if top_level is not None:
+        top_level = [m.replace("/", ".") for m in top_level]
+        site = metadata_dir.parent
+        # fmt: off
+        has_namespace = (namespaces is not None) or any(
+            (site / m).is_dir() and not (site / m / "__init__.py").exists() for m in top_level
+        )
+        if not (has_namespace and (metadata_dir / "RECORD").exists()):
+            return top_level
+    return _get_modules_by_record(metadata_dir, namespaces, top_level)
+
+
+def _requirement_name(requirement: str) -> Optional[str]:
+    """
+    The normalized name of a requirement as PEP 508.  `None` if it is only for extras, which are not installed by default.
+
+    >>> _requirement_name("pillow<11,>=5")
+    'pillow'
+    >>> _requirement_name("PyYAML (>=5.1) ; python_version >= '3.6'")
+    'pyyaml'
+    >>> _requirement_name("pytest ; extra == 'test'") is None
+    True
+    """
+    m = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", requirement)
+    if m is None:
+        return None
+    if re.search(r"\bextra\s*==", requirement.partition(";")[2]):
+        return None
+    return _normalize_name(m.group(1))
+
+
+def _parse_metadata_headers(text: str) -> Tuple[Optional[str], List[str]]:
+    """
+    The name and normalized names of requirements in `METADATA` or `PKG-INFO`.  The body after headers is not parsed.
+
+    >>> _parse_metadata_headers("Name: actfw-core\\nRequires-Dist: pillow<11,>=5\\n\\nRequires-Dist: not-a-header\\n")
+    ('actfw-core', ['pillow'])
+    """
+    name = None
+    requires = []
+    for line in text.splitlines():
+        if line == "":
+            break
+        (key, _, value) = line.partition(":")
+        if key == "Name":
+            name = value.strip()
+        elif key == "Requires-Dist":
+            x = _requirement_name(value)
+            if x is not None:
+                requires.append(x)
+    return (name, requires)
+
+
+def _parse_requires_txt(text: str) -> List[str]:
+    """
+    Normalized names of requirements in `requires.txt` of egg-info.  Sections are for extras or markers, and skipped.
+
+    >>> _parse_requires_txt("six\\nattrs>=19\\n\\n[test]\\npytest\\n")
+    ['six', 'attrs']
+    """
+    ret = []
+    for line in text.splitlines():
+        if line.startswith("["):
+            break
+        x = _requirement_name(line)
+        if x is not None:
+            ret.append(x)
+    return ret
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _get_metadata_of_metadata_dir(metadata_dir: Path) -> Tuple[Optional[str], List[str]]:
+    if metadata_dir.is_file():
+        # An egg-info written as a single file is `PKG-INFO` itself.
+        return _parse_metadata_headers(_read_text(metadata_dir) or "")
+    text = _read_text(metadata_dir / "METADATA")
+    if text is None:
+        text = _read_text(metadata_dir / "PKG-INFO") or ""
+    (name, requires) = _parse_metadata_headers(text)
+    if metadata_dir.name.endswith(".egg-info"):
+        requires = _parse_requires_txt(_read_text(metadata_dir / "requires.txt") or "")
+    return (name, requires)
+
+
+# Prints `sys.path` of another interpreter.  The entry of the current directory, given by `-c`, is not the one of scripts.
+_PRINT_SYS_PATH = "import json, sys; print(json.dumps([p for p in sys.path if p != '']))"
+
+
+def _sys_path_of_python(python: str) -> List[str]:
+    """
+    `sys.path` of another interpreter, e.g. `.venv/bin/python`, by running it once.  Its site-packages and directories added
+    by `.pth` files, e.g. of editable installs, are there.  Raises `OSError` if it cannot be run.
+    """
+    # Imported lazily.  Only for `--python`.
+    import json
+    import subprocess
+
+    try:
+        p = subprocess.run([python, "-c", _PRINT_SYS_PATH], capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as err:
+        raise OSError(f"{python} exited with {err.returncode}: {err.stderr.strip()}") from err
+    try:
+        paths = json.loads(p.stdout)
+    except ValueError as err:
+        raise OSError(f"{python} printed unexpected sys.path: {p.stdout!r}") from err
+    return [str(x) for x in paths]
+
+
+def _search_paths_of(site_packages: List[Path], python: Optional[str]) -> Optional[List[str]]:
+    """
+    Directories to search distributions in, instead of `sys.path` of this interpreter.  `None` if neither is given.
+
+    >>> _search_paths_of([Path("venv/lib/python3.11/site-packages")], None)
+    ['venv/lib/python3.11/site-packages']
+    >>> _search_paths_of([], None) is None
+    True
+    """
+    if (len(site_packages) == 0) and (python is None):
+        return None
+    ret = [str(x) for x in site_packages]
+    if python is not None:
+        ret += _sys_path_of_python(python)
+    return ret
+
+
+class _DistIndex:
+    """
+    Index from normalized distribution names to their top-level modules.
+
+    The metadata directories of all distributions are found by one `os.scandir()` pass over the search paths, which are
+    `sys.path` by default, or the ones of another environment.
+    Modules of a distribution are read only when it is looked up, and memoized.
+    As `importlib.metadata`, the first one in the search paths wins if a name is found multiple times.
+    With `dist_cache`, modules are also looked up in and added to the cache shared by runs.
+    """
+
+    _name_to_dir: dict[str, Path]  # type: ignore  # reason: dict
+    _name_to_modules: dict[str, List[str]]  # type: ignore  # reason: dict
+    _name_to_metadata: dict[str, Tuple[str, List[str]]]  # type: ignore  # reason: dict
+    _dist_cache: Optional["_DistCache"]
+
+    def __init__(
+        self, name_to_dir: dict[str, Path], dist_cache: Optional["_DistCache"] = None  # type: ignore  # reason: dict
+    ) -> None:
+        self._name_to_dir = name_to_dir
+        self._name_to_modules = {}
+        self._name_to_metadata = {}
+        self._dist_cache = dist_cache
+
+    @classmethod
+    def scan(cls, search_paths: Optional[List[str]] = None, dist_cache: Optional["_DistCache"] = None) -> "_DistIndex":
+        if search_paths is None:
+            search_paths = sys.path
+
+        name_to_dir = {}
+        for search_path in search_paths:
+            try:
+                it = os.scandir(search_path or ".")
+            except OSError:
+                # Not a directory, e.g. zip files.
+                continue
+            with it:
+                for entry in it:
+                    # Egg-info may be a single file.
+                    if entry.name.endswith(".egg-info") or (entry.name.endswith(".dist-info") and entry.is_dir()):
+                        name_to_dir.setdefault(_name_of_metadata_dir(entry.name), Path(entry.path))
+        return cls(name_to_dir, dist_cache)
+
+    def names(self) -> List[str]:
+        return sorted(self._name_to_dir)
+
+    def metadata_dir(self, project_name: str) -> Path:
+        name = _normalize_name(project_name)
+        metadata_dir = self._name_to_dir.get(name)
+        if metadata_dir is None:
+            # `importlib.metadata` is slow to import, and only needed on this error.
+            from importlib.metadata import PackageNotFoundError
+
+            raise PackageNotFoundError(project_name)
+        return metadata_dir
+
+    def modules(self, project_name: str) -> List[str]:
+        name = _normalize_name(project_name)
+        modules = self._name_to_modules.get(name)
+        if modules is None:
+            metadata_dir = self.metadata_dir(project_name)
+            if self._dist_cache is None:
+                modules = _get_modules_of_metadata_dir(metadata_dir)
+            else:
+                modules = self._dist_cache.lookup(name, metadata_dir)
+                if modules is None:
+                    modules = _get_modules_of_metadata_dir(metadata_dir)
+                    self._dist_cache.store(name, metadata_dir, modules)
+            self._name_to_modules[name] = modules
+        return modules
+
+    def metadata(self, project_name: str) -> Tuple[str, List[str]]:
+        """
+        The name as written by the distribution, e.g. `PyYAML`, and normalized names of its requirements.  Memoized.
+        """
+        name = _normalize_name(project_name)
+        metadata = self._name_to_metadata.get(name)
+        if metadata is None:
+            (name_, requires) = _get_metadata_of_metadata_dir(self.metadata_dir(project_name))
+            metadata = (name_ or project_name, requires)
+            self._name_to_metadata[name] = metadata
+        return metadata
@@ -1,49 +1,28 @@
-from importlib.metadata import Distribution
+import time
 from typing import List, Optional
 
-from stdlib_list import stdlib_list
-
+from .dist_index import _DistIndex
 from .exception import InvalidPythonVersionError
+from .profiling import _record_distribution
 from .result import Err, Ok, Result
 
 
-# We focus on wheel and make things are simple.
-#
-# Rationale:
-# - Lots of packages contain `top_level.txt`, but the existance is not assured.
-# - Lots of packages provide wheel.
-# - The following logic should works well on wheel case because of PEP 427.
-# - The author doesn't know the egg case that the following logic works well on.
-#
-# Let us know if there's a pathological case.
-def _get_modules(project_name: str) -> List[str]:
-    dist = Distribution.from_name(project_name)
-    return _get_modules_by_toplevel_txt(dist) or _get_modules_by_files(dist)
+# Tables of stdlib modules by python version.  Shared by all projects checked in a process.
+_stdlib_tables: dict[str, List[str]] = {}  # type: ignore  # reason: dict
 
 
-def _get_modules_by_toplevel_txt(dist: Distribution) -> Optional[List[str]]:
-    modules = dist.read_text("top_level.txt")
+def _stdlib_modules(python_version: str) -> List[str]:
+    """
+    Same as `stdlib_list()`, but memoized.  Raises `ValueError` if the version is not supported.
+    """
+    modules = _stdlib_tables.get(python_version)
     if modules is None:
-        return None
-    else:
-        return modules.rstrip().split("\n")
+        # Imported lazily.  `stdlib_list()` reads only the table of the version.
+        from stdlib_list import stdlib_list
 
-
-def _get_modules_by_files(dist: Distribution) -> List[str]:
-    paths = dist.files
-    # Safety:
-    #   PEP 427 ensures that wheel must contain `RECORD` file.
-    #   We do not care about egg-info case. (Are there any packages that violate below?)
-    assert paths is not None
-    IGNORE_SUFFIX_LIST = [
-        ".dist-info",
-        ".egg-info",
-    ]
-    # fmt: off
-    return [dir_
-            for dir_ in set(path.parts[0] for path in paths)
-            # Note that there is a possibility that `dir_ == ".."` if the distribution includes entrypoints.
-            if (dir_ != "..") and (not any([dir_.endswith(suffix) for suffix in IGNORE_SUFFIX_LIST]))]
+        modules = stdlib_list(python_version)
+        _stdlib_tables[python_version] = modules
+    return modules
 
 
 def _load_proj_to_modules(
@@ -53,18 +32,34 @@ def _load_proj_to_modules(
     python_version: str,
     exclude_projects: List[str],
     exclude_modules: List[str],
+    index: Optional[_DistIndex] = None,
+    stdlib: Optional[List[str]] = None,
 ) -> Result[dict[str, List[str]], InvalidPythonVersionError]:  # type: ignore  # reason: dict
-    try:
-        modules_std = stdlib_list(python_version)
-    except ValueError as err:
-        msg = f"`stdlib-list` does not support {python_version}"
-        return Err(err).wrap_err(InvalidPythonVersionError(msg))
+    """
+    `stdlib` is modules of stdlib used instead of the ones of `python_version`, e.g. the ones common to several versions.
+    """
+    if stdlib is not None:
+        modules_std = stdlib
+    else:
+        try:
+            modules_std = _stdlib_modules(python_version)
+        except ValueError as err:
+            msg = f"`stdlib-list` does not support {python_version}"
+            return Err(err).wrap_err(InvalidPythonVersionError(msg))
 
     project_names = [proj for proj in project_names if proj not in exclude_projects]
+    if index is None:
+        index = _DistIndex.scan()
 
-    proj_to_modules_std = {"<std>": modules_std}
-    proj_to_modules_dep = dict((proj, _get_modules(proj)) for proj in project_names)
-    proj_to_modules_self = {self_project_name: self_module_names}
+    # Only top-level names are looked up for stdlib, which has no namespace package shared with distributions.  The table
+    # has thousands of dotted submodules.
+    proj_to_modules_std = {"<std>": sorted(set(m.split(".")[0] for m in modules_std))}
+    proj_to_modules_dep = {}
+    for proj in project_names:
+        start = time.perf_counter()
+        proj_to_modules_dep[proj] = index.modules(proj)
+        _record_distribution(proj, time.perf_counter() - start)
+    proj_to_modules_self = {self_project_name: [m.replace("/", ".") for m in self_module_names]}
     proj_to_modules_exclude = {"<exclude>": exclude_modules}
     proj_to_modules = {
         **proj_to_modules_std,
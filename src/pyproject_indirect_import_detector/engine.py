@@ -0,0 +1,454 @@
+import heapq
+import os
+import time
+from contextlib import nullcontext
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, ContextManager, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .bytecode import _extract_file_by_bytecode
+from .detector import (
+    _IllegalImportDetected,
+    _extract_file,
+    _illegal_module,
+    _Import,
+    _validate_imports,
+)
+from .dist_index import _DistIndex
+from .profiling import _init_worker as _init_worker_profiling
+from .profiling import _phase, _phase_iter, _record_file
+from .pyproject import _PyProject
+from .reader import DEFAULT_PREFETCH, _Lines, _prefetch_iter, _Prefetcher, _prefetching, _read_source
+from .result import Err, Ok, Result
+from .scanner import _extract_file_by_scanner
+from .walker import _is_path_ignored, _list_all_python_files
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .cache import _FileCache
+
+    from .inventory import _Inventory
+
+T = TypeVar("T")
+
+# Ways to extract imports from a file.
+ENGINES = {
+    "ast": _extract_file,
+    "tokenize": _extract_file_by_scanner,
+    "pyc": _extract_file_by_bytecode,
+}
+DEFAULT_ENGINE = "ast"
+
+# Number of files dispatched to a process pool at once.  Largest files are scheduled first within a batch.
+_BATCH_SIZE = 4096
+
+# A file to check and the scopes it belongs to.
+_Target = Tuple[Path, Tuple[str, ...]]
+
+
+def _illegal_indices(
+    module_to_proj: dict[str, str], imports: List[_Import]  # type: ignore  # reason: dict
+) -> List[int]:
+    # fmt: off
+    return [i
+            for (i, imp) in enumerate(imports)
+            if _illegal_module(module_to_proj, imp.module, imp.names) is not None]
+
+
+def _errs_of_indices(
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    scope_to_indices: dict[str, List[int]],  # type: ignore  # reason: dict
+    path: Path,
+    imports: List[_Import],
+    source: Sequence[str],
+) -> List[_IllegalImportDetected]:
+    """
+    Merge illegal imports in the scopes a file belongs to.  An import is reported once even if it is illegal in several.
+    `source` is the lines of the file, of which only the ones of illegal imports are accessed.
+    """
+    ret = []
+    done = set()
+    for (scope, indices) in scope_to_indices.items():
+        xs = [i for i in indices if i not in done]
+        done.update(xs)
+        errs = _validate_imports(scope_to_module_to_proj[scope], path, [imports[i] for i in xs], source)
+        ret += list(zip(xs, errs))
+    ret.sort(key=lambda x: x[0])
+    return [err for (_, err) in ret]
+
+
+def _scan_file(
+    extract: Callable[[Path, bytes], List[_Import]],
+    digest: Optional[Callable[[bytes], str]],
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    target: _Target,
+    prefetcher: Optional[_Prefetcher] = None,
+) -> Result[Tuple[Path, List[_Import], List[_IllegalImportDetected], Optional[str]], Exception]:
+    """
+    Also returns `digest(data)` of the bytes read, if `digest` is given, so that they are not read again to be cached.
+    """
+    (path, scopes) = target
+    with _phase("read"):
+        data = _read_source(path, prefetcher)
+    imports = extract(path, data)
+    # fmt: off
+    scope_to_indices = dict((scope, _illegal_indices(scope_to_module_to_proj[scope], imports))
+                            for scope in scopes)
+    errs = _errs_of_indices(scope_to_module_to_proj, scope_to_indices, path, imports, _Lines(data))
+    return Ok((path, imports, errs, None if digest is None else digest(data)))
+
+
+def _scan_file_timed(
+    extract: Callable[[Path, bytes], List[_Import]],
+    digest: Optional[Callable[[bytes], str]],
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    target: _Target,
+    prefetcher: Optional[_Prefetcher] = None,
+) -> Tuple[Result[Tuple[Path, List[_Import], List[_IllegalImportDetected], Optional[str]], Exception], float]:
+    """
+    Same as `_scan_file()`, but also returns the seconds it took.  Files are timed where they are processed, i.e. in workers.
+    """
+    start = time.perf_counter()
+    ret = _scan_file(extract, digest, scope_to_module_to_proj, target, prefetcher)
+    return (ret, time.perf_counter() - start)
+
+
+# Per-worker state.  Set once by `_init_worker()` so that module maps are not pickled for each file.
+_worker_scope_to_module_to_proj: Optional[dict[str, dict[str, str]]] = None  # type: ignore  # reason: dict
+_worker_prefetch: int = 0
+
+
+def _init_worker(scope_to_module_to_proj: dict[str, dict[str, str]], prefetch: int) -> None:  # type: ignore  # reason: dict
+    global _worker_scope_to_module_to_proj, _worker_prefetch
+    _worker_scope_to_module_to_proj = scope_to_module_to_proj
+    _worker_prefetch = prefetch
+    _init_worker_profiling()
+
+
+# `fn(scope_to_module_to_proj, target, prefetcher)` applied to files.
+_FileFn = Callable[[dict[str, dict[str, str]], _Target, Optional[_Prefetcher]], T]  # type: ignore  # reason: dict
+
+
+def _call_in_worker(fn: _FileFn[T], targets: List[_Target]) -> List[T]:
+    """
+    Apply `fn` to a chunk of files.  Each worker reads files of its chunk ahead of parsing them.
+    """
+    assert _worker_scope_to_module_to_proj is not None
+    with _prefetching(_worker_prefetch) as prefetcher:
+        # fmt: off
+        return [fn(_worker_scope_to_module_to_proj, target, prefetcher)
+                for target in _prefetch_iter(prefetcher, targets, _target_path)]
+
+
+def _target_path(target: _Target) -> Path:
+    return target[0]
+
+
+def _path_to_read(x: Tuple[_Target, Optional[List[_Import]]]) -> Optional[Path]:
+    """
+    The file of a target looked up in the cache, if it must be read.
+    """
+    (target, imports) = x
+    return target[0] if imports is None else None
+
+
+def _cached_source(path: Path, scope_to_indices: dict[str, List[int]]) -> Sequence[str]:  # type: ignore  # reason: dict
+    """
+    Lines of a file hit in the cache.  The file is read only if it has illegal imports to show.
+    """
+    if all(len(indices) == 0 for indices in scope_to_indices.values()):
+        return []
+    return _Lines(_read_source(path))
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def _make_executor(
+    scope_to_module_to_proj: dict[str, dict[str, str]], jobs: int, prefetch: int = 0  # type: ignore  # reason: dict
+) -> ContextManager[Optional["ProcessPoolExecutor"]]:
+    if jobs <= 1:
+        return nullcontext()
+    # Imported lazily.  It is slow to import and not needed for serial checks.
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(scope_to_module_to_proj, prefetch))
+
+
+def _map_files(
+    fn: _FileFn[T],
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    targets: List[_Target],
+    executor: Optional["ProcessPoolExecutor"],
+    jobs: int,
+    prefetcher: Optional[_Prefetcher] = None,
+) -> List[T]:
+    """
+    Apply `fn(scope_to_module_to_proj, target, prefetcher)` to `targets` and return results in the same order as `targets`.
+
+    If `executor` is given, files are processed by the process pool, whose workers have their own prefetchers.  Largest
+    files are scheduled first to cut tail latency.
+    """
+    if executor is None or len(targets) <= 1:
+        return [fn(scope_to_module_to_proj, target, prefetcher) for target in targets]
+
+    order = sorted(range(len(targets)), key=lambda i: _file_size(targets[i][0]), reverse=True)
+    # Small chunks keep the largest-first order meaningful while amortizing IPC.
+    chunksize = max(1, len(targets) // (jobs * 8))
+    chunks = list(_batched((targets[i] for i in order), chunksize))
+    ys = executor.map(partial(_call_in_worker, fn), chunks)
+    ret: List[Optional[T]] = [None] * len(targets)
+    for (i, y) in zip(order, (y for chunk in ys for y in chunk)):
+        ret[i] = y
+    return ret  # type: ignore  # reason: all filled
+
+
+def _batched(xs: Iterable[T], n: int) -> Iterator[List[T]]:
+    batch = []
+    for x in xs:
+        batch.append(x)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if len(batch) != 0:
+        yield batch
+
+
+def _iter_check_files(
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    targets: Iterable[_Target],
+    jobs: int,
+    cache: Optional["_FileCache"] = None,
+    engine: str = DEFAULT_ENGINE,
+    inventory: Optional["_Inventory"] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+) -> Iterator[Result[Tuple[Path, List[_IllegalImportDetected]], Exception]]:
+    """
+    Check files against the scopes they belong to and yield results in the same order as `targets`.
+
+    Each file is parsed once regardless of the number of its scopes.
+    If `cache` is given, only files whose content changed are parsed.
+    If `inventory` is given, imports of all files are added to it.
+    `targets` is consumed lazily: serially one by one, or in batches if `jobs > 1`.
+    Up to `prefetch` files are read by threads ahead of parsing, by each worker if `jobs > 1`.  0 disables it.  Files hit in
+    `cache` are not read.
+    """
+    fingerprints = {}
+    digest = None
+    if cache is not None:
+        # Imported lazily.  It imports `hashlib` and `tempfile`, which are not needed without `cache`.
+        from .cache import _content_hash, _fingerprint
+
+        digest = _content_hash
+        # fmt: off
+        fingerprints = dict((scope, _fingerprint(module_to_proj))
+                            for (scope, module_to_proj) in scope_to_module_to_proj.items())
+    scan_file = partial(_scan_file_timed, ENGINES[engine], digest)
+
+    # Looked up before prefetching, so that only misses are read ahead.
+    # fmt: off
+    looked_up = ((target, None if cache is None else cache.lookup_imports(target[0]))
+                 for target in targets)
+    # Workers prefetch by themselves.
+    with _make_executor(scope_to_module_to_proj, jobs, prefetch) as executor, _prefetching(0 if jobs > 1 else prefetch) as pf:
+        for batch in _batched(_prefetch_iter(pf, looked_up, _path_to_read), 1 if executor is None else _BATCH_SIZE):
+            path_to_errs = {}
+            todo = []
+            for (target, imports) in batch:
+                (path, scopes) = target
+                if imports is None:
+                    todo.append(target)
+                    continue
+
+                assert cache is not None
+                if inventory is not None:
+                    inventory.add(scopes, imports)
+                scope_to_indices = {}
+                for scope in scopes:
+                    indices = cache.lookup_verdict(path, fingerprints[scope])
+                    if indices is None:
+                        indices = _illegal_indices(scope_to_module_to_proj[scope], imports)
+                        cache.store_verdict(path, fingerprints[scope], indices)
+                    scope_to_indices[scope] = indices
+                path_to_errs[path] = _errs_of_indices(
+                    scope_to_module_to_proj, scope_to_indices, path, imports, _cached_source(path, scope_to_indices)
+                )
+
+            ys = _map_files(scan_file, scope_to_module_to_proj, todo, executor, jobs, pf)
+            for (target, (y, seconds)) in zip(todo, ys):
+                _record_file(target[0], seconds)
+                if y.is_err():
+                    yield Err(y.unwrap_err())
+                    return
+                (path, imports, errs, h) = y.unwrap()
+                if inventory is not None:
+                    inventory.add(target[1], imports)
+                if cache is not None:
+                    assert h is not None
+                    cache.store_imports(path, imports, h)
+                    for scope in target[1]:
+                        indices = _illegal_indices(scope_to_module_to_proj[scope], imports)
+                        cache.store_verdict(path, fingerprints[scope], indices)
+                path_to_errs[path] = errs
+
+            for ((path, _), _) in batch:
+                yield Ok((path, path_to_errs[path]))
+
+
+def _check_files(
+    scope_to_module_to_proj: dict[str, dict[str, str]],  # type: ignore  # reason: dict
+    targets: Iterable[_Target],
+    jobs: int,
+    cache: Optional["_FileCache"] = None,
+    engine: str = DEFAULT_ENGINE,
+) -> Result[List[Tuple[Path, List[_IllegalImportDetected]]], Exception]:
+    """
+    Same as `_iter_check_files()`, but collects results.
+    """
+    ret = []
+    for x in _iter_check_files(scope_to_module_to_proj, targets, jobs, cache, engine):
+        if x.is_err():
+            return Err(x.unwrap_err())
+        ret.append(x.unwrap())
+    return Ok(ret)
+
+
+def _is_under(path: Path, dir_: Path) -> bool:
+    return dir_ == path or dir_ in path.parents
+
+
+def _targets(pyproject: _PyProject, scopes: List[str]) -> Iterator[_Target]:
+    """
+    Files to check with their scopes.  Files are ordered by the first scope they belong to, then sorted.
+
+    Files are yielded while walking, without building the whole list.
+    """
+    ignore = pyproject.ignore_rules()
+    scope_to_dirs = dict((scope, pyproject.scope_target_dirs(scope)) for scope in scopes)
+    for scope in scopes:
+        walks = [_list_all_python_files(dir_, ignore) for dir_ in scope_to_dirs[scope]]
+        prev = None
+        # Each walk is sorted, so merging them keeps the order.
+        for path in heapq.merge(*walks):
+            # Overlapping target directories.
+            if path == prev:
+                continue
+            prev = path
+
+            # fmt: off
+            scopes_ = tuple(s
+                            for s in scopes
+                            if any(_is_under(path, dir_) for dir_ in scope_to_dirs[s]))
+            # Already yielded with an earlier scope.
+            if scopes_[0] != scope:
+                continue
+            yield (path, scopes_)
+
+
+def _normalize_path(path: Path) -> Path:
+    """
+    Make a path comparable with target directories, which are relative to the current directory.
+    """
+    if path.is_absolute():
+        try:
+            return path.relative_to(Path.cwd())
+        except ValueError:
+            return path
+    return Path(os.path.normpath(path))
+
+
+def _targets_of_paths(pyproject: _PyProject, scopes: List[str], paths: Iterable[Path]) -> List[_Target]:
+    """
+    Same as `_targets()`, but only for the given files.  Files out of target directories or ignored are dropped.
+    """
+    ignore = pyproject.ignore_rules()
+    scope_to_dirs = dict((scope, pyproject.scope_target_dirs(scope)) for scope in scopes)
+    targets = []
+    for path in sorted(set(_normalize_path(path) for path in paths)):
+        if (not path.name.endswith(".py")) or (not path.is_file()) or _is_path_ignored(path, ignore):
+            continue
+        # fmt: off
+        scopes_ = tuple(s
+                        for s in scopes
+                        if any(_is_under(path, dir_) for dir_ in scope_to_dirs[s]))
+        if len(scopes_) != 0:
+            targets.append((path, scopes_))
+    # Same order as `_targets()`.
+    targets.sort(key=lambda target: scopes.index(target[1][0]))
+    return targets
+
+
+def _requires_full_scan(pyproject: _PyProject, paths: List[Path]) -> bool:
+    pyproject_path = _normalize_path(pyproject.root() / "pyproject.toml")
+    return any(_normalize_path(path) == pyproject_path for path in paths)
+
+
+def _iter_detect(
+    pyproject: _PyProject,
+    jobs: int = 1,
+    cache: Optional["_FileCache"] = None,
+    engine: str = DEFAULT_ENGINE,
+    paths: Optional[List[Path]] = None,
+    index: Optional[_DistIndex] = None,
+    inventory: Optional["_Inventory"] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    stdlib: Optional[List[str]] = None,
+) -> Result[Iterator[Result[Tuple[Path, List[_IllegalImportDetected]], Exception]], Exception]:
+    """
+    Same as `_detect()`, but yields results as files finish.  If `inventory` is given, imports are counted in it.  If
+    `stdlib` is given, it is used instead of stdlib of the python version.
+
+    Module maps are resolved before returning, so that an error of them is returned before any file is checked.
+    """
+    with _phase("resolve"):
+        scope_to_module_to_proj_ = pyproject.load_scope_module_to_proj(index, stdlib)
+    if scope_to_module_to_proj_.is_err():
+        return Err(scope_to_module_to_proj_.unwrap_err())
+    scope_to_module_to_proj = scope_to_module_to_proj_.unwrap()
+    if inventory is not None:
+        inventory.module_maps = scope_to_module_to_proj
+
+    scopes = list(scope_to_module_to_proj.keys())
+    if (paths is None) or _requires_full_scan(pyproject, paths):
+        targets: Iterable[_Target] = _targets(pyproject, scopes)
+    else:
+        targets = _targets_of_paths(pyproject, scopes, paths)
+    it = _iter_check_files(scope_to_module_to_proj, _phase_iter("walk", targets), jobs, cache, engine, inventory, prefetch)
+    return Ok(_phase_iter("detect", it))
+
+
+def _detect(
+    pyproject: _PyProject,
+    jobs: int = 1,
+    cache: Optional["_FileCache"] = None,
+    engine: str = DEFAULT_ENGINE,
+    paths: Optional[List[Path]] = None,
+    index: Optional[_DistIndex] = None,
+    inventory: Optional["_Inventory"] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    stdlib: Optional[List[str]] = None,
+) -> Result[List[Tuple[Path, List[_IllegalImportDetected]]], Exception]:
+    """
+    Check all scopes of the project in one pass.
+
+    If `paths` is given, only the files are checked, unless `pyproject.toml` is included.
+    """
+    it = _iter_detect(pyproject, jobs, cache, engine, paths, index, inventory, prefetch, stdlib)
+    if it.is_err():
+        return Err(it.unwrap_err())
+
+    ret = []
+    for x in it.unwrap():
+        if x.is_err():
+            return Err(x.unwrap_err())
+        ret.append(x.unwrap())
+    return Ok(ret)
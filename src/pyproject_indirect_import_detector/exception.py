@@ -1,16 +1,33 @@
 __all__ = [
     "InvalidPyProjectError",
     "InvalidPythonVersionError",
+    "WheelNotFoundError",
 ]
 
 
+# Prefixes are added by `__str__()` rather than `__init__()`, as unpickling, e.g. from a worker process, calls `__init__()` with
+# `args` again.
+
+
 class InvalidPyProjectError(Exception):
+    _prefix = "pyproject.toml: "
+
     def __init__(self, message: str) -> None:
-        message = "pyproject.toml: " + message
         super().__init__(message)
 
+    def __str__(self) -> str:
+        return self._prefix + super().__str__()
+
 
 class InvalidPythonVersionError(InvalidPyProjectError):
+    _prefix = InvalidPyProjectError._prefix + '"tool/poetry/dependencies/python": '
+
+
+class WheelNotFoundError(Exception):
+    _prefix = "poetry.lock: "
+
     def __init__(self, message: str) -> None:
-        message = '"tool/poetry/dependencies/python": ' + message
         super().__init__(message)
+
+    def __str__(self) -> str:
+        return self._prefix + super().__str__()
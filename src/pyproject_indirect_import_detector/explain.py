@@ -0,0 +1,141 @@
+from collections import deque
+from typing import Iterable, List, NamedTuple, Optional
+
+from .detector import _IllegalImportDetected
+from .dist_index import _DistIndex, _normalize_name
+
+
+class _Provider(NamedTuple):
+    """
+    The distribution providing a module, and the chain of requirements from a declared dependency to it.  `chain` is empty
+    if no declared dependency requires it.  Shared by violations of the same module.
+
+    Names are normalized, as the ones written in metadata differ between versions of a distribution, e.g. `pillow` since
+    Pillow 10.
+    """
+
+    name: str
+    chain: List[str]
+
+    def describe(self) -> str:
+        """
+        >>> _Provider("pillow", ["actfw-core", "pillow"]).describe()
+        'Provided by pillow, installed as a dependency of actfw-core -> pillow.'
+        >>> _Provider("pillow", ["pillow"]).describe()
+        'Provided by pillow, declared in another group of dependencies.'
+        >>> _Provider("pillow", []).describe()
+        'Provided by pillow.'
+        """
+        if len(self.chain) == 0:
+            return f"Provided by {self.name}."
+        elif len(self.chain) == 1:
+            return f"Provided by {self.name}, declared in another group of dependencies."
+        else:
+            return f"Provided by {self.name}, installed as a dependency of {' -> '.join(self.chain)}."
+
+
+class _Explainer:
+    """
+    Tells which distribution provides a module not in dependencies, and which declared dependency brought it in.
+
+    Both are built once, on the first lookup, as most runs have no violation:
+
+    - A reverse index from dotted prefixes of modules to distributions, over all distributions in the index.
+    - Requirement chains by one breadth-first search over `Requires-Dist` from the declared dependencies, so that a chain is
+      one of the shortest.  Only distributions reachable from them are read.
+
+    So it costs time linear in the size of the environment.  Results are memoized by module.
+    """
+
+    _index: _DistIndex
+    _declared: List[str]
+    _module_to_dists: Optional[dict[str, List[str]]]  # type: ignore  # reason: dict
+    # Distribution -> the one requiring it in the search tree, or `None` for declared ones.
+    _parents: Optional[dict[str, Optional[str]]]  # type: ignore  # reason: dict
+    _chains: dict[str, List[str]]  # type: ignore  # reason: dict
+    _module_to_provider: dict[str, Optional[_Provider]]  # type: ignore  # reason: dict
+
+    def __init__(self, index: _DistIndex, declared: Iterable[str]) -> None:
+        self._index = index
+        self._declared = sorted(set(_normalize_name(name) for name in declared))
+        self._module_to_dists = None
+        self._parents = None
+        self._chains = {}
+        self._module_to_provider = {}
+
+    def _build_reverse_index(self) -> dict[str, List[str]]:  # type: ignore  # reason: dict
+        ret: dict[str, List[str]] = {}  # type: ignore  # reason: dict
+        for name in self._index.names():
+            try:
+                modules = self._index.modules(name)
+            except Exception:
+                # E.g. an egg-info without `top_level.txt` nor `RECORD`.  It cannot be a provider.
+                continue
+            prefixes = set()
+            for module in modules:
+                parts = module.split(".")
+                prefixes.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+            for prefix in prefixes:
+                ret.setdefault(prefix, []).append(name)
+        return ret
+
+    def _build_parents(self) -> dict[str, Optional[str]]:  # type: ignore  # reason: dict
+        ret: dict[str, Optional[str]] = dict((name, None) for name in self._declared)  # type: ignore  # reason: dict
+        queue = deque(self._declared)
+        while len(queue) != 0:
+            name = queue.popleft()
+            try:
+                (_, requires) = self._index.metadata(name)
+            except Exception:
+                # Not installed, e.g. only for other platforms.
+                continue
+            for x in requires:
+                if x not in ret:
+                    ret[x] = name
+                    queue.append(x)
+        return ret
+
+    def _chain(self, name: str) -> List[str]:
+        """
+        Memoized.  Chains share prefixes, so it walks up only to the nearest memoized one.
+        """
+        assert self._parents is not None
+        if name not in self._parents:
+            return []
+
+        path = []
+        x: Optional[str] = name
+        while (x is not None) and (x not in self._chains):
+            path.append(x)
+            x = self._parents[x]
+        chain = [] if x is None else self._chains[x]
+        for y in reversed(path):
+            chain = chain + [y]
+            self._chains[y] = chain
+        return self._chains[name]
+
+    def provider(self, module: str) -> Optional[_Provider]:
+        """
+        The provider of `module`, which is a missing module reported by the detector, e.g. `yaml` or `google.cloud`.  The one
+        with the shortest chain if multiple distributions provide it.
+        """
+        if module in self._module_to_provider:
+            return self._module_to_provider[module]
+
+        if self._module_to_dists is None:
+            self._module_to_dists = self._build_reverse_index()
+        dists = self._module_to_dists.get(module, [])
+        ret = None
+        if len(dists) != 0:
+            if self._parents is None:
+                self._parents = self._build_parents()
+            chains = [(self._chain(name), name) for name in dists]
+            # Reachable ones first.
+            (chain, name) = min(chains, key=lambda x: (len(x[0]) == 0, len(x[0]), x[1]))
+            ret = _Provider(name, chain)
+        self._module_to_provider[module] = ret
+        return ret
+
+    def annotate(self, es: List[_IllegalImportDetected]) -> None:
+        for e in es:
+            e._provider = self.provider(e._module)
@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from .detector import _Import
+from .module_index import _owners
+from .pyproject import _PyProject
+
+
+class _Inventory:
+    """
+    Imports seen by a check, counted by scope.  It is fed the imports the detector extracts anyway, so it costs no extra parse.
+
+    Imports are counted by dotted module, and attributed to projects only when reported, with `module_maps` set by the
+    check.  Names of `from ... import` are kept, as they are the submodules used if the module is a namespace.  Relative
+    imports are not counted.
+    """
+
+    module_maps: Optional[dict[str, dict[str, str]]]  # type: ignore  # reason: dict
+    _scope_to_files: dict[str, int]  # type: ignore  # reason: dict
+    _scope_to_counts: dict[str, dict[str, int]]  # type: ignore  # reason: dict
+    _scope_to_names: dict[str, dict[str, set[str]]]  # type: ignore  # reason: dict
+
+    def __init__(self) -> None:
+        self.module_maps = None
+        self._scope_to_files = {}
+        self._scope_to_counts = {}
+        self._scope_to_names = {}
+
+    def add(self, scopes: Tuple[str, ...], imports: List[_Import]) -> None:
+        for scope in scopes:
+            self._scope_to_files[scope] = self._scope_to_files.get(scope, 0) + 1
+            counts = self._scope_to_counts.setdefault(scope, {})
+            names = self._scope_to_names.setdefault(scope, {})
+            for imp in imports:
+                if not imp.module.startswith("."):
+                    counts[imp.module] = counts.get(imp.module, 0) + 1
+                    if len(imp.names) != 0:
+                        names.setdefault(imp.module, set()).update(imp.names)
+
+    def _project_counts(self, scope: str) -> dict[str, int]:  # type: ignore  # reason: dict
+        assert self.module_maps is not None
+        module_to_proj = self.module_maps[scope]
+        names = self._scope_to_names.get(scope, {})
+        ret: dict[str, int] = {}  # type: ignore  # reason: dict
+        for (module, count) in self._scope_to_counts.get(scope, {}).items():
+            # Missing ones are reported as violations.
+            for proj in _owners(module_to_proj, module, names.get(module, ())):
+                ret[proj] = ret.get(proj, 0) + count
+        return ret
+
+    def used_projects(self) -> set[str]:  # type: ignore  # reason: set
+        assert self.module_maps is not None
+        ret = set()
+        for scope in self.module_maps:
+            ret.update(self._project_counts(scope))
+        return ret
+
+    def report(self, unused: List[Tuple[str, str]]) -> dict[str, Any]:  # type: ignore  # reason: dict
+        """
+        Counts of imports by top-level module and by project for each scope, as a JSON-serializable dict.  Most frequent
+        first.
+        """
+        assert self.module_maps is not None
+        scopes = {}
+        for scope in self.module_maps:
+            top_level: dict[str, int] = {}  # type: ignore  # reason: dict
+            for (module, count) in self._scope_to_counts.get(scope, {}).items():
+                m = module.split(".")[0]
+                top_level[m] = top_level.get(m, 0) + count
+            scopes[scope] = {
+                "files": self._scope_to_files.get(scope, 0),
+                "modules": _sorted_counts(top_level),
+                "projects": _sorted_counts(self._project_counts(scope)),
+            }
+        # fmt: off
+        return {
+            "scopes": scopes,
+            "unused": [{"project": proj, "table": table} for (proj, table) in unused],
+        }
+
+    def dump(self, path: Path, unused: List[Tuple[str, str]]) -> None:
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.report(unused), f, indent=2)
+            f.write("\n")
+
+
+def _sorted_counts(counts: dict[str, int]) -> dict[str, int]:  # type: ignore  # reason: dict
+    return dict(sorted(counts.items(), key=lambda x: (-x[1], x[0])))
+
+
+def _unused_dependencies(pyproject: _PyProject, inventory: _Inventory) -> List[Tuple[str, str]]:
+    """
+    Declared dependencies no file imports, with their tables.  Projects in `exclude_projects` and `ignore_unused` are not
+    reported, e.g. plugins and tools which are not imported.
+    """
+    used = inventory.used_projects()
+    ignored = set(pyproject._exclude_projects()) | set(pyproject._ignore_unused())
+    # fmt: off
+    return [(proj, table)
+            for (proj, table) in pyproject.declared_dependencies()
+            if (proj not in used) and (proj not in ignored)]
@@ -1,88 +1,530 @@
+# Modules only for some modes, e.g. `daemon`, `monorepo` and `vcs`, are imported where they are used, so that startup is fast,
+# e.g. for pre-commit.  See `tests/unit_test/test_startup.py`.
+
 import argparse
-import ast
 import sys
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Optional, Tuple
-
-from termcolor import colored
+from typing import IO, TYPE_CHECKING, ContextManager, List, Optional, Tuple
 
-from .detector import _Detector, _IllegalImportDetected, _read_file
+from .constants import DEFAULT_CACHE_DIR, DEFAULT_SOCKET_PATH
+from .detector import _IllegalImportDetected
+from .dist_index import _DistIndex, _search_paths_of
+from .engine import DEFAULT_ENGINE, ENGINES, _default_jobs, _iter_detect
+from .profiling import DEFAULT_TOP_FILES, Profiler, _phase, _profiling
 from .pyproject import _PyProject
+from .reader import DEFAULT_PREFETCH
+from .reporters import (
+    DEFAULT_FORMAT,
+    DEFAULT_SUMMARY_LOCATIONS,
+    FORMATS,
+    SUMMARY_FORMATS,
+    UNUSED_FORMATS,
+    _make_reporter,
+    _TextReporter,
+    _write_report,
+)
 from .result import Err, Ok, Result
-from .util import _flatten, _list_all_python_files
 
+if TYPE_CHECKING:
+    from .cache import _FileCache
+    from .dist_cache import _DistCache
+    from .explain import _Explainer
+    from .monorepo import _ProjectResult
+    from .stdlib_matrix import _StdlibMatrix
 
-def _process_file(
-    module_to_proj: dict[str, str], path: Path  # type: ignore  # reason: dict
-) -> Result[Tuple[Path, List[_IllegalImportDetected]], Exception]:
-    s = _read_file(path)
-    tree = ast.parse(s)
-    s_ = s.split("\n")
-    detector = _Detector(module_to_proj, path, s_, tree)
-    return Ok((path, detector.detect()))
 
+def _report(xs: List[Tuple[Path, List[_IllegalImportDetected]]], verbose: bool) -> bool:
+    return _write_report(_TextReporter(sys.stdout, verbose), xs)
 
-def _detect(pyproject: _PyProject, dev: bool) -> Result[List[Tuple[Path, List[_IllegalImportDetected]]], Exception]:
-    module_to_proj_ = pyproject.load_module_to_proj(dev)
-    if module_to_proj_.is_err():
-        return Err(module_to_proj_.unwrap_err())
-    module_to_proj = module_to_proj_.unwrap()
 
-    paths = pyproject.target_dirs(dev)
-    paths = _flatten([_list_all_python_files(path) for path in paths])
-    paths.sort()
+def _open_output(args: argparse.Namespace) -> ContextManager[IO[str]]:
+    if args.output is None:
+        return nullcontext(sys.stdout)
+    return open(args.output, "w")
 
-    ret = []
-    for path in paths:
-        x = _process_file(module_to_proj, path)
-        if x.is_ok():
-            ret.append(x.unwrap())
+
+def _report_projects(results: List["_ProjectResult"], verbose: bool) -> int:
+    """
+    Print a combined report and return the exit code.
+    """
+    from termcolor import colored
+
+    from .monorepo import EXIT_ERROR, EXIT_NG, EXIT_OK
+
+    for result in results:
+        print(colored(f"==> {result.root}", attrs=["bold"]))
+        if result.result.is_err():
+            print(f"{colored('Error', 'red')}: {result.result.unwrap_err()}")
+            print("")
         else:
-            return Err(x.unwrap_err())
-    return Ok(ret)
+            _report(result.result.unwrap(), verbose)
+
+    names = {EXIT_OK: colored("OK", "green"), EXIT_NG: colored("NG", "red"), EXIT_ERROR: colored("ERROR", "red")}
+    print(f"Checked {len(results)} projects:")
+    for result in results:
+        print(f"    {names[result.exit_code()]} (exit {result.exit_code()}) {result.root}")
+
+    return max([result.exit_code() for result in results] + [EXIT_OK])
+
+
+def _paths_to_check(args: argparse.Namespace) -> Result[Optional[List[Path]], Exception]:
+    """
+    Files given by arguments, stdin or git.  `None` means all files.
+    """
+    if len(args.paths) == 0 and (not args.stdin) and (args.changed_since is None):
+        return Ok(None)
+
+    paths = list(args.paths)
+    if args.stdin:
+        # fmt: off
+        paths += [Path(x)
+                  for x in sys.stdin.buffer.read().decode().split("\0")
+                  if x.strip() != ""]
+    if args.changed_since is not None:
+        from .vcs import _changed_since
+
+        changed = _changed_since(args.changed_since)
+        if changed.is_err():
+            return Err(changed.unwrap_err())
+        paths += changed.unwrap()
+    return Ok(paths)
+
+
+def _may_be_checked(path: Path) -> bool:
+    return path.name.endswith(".py") or path.name == "pyproject.toml"
+
+
+def _load_dist_cache(args: argparse.Namespace) -> Optional["_DistCache"]:
+    if args.dist_cache is None:
+        return None
+    from .dist_cache import _default_dist_cache_dir, _DistCache
+
+    with _phase("load"):
+        return _DistCache.load(_default_dist_cache_dir() if args.dist_cache == "" else Path(args.dist_cache))
+
+
+def _load_file_cache(args: argparse.Namespace, root: Path) -> Optional["_FileCache"]:
+    if args.cache is None:
+        return None
+    from .cache import _FileCache
+
+    return _FileCache.load(root / args.cache)
+
+
+def _load_stdlib_matrix(args: argparse.Namespace, pyproject: _PyProject) -> Optional["_StdlibMatrix"]:
+    if args.python_matrix is None:
+        return None
+    from .stdlib_matrix import MATRIX_VERSIONS, _StdlibMatrix
+
+    if args.python_matrix == "":
+        versions_ = pyproject.python_versions(MATRIX_VERSIONS)
+        if versions_.is_err():
+            raise versions_.unwrap_err()
+        versions = versions_.unwrap()
+    else:
+        versions = args.python_matrix.split(",")
+    return _StdlibMatrix(versions)
+
+
+def _make_explainer(index: _DistIndex, pyproject: _PyProject) -> "_Explainer":
+    # Imported lazily.  Only needed if there is a violation.
+    from .explain import _Explainer
+
+    return _Explainer(index, pyproject.dependencies(True))
+
+
+def _search_paths(args: argparse.Namespace) -> Optional[List[str]]:
+    with _phase("load"):
+        return _search_paths_of(args.site_packages, args.python)
 
 
 def _main_aux(args: argparse.Namespace, root: Path) -> None:
-    pyproject_ = _PyProject.load(root)
+    if args.client is not None:
+        from .daemon import _request
+
+        try:
+            xs = _request(root / args.client)
+        except OSError as err:
+            print(f"Cannot connect to daemon ({err}).  Checking directly.", file=sys.stderr)
+        else:
+            with _open_output(args) as out:
+                ok = _write_report(_make_reporter(args.format, out, args.v, args.summary), xs)
+            if not ok:
+                sys.exit(1)
+            return
+
+    if (args.monorepo is not None) or (args.manifest is not None):
+        from .monorepo import EXIT_OK, _check_projects, _discover_projects, _read_manifest
+
+        roots = _discover_projects(args.monorepo) if args.manifest is None else _read_manifest(args.manifest)
+        jobs = _default_jobs() if args.jobs is None else args.jobs
+        dist_cache = _load_dist_cache(args)
+        try:
+            code = _report_projects(_check_projects(roots, jobs, args.engine, dist_cache, _search_paths(args)), args.v)
+        finally:
+            if dist_cache is not None:
+                dist_cache.save()
+        if code != EXIT_OK:
+            sys.exit(code)
+        return
+
+    if args.watch or (args.daemon is not None):
+        from .daemon import _Daemon, _serve
+
+        daemon = _Daemon(root, args.engine, args.poll, _search_paths(args))
+        if args.daemon is not None:
+            _serve(daemon, root / args.daemon)
+        else:
+            daemon.watch(lambda xs: _report(xs, args.v))
+        return
+
+    paths_ = _paths_to_check(args)
+    if paths_.is_err():
+        raise paths_.unwrap_err()
+    paths = paths_.unwrap()
+
+    if (paths is not None) and not any(_may_be_checked(path) for path in paths):
+        # E.g. a commit without python files.  Skip loading `pyproject.toml` and resolving distributions.
+        with _open_output(args) as out:
+            _make_reporter(args.format, out, args.v, args.summary).finish()
+        return
+
+    with _phase("load"):
+        pyproject_ = _PyProject.load(root)
     if pyproject_.is_err():
         raise pyproject_.unwrap_err()
     pyproject = pyproject_.unwrap()
 
-    res = _detect(pyproject, False)
-    res_dev = _detect(pyproject, True)
-    if res.is_err():
-        raise res.unwrap_err()
-    elif res_dev.is_err():
-        raise res_dev.unwrap_err()
+    index: Optional[_DistIndex] = None
+    dist_cache = _load_dist_cache(args)
+    if len(args.wheelhouse) != 0:
+        from .wheelhouse import _WheelIndex
+
+        with _phase("load"):
+            lockfile = root / "poetry.lock" if args.lockfile is None else args.lockfile
+            index = _WheelIndex.load(lockfile, args.wheelhouse)
     else:
-        xs = _flatten([res.unwrap(), res_dev.unwrap()])
-        ok = all([len(es) == 0 for (_, es) in xs])
-        ok_or_ng = colored("OK", "green") if ok else colored("NG", "red")
-        print(f"Checking {len(xs)} files... {ok_or_ng}")
-        print("")
+        # Kept to explain violations.
+        index = _DistIndex.scan(_search_paths(args), dist_cache)
+
+    inventory = None
+    if args.unused or (args.inventory is not None):
+        from .inventory import _Inventory
+
+        inventory = _Inventory()
 
-        for (path, es) in xs:
-            if len(es) == 0:
-                if args.v:
-                    print(f"{colored('[OK]', 'green')} {path}")
-            else:
-                if args.v:
-                    print(f"{colored('[NG]', 'red')} {path}")
-                    print("")
+    stdlib_matrix = _load_stdlib_matrix(args, pyproject)
+    jobs = _default_jobs() if args.jobs is None else args.jobs
+    cache = _load_file_cache(args, root)
+    try:
+        stdlib = None if stdlib_matrix is None else stdlib_matrix.common
+        it = _iter_detect(pyproject, jobs, cache, args.engine, paths, index, inventory, args.prefetch, stdlib)
+        if it.is_err():
+            raise it.unwrap_err()
 
-                for e in es:
-                    print(e)
+        with _open_output(args) as out:
+            reporter = _make_reporter(args.format, out, args.v, args.summary)
+            # Results are written as files finish, so that memory does not grow with the number of violations.
+            explainer: Optional["_Explainer"] = None
+            for x in it.unwrap():
+                if x.is_err():
+                    raise x.unwrap_err()
+                (path, es) = x.unwrap()
+                if len(es) != 0:
+                    with _phase("explain"):
+                        if explainer is None:
+                            explainer = _make_explainer(index, pyproject)
+                        explainer.annotate(es)
+                        if stdlib_matrix is not None:
+                            stdlib_matrix.annotate(es)
+                with _phase("report"):
+                    reporter.file(path, es)
+            with _phase("report"):
+                if inventory is not None:
+                    from .inventory import _unused_dependencies
 
-        if not ok:
-            sys.exit(1)
+                    unused = _unused_dependencies(pyproject, inventory)
+                    if args.unused:
+                        reporter.unused(unused)
+                    if args.inventory is not None:
+                        inventory.dump(args.inventory, unused)
+                ok = reporter.finish()
+    finally:
+        if cache is not None:
+            cache.save()
+        if dist_cache is not None:
+            dist_cache.save()
+
+    # Keep machine readable output intact.
+    stats_out = sys.stdout if args.format == "text" and args.output is None else sys.stderr
+    if args.v and (cache is not None):
+        print(cache.stats(), file=stats_out)
+    if args.v and (dist_cache is not None):
+        print(dist_cache.stats(), file=stats_out)
+
+    if not ok:
+        sys.exit(1)
+
+
+# Values `-v` took before it became a flag.
+_VERBOSE_VALUES = {"True": True, "true": True, "False": False, "false": False}
+
+
+def _compat_verbose_args(argv: List[str]) -> List[str]:
+    """
+    Rewrite `-v True` and `-v False`, accepted before `-v` became a flag, to the flag or nothing.
+
+    >>> _compat_verbose_args(["-v", "True", "foo.py"])
+    ['-v', 'foo.py']
+    >>> _compat_verbose_args(["-v", "False", "-v", "foo.py"])
+    ['-v', 'foo.py']
+    """
+    ret = []
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--":
+            # Paths follow.
+            ret += argv[i:]
+            break
+        if (argv[i] == "-v") and (i + 1 < len(argv)) and (argv[i + 1] in _VERBOSE_VALUES):
+            if _VERBOSE_VALUES[argv[i + 1]]:
+                ret.append("-v")
+            i += 2
+        else:
+            ret.append(argv[i])
+            i += 1
+    return ret
 
 
 def _main(root: Optional[Path] = None) -> None:
     parser = argparse.ArgumentParser(description="Detect indirect import")
-    parser.add_argument("-v", type=bool, nargs="?", const=True, default=False, help="Make output verbose.")
-    args = parser.parse_args()
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="*",
+        help="Check only the files.  All files are checked if `pyproject.toml` is included.",
+    )
+    # Do not take a value, so that `-v` followed by paths works.  `-v True` is still accepted.  See `_compat_verbose_args()`.
+    parser.add_argument("-v", action="store_true", help="Make output verbose.")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Number of worker processes. (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        default=None,
+        help=f"Cache extracted imports and verdicts in the directory. (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--dist-cache",
+        metavar="DIR",
+        nargs="?",
+        const="",
+        default=None,
+        help="Cache modules of distributions in the directory shared by all projects of the user, keyed by name and version.  "
+        "Manage it by `python -m pyproject_indirect_import_detector.dist_cache`. "
+        "(default: $XDG_CACHE_HOME/pyproject-indirect-import-detector)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=list(ENGINES.keys()),
+        default=DEFAULT_ENGINE,
+        help="How to find imports. `tokenize` only scans import statements, and `pyc` reads fresh `.pyc` in `__pycache__`.  Both "
+        f"fall back to `ast`, and `pyc` is the same as `ast` before python 3.11. (default: {DEFAULT_ENGINE})",
+    )
+    parser.add_argument(
+        "--prefetch",
+        metavar="N",
+        type=int,
+        default=DEFAULT_PREFETCH,
+        help="Number of files read by threads ahead of parsing, per worker.  Helps on slow file systems, e.g. NFS.  0 disables it. "
+        f"(default: {DEFAULT_PREFETCH})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=DEFAULT_FORMAT,
+        help=f"Output format.  `jsonl`, `sarif` and `junit` are for machines. (default: {DEFAULT_FORMAT})",
+    )
+    parser.add_argument(
+        "--summary",
+        metavar="K",
+        type=int,
+        nargs="?",
+        const=DEFAULT_SUMMARY_LOCATIONS,
+        default=None,
+        help=f"Report each missing module with its count and the first K locations. (default: {DEFAULT_SUMMARY_LOCATIONS})",
+    )
+    parser.add_argument(
+        "--python-matrix",
+        metavar="VERSIONS",
+        nargs="?",
+        const="",
+        default=None,
+        help="Check against stdlib of several python versions in one run, e.g. `3.8,3.12`, and tell the versions a module is "
+        "not in stdlib of.  Without VERSIONS, the ones `tool.poetry.dependencies.python` allows, from 3.8 to 3.13.",
+    )
+    parser.add_argument(
+        "--unused",
+        action="store_true",
+        help="Also report declared dependencies no file imports.  Checks all files.",
+    )
+    parser.add_argument(
+        "--inventory",
+        metavar="FILE",
+        type=Path,
+        default=None,
+        help="Write counts of imports by module and by project for each scope, and unused dependencies, as JSON.  "
+        "Checks all files.",
+    )
+    parser.add_argument("-o", "--output", metavar="FILE", type=Path, default=None, help="Write the report to the file.")
+    parser.add_argument("--stdin", action="store_true", help="Check only the files given by stdin, delimited by NUL.")
+    parser.add_argument(
+        "--changed-since", metavar="REF", default=None, help="Check only the files changed since the git revision."
+    )
+    parser.add_argument(
+        "--monorepo",
+        metavar="ROOT",
+        type=Path,
+        nargs="?",
+        const=Path(),
+        default=None,
+        help="Check all poetry projects under the directory. (default: current directory)",
+    )
+    parser.add_argument(
+        "--manifest", metavar="FILE", type=Path, default=None, help="Check the projects listed in the file, one per line."
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        metavar="DIR",
+        type=Path,
+        action="append",
+        default=[],
+        help="Resolve dependencies from wheels in the directory, searched recursively, at versions pinned by the lock file, "
+        "instead of installed distributions.  Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--lockfile",
+        metavar="FILE",
+        type=Path,
+        default=None,
+        help="The lock file for `--wheelhouse`. (default: poetry.lock of the project)",
+    )
+    parser.add_argument(
+        "--site-packages",
+        metavar="DIR",
+        type=Path,
+        action="append",
+        default=[],
+        help="Resolve dependencies from distributions in the directory, e.g. site-packages of a virtualenv, instead of the "
+        "ones of this python.  Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--python",
+        metavar="EXE",
+        default=None,
+        help="Resolve dependencies from distributions on `sys.path` of the interpreter, e.g. `.venv/bin/python`, instead of "
+        "the ones of this python.  It is run once to get the path.",
+    )
+    parser.add_argument("--watch", action="store_true", help="Check again whenever files change.")
+    parser.add_argument(
+        "--daemon",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_SOCKET_PATH,
+        default=None,
+        help=f"Run as a daemon watching files and serving results over the Unix socket. (default: {DEFAULT_SOCKET_PATH})",
+    )
+    parser.add_argument(
+        "--client",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_SOCKET_PATH,
+        default=None,
+        help="Get results from the daemon listening on the Unix socket.  Checks directly if no daemon is running.",
+    )
+    parser.add_argument("--poll", action="store_true", help="Watch files by polling instead of inotify.")
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        type=Path,
+        default=None,
+        help="Write times of phases, slowest files, times to resolve distributions and peak memory as JSON.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        metavar="N",
+        type=int,
+        default=DEFAULT_TOP_FILES,
+        help=f"Number of slowest files in `--profile`. (default: {DEFAULT_TOP_FILES})",
+    )
+    parser.add_argument(
+        "--profile-pstats", metavar="FILE", type=Path, default=None, help="Write cProfile stats, readable by `pstats`."
+    )
+    args = parser.parse_args(_compat_verbose_args(sys.argv[1:]))
+    if (args.summary is not None) and (args.format not in SUMMARY_FORMATS):
+        parser.error(f"--summary supports only --format {{{','.join(SUMMARY_FORMATS)}}}")
+    if (args.unused or (args.inventory is not None)) and (len(args.paths) != 0 or args.stdin or args.changed_since is not None):
+        parser.error("--unused and --inventory check all files, and cannot be used with paths, --stdin or --changed-since")
+    if args.unused and (args.format not in UNUSED_FORMATS):
+        parser.error(f"--unused supports only --format {{{','.join(UNUSED_FORMATS)}}}")
+    modes = [args.monorepo is not None, args.manifest is not None, args.watch, args.daemon is not None]
+    if (len(args.paths) != 0 or args.stdin or args.changed_since is not None) and (any(modes) or args.client is not None):
+        parser.error(
+            "paths, --stdin and --changed-since are not supported with --monorepo, --manifest, --watch, --daemon or --client"
+        )
+    if ((args.format != DEFAULT_FORMAT) or (args.output is not None) or (args.summary is not None)) and any(modes):
+        parser.error("--format, --output and --summary are not supported with --monorepo, --manifest, --watch or --daemon")
+    if (len(args.wheelhouse) != 0) and any(modes):
+        parser.error("--wheelhouse is not supported with --monorepo, --manifest, --watch or --daemon")
+    if (args.unused or (args.inventory is not None)) and (any(modes) or args.client is not None):
+        parser.error("--unused and --inventory are not supported with --monorepo, --manifest, --watch, --daemon or --client")
+    if (len(args.wheelhouse) != 0) and ((len(args.site_packages) != 0) or (args.python is not None)):
+        parser.error("--wheelhouse is not supported with --site-packages or --python")
+    if (args.lockfile is not None) and (len(args.wheelhouse) == 0):
+        parser.error("--lockfile requires --wheelhouse")
+    if args.prefetch < 0:
+        parser.error("--prefetch must be 0 or more")
+    if (args.python_matrix is not None) and (any(modes) or args.client is not None):
+        parser.error("--python-matrix is not supported with --monorepo, --manifest, --watch, --daemon or --client")
+    if args.python_matrix:
+        from .stdlib_matrix import MATRIX_VERSIONS
+
+        unknown = [v for v in args.python_matrix.split(",") if v not in MATRIX_VERSIONS]
+        if len(unknown) != 0:
+            parser.error(f"--python-matrix supports only {','.join(MATRIX_VERSIONS)}, but got {','.join(unknown)}")
 
     if root is None:
         root = Path()
 
-    _main_aux(args, root)
+    if (args.profile is None) and (args.profile_pstats is None):
+        _main_aux(args, root)
+    else:
+        _main_profiled(args, root)
+
+
+def _main_profiled(args: argparse.Namespace, root: Path) -> None:
+    """
+    Same as `_main_aux()`, but writes metrics even if it exits with an error.
+    """
+    profiler = Profiler()
+    import cProfile
+
+    cprofile = None if args.profile_pstats is None else cProfile.Profile()
+    try:
+        with _profiling(profiler):
+            if cprofile is not None:
+                cprofile.enable()
+            try:
+                _main_aux(args, root)
+            finally:
+                if cprofile is not None:
+                    cprofile.disable()
+    finally:
+        if args.profile is not None:
+            profiler.dump(args.profile, args.profile_top)
+        if cprofile is not None:
+            cprofile.dump_stats(args.profile_pstats)
@@ -0,0 +1,124 @@
+from typing import Iterable, List, Optional, Tuple
+
+# Project of a namespace which no distribution provides as a whole, e.g. `google` of `google.protobuf` and
+# `google.cloud.storage`.  Importing a namespace itself is legal, but its submodules are looked up deeper.
+NAMESPACE = "<namespace>"
+
+
+def _add_module(module_to_proj: dict[str, str], module: str, proj: str) -> None:  # type: ignore  # reason: dict
+    """
+    Add a dotted module provided by `proj`.  Its parents are added as namespaces unless provided by some project.
+
+    `module_to_proj` is a trie flattened into a dict keyed by dotted prefixes.
+
+    >>> d = {}
+    >>> _add_module(d, "google.protobuf", "protobuf")
+    >>> d
+    {'google': '<namespace>', 'google.protobuf': 'protobuf'}
+    >>> _add_module(d, "google", "google-legacy")
+    >>> d["google"]
+    'google-legacy'
+    """
+    prefix = ""
+    for part in module.split(".")[:-1]:
+        prefix = part if prefix == "" else prefix + "." + part
+        module_to_proj.setdefault(prefix, NAMESPACE)
+    module_to_proj[module] = proj
+
+
+def _build_module_to_proj(proj_modules: Iterable[Tuple[str, List[str]]]) -> dict[str, str]:  # type: ignore  # reason: dict
+    """
+    Build `module_to_proj` from projects and their modules.  The last one wins as a plain dict.
+    """
+    ret: dict[str, str] = {}  # type: ignore  # reason: dict
+    for (proj, modules) in proj_modules:
+        for module in modules:
+            _add_module(ret, module, proj)
+    return ret
+
+
+def _missing_module(
+    module_to_proj: dict[str, str], module: str, names: Tuple[str, ...] = ()  # type: ignore  # reason: dict
+) -> Optional[str]:
+    """
+    The prefix of an absolute `module` not provided by any project, or `None` if provided.  If `module` is a namespace,
+    `names` imported from it are its submodules, and looked up too.
+
+    It costs time proportional to the depth of `module`, and stops at the first prefix provided by a project.
+
+    >>> d = {"os": "<std>", "google": NAMESPACE, "google.protobuf": "protobuf"}
+    >>> _missing_module(d, "os.path") is None
+    True
+    >>> _missing_module(d, "google.protobuf.message") is None
+    True
+    >>> _missing_module(d, "google") is None
+    True
+    >>> _missing_module(d, "google.cloud.storage")
+    'google.cloud'
+    >>> _missing_module(d, "yaml.loader")
+    'yaml'
+    >>> _missing_module(d, "google", ("protobuf",)) is None
+    True
+    >>> _missing_module(d, "google", ("protobuf", "cloud"))
+    'google.cloud'
+    """
+    prefix = ""
+    for part in module.split("."):
+        prefix = part if prefix == "" else prefix + "." + part
+        proj = module_to_proj.get(prefix)
+        if proj is None:
+            return prefix
+        elif proj != NAMESPACE:
+            return None
+    # A namespace itself, e.g. `from google import protobuf`.
+    for name in names:
+        m = _missing_module(module_to_proj, module + "." + name)
+        if m is not None:
+            return m
+    return None
+
+
+def _owner(module_to_proj: dict[str, str], module: str) -> Optional[str]:  # type: ignore  # reason: dict
+    """
+    The project providing an absolute `module`, or `None` if not provided or a namespace.
+
+    >>> d = {"os": "<std>", "google": NAMESPACE, "google.protobuf": "protobuf"}
+    >>> _owner(d, "google.protobuf.message")
+    'protobuf'
+    >>> _owner(d, "google") is None
+    True
+    >>> _owner(d, "yaml") is None
+    True
+    """
+    prefix = ""
+    for part in module.split("."):
+        prefix = part if prefix == "" else prefix + "." + part
+        proj = module_to_proj.get(prefix)
+        if proj is None:
+            return None
+        elif proj != NAMESPACE:
+            return proj
+    return None
+
+
+def _owners(module_to_proj: dict[str, str], module: str, names: Iterable[str] = ()) -> List[str]:  # type: ignore  # reason: dict
+    """
+    Projects providing an absolute `module`.  If it is a namespace, the ones providing `names` imported from it.
+
+    >>> d = {"google": NAMESPACE, "google.protobuf": "protobuf", "google.cloud": NAMESPACE, "google.cloud.storage": "gcs"}
+    >>> _owners(d, "google.protobuf.message")
+    ['protobuf']
+    >>> _owners(d, "google", ["protobuf", "cloud"])
+    ['protobuf']
+    >>> _owners(d, "google.cloud", ["storage", "missing"])
+    ['gcs']
+    """
+    proj = _owner(module_to_proj, module)
+    if proj is not None:
+        return [proj]
+    if _missing_module(module_to_proj, module) is not None:
+        return []
+    # fmt: off
+    return sorted(set(proj
+                      for proj in (_owner(module_to_proj, module + "." + name) for name in names)
+                      if proj is not None))
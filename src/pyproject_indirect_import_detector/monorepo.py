@@ -0,0 +1,161 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import toml
+
+from .detector import _IllegalImportDetected
+from .dist_index import _DistIndex
+from .domain import _stdlib_modules, _stdlib_tables
+from .engine import DEFAULT_ENGINE, _detect
+from .pyproject import _PyProject
+from .result import Err, Ok, Result
+from .util import _dict_rec_get
+from .walker import DEFAULT_EXCLUDE_DIRS
+
+if TYPE_CHECKING:
+    from .dist_cache import _DistCache
+
+EXIT_OK = 0
+EXIT_NG = 1
+EXIT_ERROR = 2
+
+
+class _ProjectResult:
+    root: Path
+    result: Result[List[Tuple[Path, List[_IllegalImportDetected]]], Exception]
+
+    def __init__(self, root: Path, result: Result[List[Tuple[Path, List[_IllegalImportDetected]]], Exception]) -> None:
+        self.root = root
+        self.result = result
+
+    def exit_code(self) -> int:
+        if self.result.is_err():
+            return EXIT_ERROR
+        elif all(len(es) == 0 for (_, es) in self.result.unwrap()):
+            return EXIT_OK
+        else:
+            return EXIT_NG
+
+
+def _is_poetry_project(t: dict) -> bool:  # type: ignore  # reason: dict
+    return _dict_rec_get(t, ["tool", "poetry"], None) is not None
+
+
+def _discover_projects(root: Path) -> List[Path]:
+    """
+    Directories under `root` containing `pyproject.toml` of poetry.
+    """
+    ret = []
+    for (d, dirs, fs) in os.walk(root):
+        # fmt: off
+        dirs[:] = sorted(x
+                         for x in dirs
+                         if (x not in DEFAULT_EXCLUDE_DIRS) and (not x.startswith(".")))
+        if "pyproject.toml" in fs:
+            try:
+                t = toml.load(os.path.join(d, "pyproject.toml"))
+            except (OSError, toml.TomlDecodeError):
+                # Reported when it is loaded.
+                ret.append(Path(d))
+                continue
+            if _is_poetry_project(t):
+                ret.append(Path(d))
+    return sorted(ret)
+
+
+def _read_manifest(path: Path) -> List[Path]:
+    """
+    Read project directories, one per line.  Relative paths are relative to the manifest.  Lines starting with `#` are ignored.
+    """
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+    # fmt: off
+    return [path.parent / line.strip()
+            for line in lines
+            if line.strip() != "" and not line.strip().startswith("#")]
+
+
+def _load_project(root: Path) -> Result[_PyProject, Exception]:
+    try:
+        res = _PyProject.load(root)
+    except (OSError, toml.TomlDecodeError) as err:
+        return Err(err)
+    if res.is_err():
+        return Err(res.unwrap_err())
+    return Ok(res.unwrap())
+
+
+def _check_project(pyproject: _PyProject, engine: str, index: _DistIndex) -> _ProjectResult:
+    try:
+        res = _detect(pyproject, 1, None, engine, None, index)
+    except Exception as err:
+        # E.g. a dependency is not installed.  Other projects are still checked.
+        res = Err(err)
+    return _ProjectResult(pyproject.root(), res)
+
+
+# Per-worker state.  Set once by `_init_worker()`.
+_worker_index: Optional[_DistIndex] = None
+
+
+def _init_worker(index: _DistIndex, stdlib_tables: dict[str, List[str]]) -> None:  # type: ignore  # reason: dict
+    global _worker_index
+    _worker_index = index
+    _stdlib_tables.update(stdlib_tables)
+
+
+def _check_project_in_worker(root: Path, engine: str) -> _ProjectResult:
+    assert _worker_index is not None
+    # `_PyProject` is loaded again in the worker, as tables parsed by `toml` cannot be pickled.
+    return _check_project(_load_project(root).unwrap(), engine, _worker_index)
+
+
+def _check_projects(
+    roots: List[Path],
+    jobs: int,
+    engine: str = DEFAULT_ENGINE,
+    dist_cache: Optional["_DistCache"] = None,
+    search_paths: Optional[List[str]] = None,
+) -> List[_ProjectResult]:
+    """
+    Check projects in parallel.  All projects share one site-packages index and one stdlib table per python version.
+    Distributions are searched in `search_paths`, or `sys.path` if `None`.
+
+    Results are in the same order as `roots`.
+    """
+    index = _DistIndex.scan(search_paths, dist_cache)
+
+    loaded = [(root, _load_project(root)) for root in roots]
+    pyprojects = [res.unwrap() for (_, res) in loaded if res.is_ok()]
+    for pyproject in pyprojects:
+        version = pyproject.base_python_version()
+        if version.is_ok():
+            try:
+                _stdlib_modules(version.unwrap())
+            except ValueError:
+                # Reported when it is checked.
+                pass
+        # Resolved here rather than in workers, so that a distribution shared by projects is read once, and `dist_cache`
+        # gets all of them.
+        for proj in pyproject.dependencies(True):
+            try:
+                index.modules(proj)
+            except Exception:
+                # Reported when it is checked.
+                pass
+
+    if jobs <= 1 or len(pyprojects) <= 1:
+        results = [_check_project(pyproject, engine, index) for pyproject in pyprojects]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(pyprojects)), initializer=_init_worker, initargs=(index, dict(_stdlib_tables))
+        ) as executor:
+            roots_ok = [pyproject.root() for pyproject in pyprojects]
+            results = list(executor.map(_check_project_in_worker, roots_ok, [engine] * len(roots_ok)))
+
+    it = iter(results)
+    # fmt: off
+    return [next(it) if res.is_ok() else _ProjectResult(root, Err(res.unwrap_err()))
+            for (root, res) in loaded]
@@ -0,0 +1,232 @@
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TOP_FILES = 10
+
+
+class ProfileHook:
+    """
+    Callbacks to collect metrics in the same process.  Override methods of interest.
+    """
+
+    def on_phase(self, name: str, wall: float, cpu: float) -> None:
+        pass
+
+    def on_file(self, path: Path, seconds: float) -> None:
+        pass
+
+    def on_distribution(self, name: str, seconds: float) -> None:
+        pass
+
+    def on_finish(self, report: dict[str, Any]) -> None:  # type: ignore  # reason: dict
+        pass
+
+
+class Profiler:
+    """
+    Collects times of phases, files and distributions while active.  See `_profiling()`.
+
+    Phases may nest.  Time of a phase excludes the time of phases nested in it, so that no time is counted twice.
+    Phases in worker processes are not recorded.  Files are timed in workers and reported to the parent.
+    """
+
+    _hooks: List[ProfileHook]
+    _trace_memory: bool
+    _phases: dict[str, List[float]]  # type: ignore  # reason: dict
+    # Stack of (name, wall at start, cpu at start, wall of nested phases, cpu of nested phases).
+    _stack: List[List[Any]]
+    _files: List[Tuple[float, Path]]
+    _distributions: dict[str, float]  # type: ignore  # reason: dict
+    _start: Tuple[float, float]
+    _peak_memory: Optional[int]
+
+    def __init__(self, hooks: Optional[List[ProfileHook]] = None, trace_memory: bool = True) -> None:
+        self._hooks = hooks or []
+        self._trace_memory = trace_memory
+        self._phases = {}
+        self._stack = []
+        self._files = []
+        self._distributions = {}
+        self._start = (0.0, 0.0)
+        self._peak_memory = None
+
+    def start(self) -> None:
+        self._start = (time.perf_counter(), time.process_time())
+        # Imported lazily, as `tracemalloc` is not needed unless profiling.
+        import tracemalloc
+
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        import tracemalloc
+
+        if self._trace_memory and tracemalloc.is_tracing():
+            (_, self._peak_memory) = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        self._start = (time.perf_counter() - self._start[0], time.process_time() - self._start[1])
+
+    def enter(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def exit(self) -> None:
+        (name, wall0, cpu0, nested_wall, nested_cpu) = self._stack.pop()
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        if len(self._stack) != 0:
+            self._stack[-1][3] += wall
+            self._stack[-1][4] += cpu
+
+        x = self._phases.setdefault(name, [0.0, 0.0])
+        x[0] += wall - nested_wall
+        x[1] += cpu - nested_cpu
+        for hook in self._hooks:
+            hook.on_phase(name, wall - nested_wall, cpu - nested_cpu)
+
+    def record_file(self, path: Path, seconds: float) -> None:
+        self._files.append((seconds, path))
+        for hook in self._hooks:
+            hook.on_file(path, seconds)
+
+    def record_distribution(self, name: str, seconds: float) -> None:
+        self._distributions[name] = self._distributions.get(name, 0.0) + seconds
+        for hook in self._hooks:
+            hook.on_distribution(name, seconds)
+
+    def report(self, top: int = DEFAULT_TOP_FILES) -> dict[str, Any]:  # type: ignore  # reason: dict
+        """
+        Metrics as a JSON-serializable dict.  Times are in seconds.
+        """
+        # fmt: off
+        files = [{"path": str(path), "seconds": seconds, "size": _file_size(path)}
+                 for (seconds, path) in sorted(self._files, key=lambda x: x[0], reverse=True)[:top]]
+        ret = {
+            "wall_seconds": self._start[0],
+            "cpu_seconds": self._start[1],
+            "phases": dict((name, {"wall_seconds": wall, "cpu_seconds": cpu}) for (name, (wall, cpu)) in self._phases.items()),
+            "files": len(self._files),
+            "slowest_files": files,
+            "distributions": dict(sorted(self._distributions.items(), key=lambda x: x[1], reverse=True)),
+            "peak_memory_bytes": self._peak_memory,
+        }
+        for hook in self._hooks:
+            hook.on_finish(ret)
+        return ret
+
+    def dump(self, path: Path, top: int = DEFAULT_TOP_FILES) -> None:
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+            f.write("\n")
+
+
+def _file_size(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+# The active profiler.  Instrumented code records to it via the functions below, which are no-ops if it is `None`.
+_active: Optional[Profiler] = None
+
+
+class _profiling:
+    """
+    Activate `profiler` in the block.
+
+    >>> profiler = Profiler(trace_memory=False)
+    >>> with _profiling(profiler):
+    ...     with _phase("a"):
+    ...         with _phase("b"):
+    ...             pass
+    >>> sorted(profiler.report()["phases"].keys())
+    ['a', 'b']
+    """
+
+    _profiler: Profiler
+
+    def __init__(self, profiler: Profiler) -> None:
+        self._profiler = profiler
+
+    def __enter__(self) -> Profiler:
+        global _active
+        _active = self._profiler
+        self._profiler.start()
+        return self._profiler
+
+    def __exit__(
+        self, type_: Optional[Type[BaseException]], value: Optional[BaseException], traceback: Optional[TracebackType]
+    ) -> None:
+        global _active
+        self._profiler.stop()
+        _active = None
+
+
+class _phase:
+    """
+    Record the block as a phase of the active profiler.  A plain class rather than `contextlib.contextmanager` for low
+    overhead when profiling is off.
+    """
+
+    _name: str
+    _profiler: Optional[Profiler]
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._profiler = _active
+
+    def __enter__(self) -> None:
+        if self._profiler is not None:
+            self._profiler.enter(self._name)
+
+    def __exit__(
+        self, type_: Optional[Type[BaseException]], value: Optional[BaseException], traceback: Optional[TracebackType]
+    ) -> None:
+        if self._profiler is not None:
+            self._profiler.exit()
+
+
+def _phase_iter(name: str, xs: Iterable[T]) -> Iterator[T]:
+    """
+    Record time spent producing elements of a lazy iterable, e.g. walking directories, as a phase.
+    """
+    if _active is None:
+        yield from xs
+        return
+
+    it = iter(xs)
+    while True:
+        with _phase(name):
+            try:
+                x = next(it)
+            except StopIteration:
+                return
+        yield x
+
+
+def _init_worker() -> None:
+    """
+    Called in a forked worker.  Memory is traced only in the main process, as tracing slows down workers a lot.
+    """
+    global _active
+    _active = None
+    import tracemalloc
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _record_file(path: Path, seconds: float) -> None:
+    if _active is not None:
+        _active.record_file(path, seconds)
+
+
+def _record_distribution(name: str, seconds: float) -> None:
+    if _active is not None:
+        _active.record_distribution(name, seconds)
@@ -6,23 +6,30 @@ if True:
     logger.addHandler(_logging.NullHandler())
 
 
+import re
 from pathlib import Path
-from typing import Any, List, MutableMapping, Tuple, cast
-
-import toml
-from pkg_resources import to_filename
+from typing import Any, List, MutableMapping, Optional, Tuple, cast
 
+from .dist_index import _DistIndex
 from .domain import _load_proj_to_modules
 from .exception import InvalidPyProjectError, InvalidPythonVersionError
+from .module_index import _build_module_to_proj
 from .result import Err, Ok, Result
-from .util import _dict_rec_get, _flatten
+from .util import _dict_rec_get, _flatten, _to_filename
+from .walker import _IgnoreRules
+
+SCOPE_MAIN = "main"
+SCOPE_DEV = "dev"
 
 
 class _PyProject:
     _t: dict[str, Any]  # type: ignore  # reason: dict
+    # Directory containing `pyproject.toml`.  Target directories are relative to it.
+    _root: Path
 
-    def __init__(self, t: MutableMapping[str, Any]) -> None:
+    def __init__(self, t: MutableMapping[str, Any], root: Path = Path()) -> None:
         self._t = cast(dict[str, Any], t)  # type: ignore  # reason: dict
+        self._root = root
 
     def _init_validate(self) -> Result[None, InvalidPyProjectError]:
         if _dict_rec_get(self._t, ["tool", "poetry", "name"], None) is None:
@@ -36,9 +43,15 @@ class _PyProject:
 
     @classmethod
     def load(cls, path: Path) -> Result["_PyProject", InvalidPyProjectError]:
-        path = path / "pyproject.toml"
-        t = toml.load(open(path))
-        this = cls(t)
+        # Imported lazily to keep startup fast when there is nothing to check.
+        import toml
+
+        t = toml.load(open(path / "pyproject.toml"))
+        return cls.from_dict(t, path)
+
+    @classmethod
+    def from_dict(cls, t: MutableMapping[str, Any], root: Path) -> Result["_PyProject", InvalidPyProjectError]:
+        this = cls(t, root)
         res = this._init_validate()
         if res.is_err():
             return Err(res.unwrap_err())
@@ -50,7 +63,7 @@ class _PyProject:
         return cast(str, ret)
 
     def _project_name_normalized(self) -> str:
-        return to_filename(self._project_name())
+        return _to_filename(self._project_name())
 
     def _module_names(self) -> List[str]:
         packages = [x for (x, _) in self._packages_in_src()]
@@ -80,12 +93,43 @@ class _PyProject:
             assert type(module) is str
         return cast(List[str], modules)
 
+    def _ignore_unused(self) -> List[str]:
+        projects = _dict_rec_get(self._t, ["tool", "pyproject-indirect-import-detector", "ignore_unused"], [])
+        assert type(projects) is list
+        for project in projects:
+            assert type(project) is str
+        return cast(List[str], projects)
+
+    def _exclude_globs(self) -> List[str]:
+        globs = _dict_rec_get(self._t, ["tool", "pyproject-indirect-import-detector", "exclude_globs"], [])
+        assert type(globs) is list
+        for glob in globs:
+            assert type(glob) is str
+        return cast(List[str], globs)
+
+    def _use_gitignore(self) -> bool:
+        x = _dict_rec_get(self._t, ["tool", "pyproject-indirect-import-detector", "use_gitignore"], True)
+        assert type(x) is bool
+        return cast(bool, x)
+
+    def ignore_rules(self) -> _IgnoreRules:
+        return _IgnoreRules(self._root, self._exclude_globs(), self._use_gitignore())
+
     def base_python_version(self) -> Result[str, InvalidPythonVersionError]:
         python_version_constraint = _dict_rec_get(self._t, ["tool", "poetry", "dependencies", "python"], None)
         if python_version_constraint is None:
             return Err(InvalidPythonVersionError("must not be empty."))
         return _parse_minimal_python_verison(python_version_constraint)
 
+    def python_versions(self, known: List[str]) -> Result[List[str], InvalidPythonVersionError]:
+        """
+        Versions in `known` the python constraint allows, e.g. 3.8 and later ones for `^3.8`.
+        """
+        python_version_constraint = _dict_rec_get(self._t, ["tool", "poetry", "dependencies", "python"], None)
+        if python_version_constraint is None:
+            return Err(InvalidPythonVersionError("must not be empty."))
+        return _parse_python_versions(python_version_constraint, known)
+
     def _dependencies(self) -> List[str]:
         deps = _dict_rec_get(self._t, ["tool", "poetry", "dependencies"], None)
         if deps is None:
@@ -100,41 +144,118 @@ class _PyProject:
         else:
             return list(deps.keys())
 
+    def _group_dependencies(self) -> dict[str, List[str]]:  # type: ignore  # reason: dict
+        """
+        Dependencies of `[tool.poetry.group.<name>.dependencies]`.
+        """
+        groups = _dict_rec_get(self._t, ["tool", "poetry", "group"], {})
+        # fmt: off
+        return dict((name, list(_dict_rec_get(group, ["dependencies"], {}).keys()))
+                    for (name, group) in groups.items())
+
+    def _group_dirs(self) -> dict[str, List[Path]]:  # type: ignore  # reason: dict
+        group_dirs = _dict_rec_get(self._t, ["tool", "pyproject-indirect-import-detector", "group_dirs"], {})
+        assert type(group_dirs) is dict
+        for dirs in group_dirs.values():
+            assert type(dirs) is list
+            for dir_ in dirs:
+                assert type(dir_) is str
+        return dict((name, [Path(dir_) for dir_ in dirs]) for (name, dirs) in group_dirs.items())
+
     def dependencies(self, include_dev: bool) -> List[str]:
         xs = self._dependencies()
         if include_dev:
             xs += self._dev_dependencies()
+            xs += _flatten(list(self._group_dependencies().values()))
 
         xs = list(set(xs))
         xs.remove("python")
         xs.sort()
         return xs
 
+    def declared_dependencies(self) -> List[Tuple[str, str]]:
+        """
+        Dependencies with the tables declaring them, e.g. `("pytest", "dev-dependencies")`.  `python` is not included.
+        """
+        xs = [(x, "dependencies") for x in self._dependencies()]
+        xs += [(x, "dev-dependencies") for x in self._dev_dependencies()]
+        for (name, deps) in self._group_dependencies().items():
+            xs += [(x, f"group.{name}.dependencies") for x in deps]
+        return [(x, table) for (x, table) in xs if x != "python"]
+
+    def scopes(self) -> List[str]:
+        """
+        Scopes to check.  Each scope has its own dependencies and target directories.
+
+        - `main`: Dependencies in `[tool.poetry.dependencies]`.  Targets are the package directories.
+        - `dev`: All dependencies, including `dev-dependencies` and all groups.  Target is `tests`.
+        - `group.<name>`: Main dependencies and the group's ones.
+          Targets are configured by `[tool.pyproject-indirect-import-detector.group_dirs]`.
+        """
+        groups = self._group_dependencies()
+        return [SCOPE_MAIN, SCOPE_DEV] + [_group_scope(name) for name in self._group_dirs() if name in groups]
+
+    def scope_dependencies(self, scope: str) -> List[str]:
+        if scope == SCOPE_MAIN:
+            return self.dependencies(False)
+        elif scope == SCOPE_DEV:
+            return self.dependencies(True)
+        else:
+            xs = self._group_dependencies()[_group_name(scope)]
+            return sorted(set(self.dependencies(False) + [x for x in xs if x != "python"]))
+
     def load_module_to_proj(self, dev: bool) -> Result[dict[str, str], Exception]:  # type: ignore  # reason: dict
+        scope = SCOPE_DEV if dev else SCOPE_MAIN
+        res = self._load_module_to_proj_for([scope])
+        if res.is_err():
+            return Err(res.unwrap_err())
+        return Ok(res.unwrap()[scope])
+
+    def load_scope_module_to_proj(
+        self, index: Optional[_DistIndex] = None, stdlib: Optional[List[str]] = None
+    ) -> Result[dict[str, dict[str, str]], Exception]:  # type: ignore  # reason: dict
+        """
+        Resolve every distribution once and build a `module_to_proj` map for each scope.
+
+        `index` can be shared by projects in the same environment.  `stdlib` overrides stdlib of the python version.
+        """
+        return self._load_module_to_proj_for(self.scopes(), index, stdlib)
+
+    def _load_module_to_proj_for(
+        self, scopes: List[str], index: Optional[_DistIndex] = None, stdlib: Optional[List[str]] = None
+    ) -> Result[dict[str, dict[str, str]], Exception]:  # type: ignore  # reason: dict
         python_version_ = self.base_python_version()
         if python_version_.is_err():
             return Err(python_version_.unwrap_err())
         python_version = python_version_.unwrap()
 
+        scope_to_projs = dict((scope, self.scope_dependencies(scope)) for scope in scopes)
         proj_to_modules_ = _load_proj_to_modules(
             self._project_name(),
             self._module_names(),
-            self.dependencies(dev),
+            sorted(set(_flatten(list(scope_to_projs.values())))),
             python_version,
             self._exclude_projects(),
             self._exclude_modules(),
+            index,
+            stdlib,
         )
         if proj_to_modules_.is_err():
             return Err(proj_to_modules_.unwrap_err())
         proj_to_modules = proj_to_modules_.unwrap()
         logger.debug(f"proj_to_modules = {proj_to_modules}")
 
-        # fmt: off
-        module_to_proj = dict((m, p)
-                              for (p, ms) in proj_to_modules.items()
-                              for m in ms)
-        logger.debug(f"module_to_proj = {module_to_proj}")
-        return Ok(module_to_proj)
+        ret = {}
+        for (scope, projs) in scope_to_projs.items():
+            # Layer dependencies of the scope on the ones common to all scopes, keeping the order of `proj_to_modules`.
+            visible = set(projs) | {"<std>", self._project_name(), "<exclude>"}
+            # fmt: off
+            module_to_proj = _build_module_to_proj((p, ms)
+                                                   for (p, ms) in proj_to_modules.items()
+                                                   if p in visible)
+            logger.debug(f"module_to_proj[{scope}] = {module_to_proj}")
+            ret[scope] = module_to_proj
+        return Ok(ret)
 
     # Separate method for test.
     def _target_dirs(self, dev: bool) -> List[Path]:
@@ -155,8 +276,28 @@ class _PyProject:
 
         return paths
 
+    def root(self) -> Path:
+        return self._root
+
     def target_dirs(self, dev: bool) -> List[Path]:
-        return [path for path in self._target_dirs(dev) if path.exists()]
+        return [self._root / path for path in self._target_dirs(dev) if (self._root / path).exists()]
+
+    def scope_target_dirs(self, scope: str) -> List[Path]:
+        if scope == SCOPE_MAIN:
+            return self.target_dirs(False)
+        elif scope == SCOPE_DEV:
+            return self.target_dirs(True)
+        else:
+            return [self._root / path for path in self._group_dirs()[_group_name(scope)] if (self._root / path).exists()]
+
+
+def _group_scope(name: str) -> str:
+    return "group." + name
+
+
+def _group_name(scope: str) -> str:
+    assert scope.startswith("group.")
+    return scope[len("group.") :]
 
 
 def _parse_minimal_python_verison(spec: str) -> Result[str, InvalidPythonVersionError]:
@@ -183,3 +324,91 @@ def _parse_minimal_python_verison(spec: str) -> Result[str, InvalidPythonVersion
         )
     else:
         return Err(InvalidPythonVersionError(f"cannot understand: {spec}"))
+
+
+# A constraint of poetry, e.g. `^3.8`, `>=3.8`, `!=3.9.*` or `3.10.*`.
+_PYTHON_CONSTRAINT = re.compile(r"(\^|~=|~|>=|<=|>|<|==|!=)?(\d+(?:\.\d+)*)(\.\*)?")
+
+
+def _allows_minor(constraint: str, minor: Tuple[int, int]) -> Optional[bool]:
+    """
+    Whether `constraint` allows some release of the `minor` version.  `None` if not understood.
+
+    >>> [_allows_minor(c, (3, 9)) for c in [">=3.8", "<3.9", "<3.9.1", "~3.9.1", "!=3.9.*", "!=3.9.1", "~=3.8"]]
+    [True, False, True, True, False, True, True]
+    """
+    m = _PYTHON_CONSTRAINT.fullmatch(constraint)
+    if m is None:
+        return None
+    (op, version, wildcard) = (m.group(1) or "", m.group(2), m.group(3) is not None)
+    parts = [int(x) for x in version.split(".")]
+    (major, minor_, patch) = (parts + [0, 0])[:3]
+    lower = (major, minor_)
+
+    if wildcard and op not in ("", "==", "!="):
+        return None
+    if op in ("", "=="):
+        return minor[0] == major if (wildcard and len(parts) == 1) else minor == lower
+    elif op == "!=":
+        # Other patch releases are allowed unless it is a wildcard.
+        if not wildcard:
+            return True
+        return minor[0] != major if len(parts) == 1 else minor != lower
+    elif op in (">=", ">"):
+        return minor >= lower
+    elif op == "<":
+        return minor < lower or (minor == lower and patch > 0)
+    elif op == "<=":
+        return minor <= lower
+    elif op == "^":
+        return lower <= minor < (major + 1, 0)
+    elif op == "~":
+        return minor[0] == major if len(parts) == 1 else minor == lower
+    else:
+        # `~=`
+        if len(parts) == 1:
+            return None
+        return minor == lower if len(parts) >= 3 else (minor[0] == major and minor >= lower)
+
+
+def _parse_python_versions(spec: str, known: List[str]) -> Result[List[str], InvalidPythonVersionError]:
+    """
+    Versions in `known` which `spec` allows, i.e. some of whose releases satisfy it.  Constraints of poetry are supported:
+    alternatives by `||` of constraints separated by `,` or spaces.
+
+    >>> _parse_python_versions("^3.9", ["3.8", "3.9", "3.10"]).unwrap()
+    ['3.9', '3.10']
+    >>> _parse_python_versions("~3.9.1", ["3.8", "3.9", "3.10"]).unwrap()
+    ['3.9']
+    >>> _parse_python_versions(">=3.8,<4", ["3.8", "3.9", "3.10"]).unwrap()
+    ['3.8', '3.9', '3.10']
+    >>> _parse_python_versions(">= 3.8, != 3.9.*, < 3.11 || 3.12.*", ["3.8", "3.9", "3.10", "3.11", "3.12"]).unwrap()
+    ['3.8', '3.10', '3.12']
+    """
+    if spec.strip() == "*":
+        return Err(
+            InvalidPythonVersionError(
+                'this tool cannot treat well python version constraint "*".\n' 'Specify more concrete, e.g. "^3.9".'
+            )
+        )
+
+    alternatives = []
+    for alternative in spec.split("||"):
+        # Spaces may follow operators, e.g. `>= 3.8`.
+        constraints = re.split(r"[\s,]+", re.sub(r"([<>=!~^])\s+", r"\1", alternative).strip())
+        alternatives.append([c for c in constraints if c != ""])
+
+    versions = []
+    for v in known:
+        minor = cast(Tuple[int, int], tuple(int(x) for x in v.split(".")[:2]))
+        allowed = False
+        for constraints in alternatives:
+            xs = [_allows_minor(c, minor) for c in constraints]
+            if any(x is None for x in xs) or len(constraints) == 0:
+                return Err(InvalidPythonVersionError(f"cannot understand: {spec}"))
+            allowed = allowed or all(xs)
+        if allowed:
+            versions.append(v)
+    if len(versions) == 0:
+        return Err(InvalidPythonVersionError(f"no python version of {spec} in {', '.join(known)}"))
+    return Ok(versions)
@@ -0,0 +1,222 @@
+import io
+import tokenize
+from collections import deque
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Sequence, Type, TypeVar, Union, overload
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+T = TypeVar("T")
+
+# Number of files read ahead of the parser.  0 disables prefetching.
+DEFAULT_PREFETCH = 16
+DEFAULT_READ_THREADS = 4
+
+_BOM = b"\xef\xbb\xbf"
+
+
+def _read_bytes(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _normalize_newlines(data: bytes) -> bytes:
+    """
+    Translate newlines as universal newlines mode.  Copies only if the file has `\\r`.
+
+    >>> _normalize_newlines(b"a\\r\\nb\\rc\\n")
+    b'a\\nb\\nc\\n'
+    """
+    if b"\r" not in data:
+        return data
+    return data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def _source_encoding(data: bytes) -> str:
+    """
+    The encoding of source as PEP 263.  Most files have no encoding declaration, and are UTF-8 without detection.
+
+    >>> _source_encoding(b"import os\\n")
+    'utf-8'
+    >>> _source_encoding(b"# -*- coding: latin-1 -*-\\nimport os\\n")
+    'iso-8859-1'
+    """
+    # A declaration must be in the first two lines.
+    head = data.split(b"\n", 2)[:2]
+    if not any(b"coding" in line for line in head):
+        return "utf-8"
+    (encoding, _) = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return encoding.replace("utf-8-sig", "utf-8")
+
+
+class _Lines(Sequence[str]):
+    """
+    Lines of source as `str(...).split("\\n")`, but each line is decoded only when it is accessed, e.g. for an import to
+    show.  Line offsets are found up to the line accessed, as imports are usually at the top.
+
+    >>> lines = _Lines(b"import os\\r\\nx = '\\xc3\\xa9'\\n")
+    >>> lines[0:2]
+    ['import os', "x = '\\xe9'"]
+    >>> len(lines)
+    3
+    """
+
+    _data: bytes
+    _encoding: str
+    # Start of each line found so far, and the end of the last line if `_complete`.
+    _offsets: List[int]
+    _complete: bool
+
+    def __init__(self, data: bytes) -> None:
+        if data.startswith(_BOM):
+            data = data[len(_BOM) :]
+        self._data = _normalize_newlines(data)
+        self._encoding = _source_encoding(self._data)
+        self._offsets = [0]
+        self._complete = False
+
+    def _find_offsets(self, n: int) -> None:
+        """
+        Find offsets until `n` of them are known, or all.
+        """
+        offsets = self._offsets
+        data = self._data
+        while (not self._complete) and len(offsets) < n:
+            i = data.find(b"\n", offsets[-1])
+            if i == -1:
+                offsets.append(len(data) + 1)
+                self._complete = True
+            else:
+                offsets.append(i + 1)
+
+    def __len__(self) -> int:
+        self._find_offsets(len(self._data) + 2)
+        return len(self._offsets) - 1
+
+    def _line(self, i: int) -> str:
+        self._find_offsets(i + 2)
+        if i + 1 >= len(self._offsets):
+            raise IndexError(i)
+        return self._data[self._offsets[i] : self._offsets[i + 1] - 1].decode(self._encoding)
+
+    @overload
+    def __getitem__(self, i: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[str]:
+        ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            if (i.step is None) and (i.start or 0) >= 0 and (i.stop is not None) and i.stop >= 0:
+                # Without counting all lines.
+                self._find_offsets(i.stop + 1)
+                return [self._line(j) for j in range(i.start or 0, min(i.stop, len(self._offsets) - 1))]
+            return [self._line(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+            if i < 0:
+                raise IndexError(i)
+        return self._line(i)
+
+
+class _Prefetcher:
+    """
+    Reads files in a thread pool ahead of the parser, so that I/O latency, e.g. of NFS, overlaps with parsing.
+
+    Iterate files through `iter()`, and get their content by `read()` before taking the next one.  At most `depth` files
+    are read ahead, so that memory is bounded however far the parser falls behind.  It is passed explicitly to readers, so
+    that concurrent checks never share one.
+    """
+
+    _depth: int
+    _executor: "ThreadPoolExecutor"
+    _futures: dict[Path, "Future[bytes]"]  # type: ignore  # reason: dict
+
+    def __init__(self, depth: int, threads: int) -> None:
+        # Imported lazily.  Not needed unless prefetching.
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._depth = depth
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="prefetch")
+        self._futures = {}
+
+    def iter(self, xs: Iterable[T], path_of: Callable[[T], Optional[Path]]) -> Iterator[T]:
+        """
+        `path_of` gives the file to read ahead for each item, or `None` if it needs no read, e.g. a hit of the cache.
+        """
+        window: deque[T] = deque()  # type: ignore  # reason: deque
+        it = iter(xs)
+        while True:
+            # Fill the window.
+            while len(window) <= self._depth:
+                try:
+                    x = next(it)
+                except StopIteration:
+                    break
+                path = path_of(x)
+                if path is not None:
+                    self._futures[path] = self._executor.submit(_read_bytes, path)
+                window.append(x)
+            if len(window) == 0:
+                return
+            x = window.popleft()
+            yield x
+            # Not read, e.g. by an error of an earlier file.
+            path = path_of(x)
+            future = None if path is None else self._futures.pop(path, None)
+            if future is not None:
+                future.cancel()
+
+    def read(self, path: Path) -> bytes:
+        future = self._futures.pop(path, None)
+        if future is None:
+            return _read_bytes(path)
+        return future.result()
+
+    def close(self) -> None:
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
+
+
+def _read_source(path: Path, prefetcher: Optional[_Prefetcher] = None) -> bytes:
+    if prefetcher is not None:
+        return prefetcher.read(path)
+    return _read_bytes(path)
+
+
+class _prefetching:
+    """
+    A prefetcher for the block, given by `with ... as`.  `None` if `depth` is 0.
+    """
+
+    _depth: int
+    _threads: int
+    _prefetcher: Optional[_Prefetcher]
+
+    def __init__(self, depth: int = DEFAULT_PREFETCH, threads: int = DEFAULT_READ_THREADS) -> None:
+        self._depth = depth
+        self._threads = threads
+        self._prefetcher = None
+
+    def __enter__(self) -> Optional[_Prefetcher]:
+        if self._depth > 0:
+            self._prefetcher = _Prefetcher(self._depth, self._threads)
+        return self._prefetcher
+
+    def __exit__(
+        self, type_: Optional[Type[BaseException]], value: Optional[BaseException], traceback: Optional[TracebackType]
+    ) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+
+
+def _prefetch_iter(
+    prefetcher: Optional[_Prefetcher], xs: Iterable[T], path_of: Callable[[T], Optional[Path]]
+) -> Iterable[T]:
+    return xs if prefetcher is None else prefetcher.iter(xs, path_of)
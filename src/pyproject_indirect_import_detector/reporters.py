@@ -0,0 +1,374 @@
+import json
+from pathlib import Path
+from typing import IO, Any, Iterable, List, Optional, Tuple
+
+from .detector import _IllegalImportDetected
+
+TOOL_NAME = "pyproject-indirect-import-detector"
+TOOL_URI = "https://github.com/kenoss/pyproject-indirect-import-detector"
+RULE_ID = "indirect-import"
+
+# Size of the body a reporter keeps in memory before spilling to a temporary file.
+_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class _Reporter:
+    """
+    Writes results of files as they finish.  Call `file()` for each file, then `finish()`.
+
+    Counts are kept incrementally, so that a reporter does not hold results.  Unused dependencies, if checked, are given by
+    `unused()` before `finish()`.
+    """
+
+    _out: IO[str]
+    n_files: int
+    n_violations: int
+    unused_dependencies: List[Tuple[str, str]]
+
+    def __init__(self, out: IO[str]) -> None:
+        self._out = out
+        self.n_files = 0
+        self.n_violations = 0
+        self.unused_dependencies = []
+
+    def ok(self) -> bool:
+        return self.n_violations == 0 and len(self.unused_dependencies) == 0
+
+    def unused(self, deps: List[Tuple[str, str]]) -> None:
+        """
+        Declared dependencies no file imports, with the tables declaring them.
+        """
+        self.unused_dependencies = deps
+
+    def _write_unused_text(self) -> None:
+        if len(self.unused_dependencies) == 0:
+            return
+        self._out.write("Unused dependencies:\n")
+        for (proj, table) in self.unused_dependencies:
+            self._out.write(f"    {proj} is in {table}, but not imported.\n")
+        self._out.write("\n")
+
+    def _write_unused_jsonl(self) -> None:
+        for (proj, table) in self.unused_dependencies:
+            self._out.write(json.dumps({"type": "unused", "project": proj, "table": table}) + "\n")
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        self.n_files += 1
+        self.n_violations += len(es)
+
+    def finish(self) -> bool:
+        """
+        Write the rest and return whether no violation is found.
+        """
+        return self.ok()
+
+
+class _Colors:
+    """
+    Colored strings, built once rather than for each line.
+    """
+
+    ok: str
+    ng: str
+    ok_tag: str
+    ng_tag: str
+    _colored: Any
+
+    def __init__(self) -> None:
+        from termcolor import colored
+
+        self.ok = colored("OK", "green")
+        self.ng = colored("NG", "red")
+        self.ok_tag = colored("[OK]", "green")
+        self.ng_tag = colored("[NG]", "red")
+        self._colored = colored
+
+    def red(self, s: str) -> str:
+        return self._colored(s, "red")  # type: ignore  # reason: termcolor is untyped
+
+
+def _spooled() -> IO[str]:
+    # Imported lazily, as `tempfile` imports `random` and `shutil`, which are not needed until a report is written.
+    import tempfile
+
+    return tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE, mode="w+")  # type: ignore  # reason: IO[str]
+
+
+def _drain(body: IO[str], out: IO[str]) -> None:
+    """
+    Copy a body made by `_spooled()` to `out`, and close it.
+    """
+    import shutil
+
+    body.seek(0)
+    shutil.copyfileobj(body, out)
+    body.close()
+
+
+class _TextReporter(_Reporter):
+    """
+    The default human readable report.  The summary comes first, so the body is spooled until `finish()`.
+    """
+
+    _verbose: bool
+    _body: IO[str]
+    _colors: "_Colors"
+
+    def __init__(self, out: IO[str], verbose: bool) -> None:
+        super().__init__(out)
+        self._verbose = verbose
+        self._body = _spooled()
+        self._colors = _Colors()
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        super().file(path, es)
+        if len(es) == 0:
+            if self._verbose:
+                self._body.write(f"{self._colors.ok_tag} {path}\n")
+        else:
+            if self._verbose:
+                self._body.write(f"{self._colors.ng_tag} {path}\n\n")
+
+            for e in es:
+                self._body.write(f"{e}\n")
+
+    def finish(self) -> bool:
+        ok_or_ng = self._colors.ok if self.ok() else self._colors.ng
+        self._out.write(f"Checking {self.n_files} files... {ok_or_ng}\n\n")
+        _drain(self._body, self._out)
+        self._write_unused_text()
+        self._out.flush()
+        return self.ok()
+
+
+class _JsonLinesReporter(_Reporter):
+    """
+    A JSON object per violation, followed by a summary object.
+
+    {"type": "violation", "path": "foo/bar.py", "line": 3, "source": "import yaml", "module": "yaml", "provider": "PyYAML",
+     "chain": ["foo", "PyYAML"]}
+    {"type": "summary", "files": 10, "violations": 1, "ok": false}
+
+    `provider` and `chain` are present only if a distribution provides the module.  `python_versions` is present only if the
+    module is in stdlib of some of the versions checked by `--python-matrix`, and lists the others.  Unused dependencies
+    come before the summary, as `{"type": "unused", "project": "foo", "table": "dependencies"}`.
+    """
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        super().file(path, es)
+        for e in es:
+            x = {"type": "violation", "path": path.as_posix(), "line": e._lineno, "source": e._line, "module": e._module}
+            x.update(_provider_fields(e))
+            self._out.write(json.dumps(x) + "\n")
+
+    def finish(self) -> bool:
+        self._write_unused_jsonl()
+        x = {"type": "summary", "files": self.n_files, "violations": self.n_violations, "ok": self.ok()}
+        self._out.write(json.dumps(x) + "\n")
+        self._out.flush()
+        return self.ok()
+
+
+def _provider_fields(e: _IllegalImportDetected) -> dict[str, Any]:  # type: ignore  # reason: dict
+    ret: dict[str, Any] = {}  # type: ignore  # reason: dict
+    if e._provider is not None:
+        ret.update({"provider": e._provider.name, "chain": e._provider.chain})
+    if e._python_versions is not None:
+        ret["python_versions"] = e._python_versions
+    return ret
+
+
+def _message(e: _IllegalImportDetected) -> str:
+    hints = "".join(f"  {hint}" for hint in e._hints())
+    return f"{e._module} is imported, but not in dependency.{hints}"
+
+
+class _SarifReporter(_Reporter):
+    """
+    SARIF 2.1.0.  Results are written into the `results` array as files finish, and counts are put after it.
+    """
+
+    _started: bool
+
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        self._started = False
+
+    def _start(self) -> None:
+        self._started = True
+        driver = {
+            "name": TOOL_NAME,
+            "informationUri": TOOL_URI,
+            "rules": [{"id": RULE_ID, "shortDescription": {"text": "A module is imported, but not in dependency."}}],
+        }
+        # The document is closed in `finish()`.
+        head = json.dumps({"$schema": "https://json.schemastore.org/sarif-2.1.0.json", "version": "2.1.0"})[:-1]
+        self._out.write(f'{head}, "runs": [{{"tool": {{"driver": {json.dumps(driver)}}}, "results": [\n')
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        from urllib.parse import quote
+
+        if not self._started:
+            self._start()
+        for (i, e) in enumerate(es):
+            location = {
+                "physicalLocation": {
+                    "artifactLocation": {"uri": quote(path.as_posix())},
+                    "region": {"startLine": e._lineno, "snippet": {"text": e._line}},
+                }
+            }
+            x = {"ruleId": RULE_ID, "level": "error", "message": {"text": _message(e)}, "locations": [location]}
+            sep = "" if self.n_violations + i == 0 else ",\n"
+            self._out.write(sep + json.dumps(x))
+        super().file(path, es)
+
+    def finish(self) -> bool:
+        if not self._started:
+            self._start()
+        properties = {"files": self.n_files, "violations": self.n_violations}
+        invocations = [{"executionSuccessful": True}]
+        self._out.write(f'\n], "invocations": {json.dumps(invocations)}, "properties": {json.dumps(properties)}}}]}}\n')
+        self._out.flush()
+        return self.ok()
+
+
+class _JUnitReporter(_Reporter):
+    """
+    JUnit XML with a test case per file.  Counts are attributes of `<testsuite>`, so test cases are spooled until `finish()`.
+    """
+
+    _body: IO[str]
+    _n_failures: int
+
+    def __init__(self, out: IO[str]) -> None:
+        super().__init__(out)
+        self._body = _spooled()
+        self._n_failures = 0
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        from xml.sax.saxutils import escape, quoteattr
+
+        super().file(path, es)
+        name = quoteattr(path.as_posix())
+        if len(es) == 0:
+            self._body.write(f'    <testcase classname="{RULE_ID}" name={name}/>\n')
+            return
+
+        self._n_failures += 1
+        modules = ", ".join(sorted(set(e._module for e in es)))
+        message = quoteattr(f"{len(es)} illegal imports: {modules}")
+        # fmt: off
+        text = "\n".join(f"{path.as_posix()}:{e._lineno}: {e._line}: {_message(e)}"
+                         for e in es)
+        self._body.write(f'    <testcase classname="{RULE_ID}" name={name}>\n')
+        self._body.write(f"      <failure message={message}>{escape(text)}</failure>\n")
+        self._body.write("    </testcase>\n")
+
+    def finish(self) -> bool:
+        self._out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self._out.write(
+            f'<testsuites><testsuite name="{TOOL_NAME}" tests="{self.n_files}" failures="{self._n_failures}" errors="0">\n'
+        )
+        _drain(self._body, self._out)
+        self._out.write("</testsuite></testsuites>\n")
+        self._out.flush()
+        return self.ok()
+
+
+class _SummaryReporter(_Reporter):
+    """
+    Aggregate violations by missing module: the count and the first `k` locations.  Memory is proportional to the number of
+    missing modules, not to the number of violations.  Supports `text` and `jsonl`.
+    """
+
+    _format: str
+    _k: int
+    # Module -> [count, [(path, lineno, line)], the first error]
+    _modules: dict[str, List[Any]]  # type: ignore  # reason: dict
+
+    def __init__(self, out: IO[str], format_: str, k: int) -> None:
+        super().__init__(out)
+        self._format = format_
+        self._k = k
+        self._modules = {}
+
+    def file(self, path: Path, es: List[_IllegalImportDetected]) -> None:
+        super().file(path, es)
+        for e in es:
+            x = self._modules.get(e._module)
+            if x is None:
+                x = [0, [], e]
+                self._modules[e._module] = x
+            x[0] += 1
+            if len(x[1]) < self._k:
+                x[1].append((path, e._lineno, e._line))
+
+    def _sorted(self) -> List[Tuple[str, int, List[Tuple[Path, int, str]], _IllegalImportDetected]]:
+        # Most frequent first.
+        # fmt: off
+        return [(module, count, locations, e)
+                for (module, (count, locations, e)) in sorted(self._modules.items(), key=lambda x: (-x[1][0], x[0]))]
+
+    def finish(self) -> bool:
+        if self._format == "jsonl":
+            for (module, count, locations, e) in self._sorted():
+                # fmt: off
+                locations_ = [{"path": path.as_posix(), "line": lineno, "source": line}
+                              for (path, lineno, line) in locations]
+                x = {"type": "module", "module": module, "count": count, "locations": locations_}
+                x.update(_provider_fields(e))
+                self._out.write(json.dumps(x) + "\n")
+            self._write_unused_jsonl()
+            x = {"type": "summary", "files": self.n_files, "violations": self.n_violations, "ok": self.ok()}
+            self._out.write(json.dumps(x) + "\n")
+        else:
+            colors = _Colors()
+            ok_or_ng = colors.ok if self.ok() else colors.ng
+            self._out.write(f"Checking {self.n_files} files... {ok_or_ng}\n\n")
+            if self.n_violations != 0:
+                self._out.write(f"{self.n_violations} imports of {len(self._modules)} modules not in dependency:\n\n")
+            for (module, count, locations, e) in self._sorted():
+                self._out.write(f"{colors.red(module)}: {count} imports\n")
+                for hint in e._hints():
+                    self._out.write(f"    {hint}\n")
+                for (path, lineno, line) in locations:
+                    self._out.write(f"    {path}:{lineno}: {line}\n")
+                if count > len(locations):
+                    self._out.write(f"    ... and {count - len(locations)} more\n")
+                self._out.write("\n")
+            self._write_unused_text()
+        self._out.flush()
+        return self.ok()
+
+
+FORMATS = ["text", "jsonl", "sarif", "junit"]
+SUMMARY_FORMATS = ["text", "jsonl"]
+UNUSED_FORMATS = ["text", "jsonl"]
+DEFAULT_SUMMARY_LOCATIONS = 3
+DEFAULT_FORMAT = "text"
+
+
+def _make_reporter(format_: str, out: IO[str], verbose: bool, summary: Optional[int] = None) -> _Reporter:
+    """
+    If `summary` is given, violations are aggregated by module with at most `summary` locations for each.
+    """
+    if summary is not None:
+        if format_ not in SUMMARY_FORMATS:
+            raise ValueError(f"summary is not supported for format: {format_}")
+        return _SummaryReporter(out, format_, summary)
+    elif format_ == "text":
+        return _TextReporter(out, verbose)
+    elif format_ == "jsonl":
+        return _JsonLinesReporter(out)
+    elif format_ == "sarif":
+        return _SarifReporter(out)
+    elif format_ == "junit":
+        return _JUnitReporter(out)
+    else:
+        raise ValueError(f"unknown format: {format_}")
+
+
+def _write_report(reporter: _Reporter, xs: Iterable[Tuple[Path, List[_IllegalImportDetected]]]) -> bool:
+    for (path, es) in xs:
+        reporter.file(path, es)
+    return reporter.finish()
@@ -0,0 +1,175 @@
+import logging as _logging
+
+# noqa idiom
+if True:
+    logger = _logging.getLogger(__name__)
+    logger.addHandler(_logging.NullHandler())
+
+
+import io
+import tokenize
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .detector import _extract_bytes, _Import
+from .profiling import _phase
+
+# Tokens after which a statement starts.  Note that `import` and `from` are keywords, so they cannot appear in an expression
+# except `yield from` and `raise ... from`, which do not follow the below.
+_STATEMENT_BOUNDARY_TYPES = {tokenize.ENCODING, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT}
+_STATEMENT_BOUNDARY_OPS = {";", ":"}
+_SKIP_TYPES = {tokenize.COMMENT, tokenize.NL}
+
+
+class _CannotScan(Exception):
+    pass
+
+
+def _decode(data: bytes) -> str:
+    """
+    Decode source as `tokenize.open()` does, i.e. respect PEP 263 and translate newlines.
+    """
+    (encoding, _) = tokenize.detect_encoding(io.BytesIO(data).readline)
+    s = data.decode(encoding)
+    return s.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _parse_import_names(tokens: List[tokenize.TokenInfo]) -> List[str]:
+    """
+    Parse `a.b as c, d` of `import a.b as c, d`.
+    """
+    names = []
+    name = ""
+    in_alias = False
+    for tok in tokens:
+        if tok.type == tokenize.OP and tok.string == ",":
+            names.append(name)
+            name = ""
+            in_alias = False
+        elif in_alias:
+            continue
+        elif tok.type == tokenize.NAME and tok.string == "as":
+            in_alias = True
+        elif tok.type == tokenize.NAME or (tok.type == tokenize.OP and tok.string == "."):
+            name += tok.string
+        else:
+            raise _CannotScan(f"unexpected token in import: {tok.string!r}")
+    names.append(name)
+    if any(name == "" for name in names):
+        raise _CannotScan("empty module name")
+    return names
+
+
+def _parse_from_import(tokens: List[tokenize.TokenInfo]) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Parse `.a.b` and `c, d` of `from .a.b import c as x, d`.  Names are empty for `*`.
+    """
+    module = ""
+    for (i, tok) in enumerate(tokens):
+        if tok.type == tokenize.NAME and tok.string == "import":
+            if module == "":
+                raise _CannotScan("empty module name")
+            return (module, _parse_from_names(tokens[i + 1 :]))
+        elif tok.type == tokenize.NAME or (tok.type == tokenize.OP and tok.string in (".", "...")):
+            module += tok.string
+        else:
+            raise _CannotScan(f"unexpected token in from-import: {tok.string!r}")
+    raise _CannotScan("from without import")
+
+
+def _parse_from_names(tokens: List[tokenize.TokenInfo]) -> Tuple[str, ...]:
+    """
+    Parse `c as x, d` of `from a import c as x, d`, optionally parenthesized.
+    """
+    if len(tokens) == 1 and tokens[0].type == tokenize.OP and tokens[0].string == "*":
+        return ()
+    if len(tokens) >= 2 and tokens[0].string == "(" and tokens[-1].string == ")":
+        tokens = tokens[1:-1]
+        # A trailing comma is allowed only in parentheses.
+        if len(tokens) != 0 and tokens[-1].string == ",":
+            tokens = tokens[:-1]
+    names = []
+    expect_name = True
+    in_alias = False
+    for tok in tokens:
+        if tok.type == tokenize.OP and tok.string == "," and not expect_name:
+            expect_name = True
+            in_alias = False
+        elif tok.type == tokenize.NAME and tok.string == "as" and not expect_name and not in_alias:
+            in_alias = True
+        elif tok.type == tokenize.NAME and expect_name:
+            names.append(tok.string)
+            expect_name = False
+        elif tok.type == tokenize.NAME and in_alias:
+            continue
+        else:
+            raise _CannotScan(f"unexpected token in from-import: {tok.string!r}")
+    if expect_name:
+        raise _CannotScan("empty name")
+    return tuple(names)
+
+
+def _imports_of_statement(stmt: List[tokenize.TokenInfo]) -> List[_Import]:
+    (lineno, col_offset) = stmt[0].start
+    (end_lineno, end_col_offset) = stmt[-1].end
+    if stmt[0].string == "import":
+        return [_Import(lineno, col_offset, end_lineno, end_col_offset, name) for name in _parse_import_names(stmt[1:])]
+    else:
+        (module, names) = _parse_from_import(stmt[1:])
+        return [_Import(lineno, col_offset, end_lineno, end_col_offset, module, names)]
+
+
+def _scan_imports(data: bytes) -> List[_Import]:
+    """
+    Find import statements without building AST.  Raises `_CannotScan` if the source is not understood.
+
+    Imports in any depth, e.g. in functions, and parenthesized forms are supported.
+    """
+    # Cheap byte search.  Most of large generated modules have no import in the body.
+    if b"import" not in data:
+        return []
+
+    s = _decode(data)
+
+    ret = []
+    at_start = True
+    stmt: Optional[List[tokenize.TokenInfo]] = None
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(s).readline):
+            if tok.type in _SKIP_TYPES:
+                continue
+
+            if stmt is not None:
+                if tok.type in (tokenize.NEWLINE, tokenize.ENDMARKER) or (tok.type == tokenize.OP and tok.string == ";"):
+                    ret += _imports_of_statement(stmt)
+                    stmt = None
+                    at_start = True
+                else:
+                    stmt.append(tok)
+            elif tok.type in _STATEMENT_BOUNDARY_TYPES or (
+                tok.type == tokenize.OP and tok.string in _STATEMENT_BOUNDARY_OPS
+            ):
+                at_start = True
+            elif at_start and tok.type == tokenize.NAME and tok.string in ("import", "from"):
+                stmt = [tok]
+            else:
+                at_start = False
+    except (tokenize.TokenError, SyntaxError) as err:
+        raise _CannotScan(str(err))
+
+    if stmt is not None:
+        raise _CannotScan("unterminated import statement")
+
+    return ret
+
+
+def _extract_file_by_scanner(path: Path, data: bytes) -> List[_Import]:
+    """
+    Same as `_extract_file()`, but uses `_scan_imports()` and falls back to `ast.parse()` if it cannot handle the file.
+    """
+    try:
+        with _phase("scan"):
+            return _scan_imports(data)
+    except _CannotScan as err:
+        logger.debug(f"{path}: falling back to ast: {err}")
+        return _extract_bytes(data)
@@ -0,0 +1,103 @@
+from typing import List, Tuple
+
+from .detector import _IllegalImportDetected
+from .domain import _stdlib_modules
+
+# Python versions checked by the matrix.  Their tables are built from the one of `stdlib-list` for the first version, and
+# changes of top-level modules of later versions, as `stdlib-list` does not know all of them.
+MATRIX_VERSIONS = ["3.8", "3.9", "3.10", "3.11", "3.12", "3.13"]
+
+# Top-level modules (added, removed) by each version, as "What's New In Python".
+_CHANGES: dict[str, Tuple[List[str], List[str]]] = {  # type: ignore  # reason: dict
+    "3.9": (["graphlib", "zoneinfo"], ["_dummy_thread", "dummy_threading"]),
+    "3.10": ([], ["formatter", "parser", "symbol"]),
+    "3.11": (["tomllib"], ["binhex"]),
+    "3.12": ([], ["asynchat", "asyncore", "distutils", "imp", "smtpd"]),
+    # PEP 594, and `lib2to3`.
+    "3.13": (
+        [],
+        [
+            "aifc",
+            "audioop",
+            "cgi",
+            "cgitb",
+            "chunk",
+            "crypt",
+            "imghdr",
+            "lib2to3",
+            "mailcap",
+            "msilib",
+            "nis",
+            "nntplib",
+            "ossaudiodev",
+            "pipes",
+            "sndhdr",
+            "spwd",
+            "sunau",
+            "telnetlib",
+            "uu",
+            "xdrlib",
+        ],
+    ),
+}
+
+
+def _version_key(version: str) -> Tuple[int, ...]:
+    """
+    >>> sorted(["3.10", "3.9"], key=_version_key)
+    ['3.9', '3.10']
+    """
+    return tuple(int(x) for x in version.split("."))
+
+
+def _stdlib_top_levels(versions: List[str]) -> List[set[str]]:  # type: ignore  # reason: set
+    """
+    Top-level stdlib modules of each of `versions`, which are in `MATRIX_VERSIONS`.
+    """
+    modules = set(m.split(".")[0] for m in _stdlib_modules(MATRIX_VERSIONS[0]))
+    tables = {MATRIX_VERSIONS[0]: modules}
+    for version in MATRIX_VERSIONS[1:]:
+        (added, removed) = _CHANGES.get(version, ([], []))
+        modules = (modules | set(added)) - set(removed)
+        tables[version] = modules
+    return [tables[version] for version in versions]
+
+
+class _StdlibMatrix:
+    """
+    Stdlib of several python versions, so that one check covers all of them.
+
+    Files are checked once against modules in stdlib of all the versions.  An import of a module in stdlib of only some of
+    them is reported, and `annotate()` tells the versions it is not in.  Others apply to all versions.
+    """
+
+    versions: List[str]
+    # Top-level modules in stdlib of all the versions.
+    common: List[str]
+    # Top-level module -> versions whose stdlib does not have it.
+    _missing_in: dict[str, List[str]]  # type: ignore  # reason: dict
+
+    def __init__(self, versions: List[str]) -> None:
+        self.versions = sorted(set(versions), key=_version_key)
+        tables = _stdlib_top_levels(self.versions)
+        self.common = sorted(set.intersection(*tables))
+        self._missing_in = {}
+        for module in sorted(set.union(*tables) - set(self.common)):
+            self._missing_in[module] = [v for (v, table) in zip(self.versions, tables) if module not in table]
+
+    def missing_in(self, module: str) -> List[str]:
+        """
+        Versions whose stdlib does not have `module`.  Empty if all or none of them have it.
+
+        >>> _StdlibMatrix(["3.11", "3.12"]).missing_in("distutils.core")
+        ['3.12']
+        >>> _StdlibMatrix(["3.11", "3.12"]).missing_in("os")
+        []
+        """
+        return self._missing_in.get(module.split(".")[0], [])
+
+    def annotate(self, es: List[_IllegalImportDetected]) -> None:
+        for e in es:
+            versions = self.missing_in(e._module)
+            if len(versions) != 0:
+                e._python_versions = versions
@@ -1,5 +1,3 @@
-import os
-from pathlib import Path
 from typing import Any, List, TypeVar
 
 T = TypeVar("T")
@@ -12,18 +10,14 @@ def _flatten(xss: List[List[T]]) -> List[T]:
             for x in xs]
 
 
-def _walk(path: Path) -> List[Path]:
-    # fmt: off
-    return [Path(d) / f
-            for (d, _, fs) in os.walk(path)
-            for f in fs]
-
+def _to_filename(name: str) -> str:
+    """
+    Same as `pkg_resources.to_filename()`, without importing `pkg_resources`, which scans all installed distributions.
 
-def _list_all_python_files(path: Path) -> List[Path]:
-    # fmt: off
-    return [path
-            for path in _walk(path)
-            if path.name.endswith(".py")]
+    >>> _to_filename("pyproject-indirect-import-detector")
+    'pyproject_indirect_import_detector'
+    """
+    return name.replace("-", "_")
 
 
 def _dict_rec_get(d: dict[Any, Any], path: List[Any], default: Any) -> Any:  # type: ignore  # reason: dict
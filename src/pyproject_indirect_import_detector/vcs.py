@@ -0,0 +1,31 @@
+import subprocess
+from pathlib import Path
+from typing import List
+
+from .result import Err, Ok, Result
+
+
+def _git(args: List[str]) -> Result[List[str], Exception]:
+    """
+    Run git and split its NUL-delimited output.
+    """
+    try:
+        p = subprocess.run(["git"] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as err:
+        return Err(err).wrap_err(RuntimeError("cannot run git"))
+    if p.returncode != 0:
+        return Err(RuntimeError(f"git {' '.join(args)}: {p.stderr.decode(errors='replace').strip()}"))
+    return Ok([x for x in p.stdout.decode().split("\0") if x != ""])
+
+
+def _changed_since(ref: str) -> Result[List[Path], Exception]:
+    """
+    Files changed since `ref`, including uncommitted and untracked ones.  Paths are relative to the current directory.
+    """
+    changed = _git(["diff", "--name-only", "-z", "--relative", "--diff-filter=d", ref, "--"])
+    if changed.is_err():
+        return Err(changed.unwrap_err())
+    untracked = _git(["ls-files", "-z", "--others", "--exclude-standard"])
+    if untracked.is_err():
+        return Err(untracked.unwrap_err())
+    return Ok([Path(x) for x in sorted(set(changed.unwrap() + untracked.unwrap()))])
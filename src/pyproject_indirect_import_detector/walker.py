@@ -0,0 +1,242 @@
+import os
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional, Pattern
+
+# Directories pruned by default.  A directory is not pruned if it is a python package, e.g. `mypackage/build/__init__.py`.
+DEFAULT_EXCLUDE_DIRS = [
+    "__pycache__",
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "node_modules",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".indirect-import-cache",
+    "build",
+    "dist",
+]
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    Translate a glob of gitignore style to a regex.  `*` does not match `/`, and `**` matches any number of directories.
+
+    >>> bool(re.fullmatch(_translate_glob("a/*.py"), "a/b.py"))
+    True
+    >>> bool(re.fullmatch(_translate_glob("a/*.py"), "a/b/c.py"))
+    False
+    >>> bool(re.fullmatch(_translate_glob("a/**/c.py"), "a/c.py"))
+    True
+    >>> bool(re.fullmatch(_translate_glob("a/**/c.py"), "a/b/b/c.py"))
+    True
+    >>> bool(re.fullmatch(_translate_glob("a/**"), "a/b/c.py"))
+    True
+    """
+    ret = ""
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            ret += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            ret += ".*"
+            i += 2
+        elif c == "*":
+            ret += "[^/]*"
+            i += 1
+        elif c == "?":
+            ret += "[^/]"
+            i += 1
+        elif c == "[":
+            j = pattern.find("]", i + 1)
+            if j == -1:
+                ret += re.escape(c)
+                i += 1
+            else:
+                class_ = pattern[i + 1 : j]
+                if class_.startswith("!"):
+                    class_ = "^" + class_[1:]
+                ret += "[" + class_.replace("\\", "\\\\") + "]"
+                i = j + 1
+        else:
+            ret += re.escape(c)
+            i += 1
+    return ret
+
+
+class _Rule:
+    """
+    A rule of `.gitignore` or an exclude glob.
+    """
+
+    _base: str
+    _regex: Pattern[str]
+    _negate: bool
+    _dir_only: bool
+    _anchored: bool
+
+    def __init__(self, base: str, pattern: str) -> None:
+        self._base = base
+        self._negate = pattern.startswith("!")
+        if self._negate:
+            pattern = pattern[1:]
+        self._dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # A pattern containing `/` (except trailing one) is relative to the base.  Otherwise, it matches a name in any depth.
+        self._anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        self._regex = re.compile(_translate_glob(pattern))
+
+    def match(self, rel_path: str, name: str, is_dir: bool) -> Optional[bool]:
+        """
+        Returns `True` if ignored, `False` if re-included, and `None` if the rule does not apply.
+        """
+        if self._dir_only and not is_dir:
+            return None
+        if self._base != "":
+            if not rel_path.startswith(self._base + "/"):
+                return None
+            rel_path = rel_path[len(self._base) + 1 :]
+        target = rel_path if self._anchored else name
+        if self._regex.fullmatch(target) is None:
+            return None
+        return not self._negate
+
+
+def _read_gitignore(dir_: Path, base: str) -> List[_Rule]:
+    try:
+        with open(dir_ / ".gitignore", "r") as f:
+            lines = f.read().splitlines()
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+    # fmt: off
+    return [_Rule(base, line.rstrip())
+            for line in lines
+            if line.strip() != "" and not line.startswith("#")]
+
+
+class _IgnoreRules:
+    """
+    Rules to prune while walking.  Paths are matched relative to `root`.
+    """
+
+    _root: Path
+    _exclude_dirs: List[str]
+    _rules: List[_Rule]
+    _use_gitignore: bool
+
+    def __init__(
+        self,
+        root: Path,
+        exclude_globs: Optional[List[str]] = None,
+        use_gitignore: bool = True,
+        exclude_dirs: Optional[List[str]] = None,
+    ) -> None:
+        self._root = root
+        self._exclude_dirs = DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs
+        self._rules = [_Rule("", glob) for glob in (exclude_globs or [])]
+        self._use_gitignore = use_gitignore
+
+    def _rel(self, path: Path) -> str:
+        try:
+            rel = os.path.relpath(path, self._root)
+        except ValueError:
+            return path.as_posix()
+        return "" if rel == "." else Path(rel).as_posix()
+
+    def _gitignore_rules(self, dir_: Path, rel_dir: str) -> List[_Rule]:
+        if not self._use_gitignore:
+            return []
+        return _read_gitignore(dir_, rel_dir)
+
+    def initial_rules(self, top: Path) -> List[_Rule]:
+        """
+        Rules of `.gitignore` in `root` and directories from `root` to `top`.
+        """
+        rel = self._rel(top)
+        if rel.startswith(".."):
+            return self._rules + self._gitignore_rules(top, rel)
+
+        ret = self._rules + self._gitignore_rules(self._root, "")
+        dir_ = self._root
+        rel_dir = ""
+        for part in [] if rel == "" else rel.split("/"):
+            dir_ = dir_ / part
+            rel_dir = part if rel_dir == "" else rel_dir + "/" + part
+            ret += self._gitignore_rules(dir_, rel_dir)
+        return ret
+
+    def is_ignored(self, rules: List[_Rule], path: str, rel_path: str, name: str, is_dir: bool) -> bool:
+        if is_dir and name in self._exclude_dirs and not os.path.exists(os.path.join(path, "__init__.py")):
+            return True
+
+        ret = False
+        # The last matching rule wins.
+        for rule in rules:
+            x = rule.match(rel_path, name, is_dir)
+            if x is not None:
+                ret = x
+        return ret
+
+
+def _is_path_ignored(path: Path, ignore: _IgnoreRules) -> bool:
+    """
+    Whether a file, e.g. given by a command line, is ignored by the same rules as walking.
+    """
+    rel = ignore._rel(path)
+    if rel.startswith(".."):
+        return False
+    parts = rel.split("/")
+    rules = ignore.initial_rules(ignore._root)
+    dir_ = ignore._root
+    rel_dir = ""
+    for part in parts[:-1]:
+        dir_ = dir_ / part
+        rel_dir = part if rel_dir == "" else rel_dir + "/" + part
+        if ignore.is_ignored(rules, str(dir_), rel_dir, part, True):
+            return True
+        rules = rules + ignore._gitignore_rules(dir_, rel_dir)
+    return ignore.is_ignored(rules, str(path), rel, parts[-1], False)
+
+
+def _walk_python_files(top: Path, ignore: _IgnoreRules) -> Iterator[Path]:
+    """
+    Yield python files under `top` in sorted order, i.e. the same order as `sorted()` of `Path`s, pruning ignored directories.
+    """
+    return _walk_python_files_aux(str(top), ignore._rel(top), ignore.initial_rules(top), ignore)
+
+
+def _walk_python_files_aux(dir_: str, rel_dir: str, rules: List[_Rule], ignore: _IgnoreRules) -> Iterator[Path]:
+    try:
+        with os.scandir(dir_) as it:
+            # Depth first search with entries sorted by name.  This order coincides with the order of `Path`s, which compares
+            # parts.
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    for entry in entries:
+        rel_path = entry.name if rel_dir == "" else rel_dir + "/" + entry.name
+        # Same as `os.walk()`: symlinks to directories are not followed.
+        if entry.is_dir(follow_symlinks=False):
+            if not ignore.is_ignored(rules, entry.path, rel_path, entry.name, True):
+                subrules = rules + ignore._gitignore_rules(Path(entry.path), rel_path)
+                yield from _walk_python_files_aux(entry.path, rel_path, subrules, ignore)
+        elif entry.name.endswith(".py") and not ignore.is_ignored(rules, entry.path, rel_path, entry.name, False):
+            yield Path(entry.path)
+
+
+def _list_all_python_files(path: Path, ignore: Optional[_IgnoreRules] = None) -> Iterator[Path]:
+    """
+    Yield python files under `path` in sorted order.  Only default directories are pruned if `ignore` is not given.
+    """
+    if ignore is None:
+        ignore = _IgnoreRules(Path(), use_gitignore=False)
+    return _walk_python_files(path, ignore)
@@ -0,0 +1,180 @@
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .dist_index import _METADATA_DIR_SUFFIXES, _DistIndex, _get_modules_of_paths, _normalize_name, _parse_metadata_headers
+from .exception import WheelNotFoundError
+
+# Directories of a wheel installed as is.  Files under `<name>.data/` other than these are not modules.
+_DATA_LIB_DIRS = ("purelib", "platlib")
+
+
+def _read_poetry_lock(path: Path) -> dict[str, str]:  # type: ignore  # reason: dict
+    """
+    Pinned versions of distributions, keyed by normalized names.
+    """
+    import toml
+
+    t = toml.load(path)
+    # fmt: off
+    return dict((_normalize_name(package["name"]), package["version"])
+                for package in t.get("package", []))
+
+
+def _parse_wheel_filename(filename: str) -> Optional[Tuple[str, str]]:
+    """
+    The normalized name and the version of a wheel, as PEP 427.  `None` if not a wheel.
+
+    >>> _parse_wheel_filename("stdlib_list-0.8.0-py3-none-any.whl")
+    ('stdlib-list', '0.8.0')
+    >>> _parse_wheel_filename("Pillow-8.2.0-1-cp39-cp39-manylinux1_x86_64.whl")
+    ('pillow', '8.2.0')
+    >>> _parse_wheel_filename("toml-0.10.2.tar.gz") is None
+    True
+    """
+    if not filename.endswith(".whl"):
+        return None
+    parts = filename[: -len(".whl")].split("-")
+    if len(parts) not in (5, 6):
+        return None
+    return (_normalize_name(parts[0]), parts[1])
+
+
+def _installed_path(path: str) -> Optional[str]:
+    """
+    The path a file of a wheel is installed to, relative to site-packages.  `None` if not installed there.
+
+    >>> _installed_path("foo/__init__.py")
+    'foo/__init__.py'
+    >>> _installed_path("foo-1.0.data/purelib/bar.py")
+    'bar.py'
+    >>> _installed_path("foo-1.0.data/scripts/foo") is None
+    True
+    """
+    head = path.split("/", 1)[0]
+    if not head.endswith(".data"):
+        return path
+    parts = path.split("/", 2)
+    if len(parts) == 3 and parts[1] in _DATA_LIB_DIRS:
+        return parts[2]
+    return None
+
+
+def _read_lines(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip() != ""]
+
+
+def _get_metadata_of_wheel(path: Path) -> Tuple[Optional[str], List[str]]:
+    import zipfile
+
+    with zipfile.ZipFile(path) as z:
+        # fmt: off
+        names = [name
+                 for name in z.namelist()
+                 if name.count("/") == 1 and name.endswith(".dist-info/METADATA")]
+        text = z.read(names[0]).decode(errors="replace") if len(names) != 0 else ""
+    return _parse_metadata_headers(text)
+
+
+def _get_modules_of_wheel(path: Path) -> List[str]:
+    """
+    Modules of a wheel, read from the zip without extracting it.  As installed distributions, `top_level.txt` is used unless
+    it names a namespace package.  Otherwise the list of files in the zip, which is the same as `RECORD`, tells the depth.
+    """
+    import zipfile
+
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        # fmt: off
+        metadata_dirs = [name.split("/", 1)[0]
+                         for name in names
+                         if name.split("/", 1)[0].endswith(_METADATA_DIR_SUFFIXES)]
+        metadata_dir = metadata_dirs[0] if len(metadata_dirs) != 0 else ""
+        texts = {}
+        for x in ["top_level.txt", "namespace_packages.txt"]:
+            try:
+                texts[x] = z.read(f"{metadata_dir}/{x}").decode()
+            except KeyError:
+                pass
+
+    # fmt: off
+    paths = [x
+             for x in (_installed_path(name) for name in names)
+             if x is not None]
+    namespaces = _read_lines(texts["namespace_packages.txt"]) if "namespace_packages.txt" in texts else None
+    if ("top_level.txt" in texts) and (namespaces is None):
+        top_level = _read_lines(texts["top_level.txt"])
+        files = set(paths)
+        # A directory without `__init__.py` is a namespace package.
+        # fmt: off
+        namespace_like = [m
+                          for m in top_level
+                          if (f"{m}/__init__.py" not in files) and any(x.startswith(m + "/") for x in paths)]
+        if len(namespace_like) == 0:
+            return [m.replace("/", ".") for m in top_level]
+    return _get_modules_of_paths(paths, namespaces)
+
+
+class _WheelIndex(_DistIndex):
+    """
+    Index of distributions pinned by `poetry.lock`, resolved from wheels in directories instead of installed distributions.
+    So that a project can be checked without installing dependencies.
+
+    Directories are searched recursively, e.g. a wheelhouse made by `pip wheel` or a cache of poetry.
+    """
+
+    _pins: dict[str, str]  # type: ignore  # reason: dict
+    _wheels: dict[Tuple[str, str], Path]  # type: ignore  # reason: dict
+    _wheel_dirs: List[Path]
+
+    def __init__(
+        self, pins: dict[str, str], wheels: dict[Tuple[str, str], Path], wheel_dirs: List[Path]  # type: ignore  # reason: dict
+    ) -> None:
+        super().__init__({})
+        self._pins = pins
+        self._wheels = wheels
+        self._wheel_dirs = wheel_dirs
+
+    @classmethod
+    def load(cls, lockfile: Path, wheel_dirs: List[Path]) -> "_WheelIndex":
+        pins = _read_poetry_lock(lockfile)
+        wheels = {}
+        for wheel_dir in wheel_dirs:
+            for (d, _, fs) in os.walk(wheel_dir):
+                for f in sorted(fs):
+                    key = _parse_wheel_filename(f)
+                    # Only pinned ones.  Any platform will do, as modules hardly differ among them.
+                    if (key is not None) and (pins.get(key[0]) == key[1]):
+                        wheels.setdefault(key, Path(d) / f)
+        return cls(pins, wheels, wheel_dirs)
+
+    def names(self) -> List[str]:
+        return sorted(name for (name, _) in self._wheels)
+
+    def wheel(self, project_name: str) -> Path:
+        name = _normalize_name(project_name)
+        version = self._pins.get(name)
+        if version is None:
+            raise WheelNotFoundError(f"{project_name} is not locked.  Run `poetry lock`.")
+        wheel = self._wheels.get((name, version))
+        if wheel is None:
+            dirs = ", ".join(str(d) for d in self._wheel_dirs)
+            raise WheelNotFoundError(f"{project_name}=={version} is locked, but no wheel of it is found in {dirs}.")
+        return wheel
+
+    def modules(self, project_name: str) -> List[str]:
+        name = _normalize_name(project_name)
+        modules = self._name_to_modules.get(name)
+        if modules is None:
+            modules = _get_modules_of_wheel(self.wheel(project_name))
+            self._name_to_modules[name] = modules
+        return modules
+
+    def metadata(self, project_name: str) -> Tuple[str, List[str]]:
+        name = _normalize_name(project_name)
+        metadata = self._name_to_metadata.get(name)
+        if metadata is None:
+            (name_, requires) = _get_metadata_of_wheel(self.wheel(project_name))
+            metadata = (name_ or project_name, requires)
+            self._name_to_metadata[name] = metadata
+        return metadata
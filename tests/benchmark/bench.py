@@ -0,0 +1,167 @@
+"""
+Benchmark phases of a check against a synthetic project, and compare with a baseline.
+
+Usage:
+
+    python -m tests.benchmark.bench                          # Print results.
+    python -m tests.benchmark.bench --baseline FILE          # Fail if regressed from the baseline.
+    python -m tests.benchmark.bench --baseline FILE --update # Write the baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, List, Tuple, TypeVar
+
+from pyproject_indirect_import_detector.detector import _IllegalImportDetected
+from pyproject_indirect_import_detector.dist_index import _DistIndex
+from pyproject_indirect_import_detector.engine import DEFAULT_ENGINE, ENGINES, _check_files, _targets
+from pyproject_indirect_import_detector.main import _report
+from pyproject_indirect_import_detector.pyproject import _PyProject
+
+from .generate import SITE_PACKAGES, _add_params_arguments, _generate, _Params, _params_of_args
+
+T = TypeVar("T")
+
+# Phases in the order of a check.
+PHASES = ["load", "load_module_to_proj", "walk", "detect", "report"]
+
+# Relative slowdown regarded as a regression.
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below this are noise, whatever the ratio is.
+_MIN_SECONDS = 0.05
+_MIN_BYTES = 1024 * 1024
+
+
+def _timed(times: dict[str, float], phase: str, f: Callable[[], T]) -> T:  # type: ignore  # reason: dict
+    start = time.perf_counter()
+    ret = f()
+    times[phase] = time.perf_counter() - start
+    return ret
+
+
+def _run_once(root: Path, engine: str, jobs: int) -> Tuple[dict[str, float], int]:  # type: ignore  # reason: dict
+    """
+    Check the project in `root` once.  Returns seconds of each phase and the number of violations.
+    """
+    times: dict[str, float] = {}  # type: ignore  # reason: dict
+
+    pyproject = _timed(times, "load", lambda: _PyProject.load(root).unwrap())
+    index = _DistIndex.scan([str(root / SITE_PACKAGES)])
+    maps = _timed(times, "load_module_to_proj", lambda: pyproject.load_scope_module_to_proj(index).unwrap())
+    targets = _timed(times, "walk", lambda: list(_targets(pyproject, list(maps.keys()))))
+    xs: List[Tuple[Path, List[_IllegalImportDetected]]] = _timed(
+        times, "detect", lambda: _check_files(maps, targets, jobs, None, engine).unwrap()
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        _timed(times, "report", lambda: _report(xs, True))
+
+    return (times, sum(len(es) for (_, es) in xs))
+
+
+def _peak_memory(root: Path, engine: str) -> int:
+    """
+    Peak of memory allocated by python during a check, in bytes.  Measured separately as tracing slows down timings.
+    """
+    tracemalloc.start()
+    try:
+        _run_once(root, engine, 1)
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _bench(root: Path, params: _Params, engine: str, jobs: int, repeat: int) -> dict[str, Any]:  # type: ignore  # reason: dict
+    """
+    Generate a project in `root` and benchmark it.  The minimum of `repeat` runs is taken for each phase.
+    """
+    _generate(root, params)
+
+    runs = [_run_once(root, engine, jobs) for _ in range(repeat)]
+    # fmt: off
+    seconds = dict((phase, min(times[phase] for (times, _) in runs))
+                   for phase in PHASES)
+    return {
+        "params": params._asdict(),
+        "engine": engine,
+        "jobs": jobs,
+        "files": params.files,
+        "violations": runs[0][1],
+        "seconds": seconds,
+        "total_seconds": sum(seconds.values()),
+        "peak_memory_bytes": _peak_memory(root, engine),
+    }
+
+
+def _regressions(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float  # type: ignore  # reason: dict
+) -> List[str]:
+    """
+    Descriptions of regressions.  Empty if none.
+    """
+    ret = []
+    for phase in PHASES:
+        (b, c) = (baseline["seconds"][phase], current["seconds"][phase])
+        if c > b * (1 + threshold) and c - b > _MIN_SECONDS:
+            ret.append(f"{phase}: {b:.4f}s -> {c:.4f}s (+{(c / b - 1) * 100:.0f}%)")
+    (b, c) = (baseline["peak_memory_bytes"], current["peak_memory_bytes"])
+    if c > b * (1 + threshold) and c - b > _MIN_BYTES:
+        ret.append(f"peak memory: {b} -> {c} bytes (+{(c / b - 1) * 100:.0f}%)")
+    return ret
+
+
+def _print_result(result: dict[str, Any]) -> None:  # type: ignore  # reason: dict
+    print(f"{result['files']} files, {result['violations']} violations, engine = {result['engine']}, jobs = {result['jobs']}")
+    for phase in PHASES:
+        print(f"    {phase:<20} {result['seconds'][phase]:.4f}s")
+    print(f"    {'total':<20} {result['total_seconds']:.4f}s")
+    print(f"    {'peak memory':<20} {result['peak_memory_bytes'] / 1024 / 1024:.1f}MiB")
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark with a synthetic project")
+    _add_params_arguments(parser)
+    parser.add_argument("--engine", choices=list(ENGINES.keys()), default=DEFAULT_ENGINE)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--root", type=Path, default=None, help="Where to generate the project. (default: a temporary directory)"
+    )
+    parser.add_argument("--baseline", type=Path, default=None, help="Baseline JSON to compare with.")
+    parser.add_argument("--update", action="store_true", help="Write the result to the baseline instead of comparing.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown.")
+    args = parser.parse_args()
+
+    params = _params_of_args(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "synthetic" if args.root is None else args.root
+        result = _bench(root, params, args.engine, args.jobs, args.repeat)
+    _print_result(result)
+
+    if args.baseline is None:
+        return
+    if args.update:
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if (baseline["params"], baseline["engine"], baseline["jobs"]) != (result["params"], result["engine"], result["jobs"]):
+        print("Error: the baseline was measured with different parameters.", file=sys.stderr)
+        sys.exit(2)
+    regressions = _regressions(baseline, result, args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if len(regressions) != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,153 @@
+"""
+Generate a synthetic poetry project to benchmark against.
+
+Dependencies are fake distributions in `site-packages/` under the project, so that generation and benchmarks run offline.
+"""
+
+import argparse
+import random
+import shutil
+from pathlib import Path
+from typing import List, NamedTuple
+
+PACKAGE_NAME = "synthetic"
+SITE_PACKAGES = "site-packages"
+
+# Always in stdlib of the target python.
+_STDLIB_MODULES = ["os", "sys", "re", "json", "typing", "pathlib", "collections", "functools", "itertools", "logging"]
+
+# Ratio of imports of modules not in dependencies.  They are reported as violations, so the report phase has some work.
+_MISSING_RATIO = 0.02
+
+
+class _Params(NamedTuple):
+    files: int = 1000
+    imports_per_file: int = 10
+    lines_per_file: int = 200
+    depth: int = 3
+    deps: int = 50
+    seed: int = 0
+
+
+def _dep_name(i: int) -> str:
+    return f"fakedep-{i:03}"
+
+
+def _dep_module(i: int) -> str:
+    return f"fakedep_{i:03}"
+
+
+def _write_distribution(site_packages: Path, i: int) -> None:
+    metadata_dir = site_packages / f"{_dep_module(i)}-1.0.dist-info"
+    metadata_dir.mkdir(parents=True)
+    (metadata_dir / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {_dep_name(i)}\nVersion: 1.0\n")
+    (metadata_dir / "top_level.txt").write_text(f"{_dep_module(i)}\n")
+    (metadata_dir / "RECORD").write_text(
+        f"{_dep_module(i)}/__init__.py,,\n{metadata_dir.name}/METADATA,,\n{metadata_dir.name}/RECORD,,\n"
+    )
+    (site_packages / _dep_module(i)).mkdir()
+    (site_packages / _dep_module(i) / "__init__.py").write_text("")
+
+
+def _pyproject_toml(params: _Params) -> str:
+    deps = "".join(f'"{_dep_name(i)}" = "*"\n' for i in range(params.deps))
+    return (
+        "[tool.poetry]\n"
+        f'name = "{PACKAGE_NAME}"\n'
+        "\n"
+        "[tool.poetry.dependencies]\n"
+        'python = "^3.9"\n'
+        f"{deps}"
+    )
+
+
+def _source(rng: random.Random, params: _Params, module_dirs: List[str]) -> str:
+    lines = []
+    for _ in range(params.imports_per_file):
+        x = rng.random()
+        if x < _MISSING_RATIO:
+            lines.append(f"import missing_{rng.randrange(10)}")
+        elif x < 0.3 or params.deps == 0:
+            lines.append(f"import {rng.choice(_STDLIB_MODULES)}")
+        elif x < 0.4:
+            lines.append(f"from . import name_{rng.randrange(100)}")
+        elif x < 0.5:
+            lines.append(f"import {rng.choice(module_dirs)}")
+        elif x < 0.75:
+            lines.append(f"from {_dep_module(rng.randrange(params.deps))} import name_{rng.randrange(100)}")
+        else:
+            lines.append(f"import {_dep_module(rng.randrange(params.deps))}")
+    lines.append("")
+
+    # Bodies without imports, so that the file size is realistic.
+    i = 0
+    while len(lines) < params.lines_per_file:
+        lines += [
+            f"def function_{i}(x, y=None):",
+            f'    """Docstring of function_{i}."""',
+            "    if y is None:",
+            f"        return [x * {i} for _ in range(10)]",
+            "    return {'x': x, 'y': y}",
+            "",
+        ]
+        i += 1
+    return "\n".join(lines) + "\n"
+
+
+def _generate(root: Path, params: _Params) -> None:
+    """
+    Generate a project in `root`.  `root` is removed if exists.
+
+    Files are spread over packages nested to `params.depth`.  About one tenth are tests, which belong to the dev scope.
+    """
+    if root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True)
+    rng = random.Random(params.seed)
+
+    (root / "pyproject.toml").write_text(_pyproject_toml(params))
+    for i in range(params.deps):
+        _write_distribution(root / SITE_PACKAGES, i)
+
+    # Package directories, e.g. `synthetic/sub1/sub0`.
+    dirs = [Path(PACKAGE_NAME)]
+    for d in range(1, params.depth + 1):
+        dirs += [dir_ / f"sub{j}" for dir_ in dirs if len(dir_.parts) == d for j in range(2)]
+    module_dirs = [".".join(dir_.parts) for dir_ in dirs]
+    for dir_ in dirs:
+        (root / dir_).mkdir(parents=True, exist_ok=True)
+        (root / dir_ / "__init__.py").write_text("")
+    (root / "tests").mkdir()
+
+    for i in range(params.files):
+        if i % 10 == 9:
+            path = root / "tests" / f"test_{i}.py"
+        else:
+            path = root / dirs[i % len(dirs)] / f"module_{i}.py"
+        path.write_text(_source(rng, params, module_dirs))
+
+
+def _add_params_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = _Params()
+    parser.add_argument("--files", type=int, default=defaults.files, help="Number of python files.")
+    parser.add_argument("--imports-per-file", type=int, default=defaults.imports_per_file)
+    parser.add_argument("--lines-per-file", type=int, default=defaults.lines_per_file, help="Approximate file size.")
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="Nesting depth of packages.")
+    parser.add_argument("--deps", type=int, default=defaults.deps, help="Number of dependencies.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def _params_of_args(args: argparse.Namespace) -> _Params:
+    return _Params(args.files, args.imports_per_file, args.lines_per_file, args.depth, args.deps, args.seed)
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic project")
+    parser.add_argument("root", type=Path)
+    _add_params_arguments(parser)
+    args = parser.parse_args()
+    _generate(args.root, _params_of_args(args))
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,155 @@
+"""
+Microbenchmark of the detector core, i.e. `_extract_bytes()` and validation as engines run them, against an
+`ast.NodeVisitor` based one, i.e. the implementation before it walked only statements.  Both parse the source.
+
+Usage:
+
+    python -m tests.benchmark.micro
+    python -m tests.benchmark.micro --lines-per-file 2000
+"""
+
+import argparse
+import ast
+import random
+import re
+import time
+import tracemalloc
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, List, Tuple
+
+from pyproject_indirect_import_detector.detector import (
+    _BODY_FIELDS_OF_TYPES,
+    _extract_bytes,
+    _get_source,
+    _illegal_module,
+    _IllegalImportDetected,
+    _validate_imports,
+)
+from pyproject_indirect_import_detector.reader import _Lines
+
+from .generate import _add_params_arguments, _dep_module, _Params, _params_of_args, _source
+
+
+class _NodeVisitorDetector(ast.NodeVisitor):
+    """
+    The detector before rewritten, as the reference.  Visits all nodes, and builds source lines of all imports.
+    """
+
+    def __init__(self, module_to_proj: dict[str, str], source: List[str], tree: Any) -> None:  # type: ignore  # reason: dict
+        self._module_to_proj = module_to_proj
+        self._source = source
+        self._tree = tree
+        # (lineno, line, module)
+        self._imports: List[Tuple[int, str, str]] = []
+
+    def detect(self) -> List[_IllegalImportDetected]:
+        self.visit(self._tree)
+        ret = []
+        for (lineno, line, module) in self._imports:
+            m = _illegal_module(self._module_to_proj, module)
+            if m is not None:
+                ret.append(_IllegalImportDetected(Path(), lineno, line, m))
+        return ret
+
+    def visit_Import(self, node: Any) -> None:
+        line = _get_source(self._source, node)
+        for name in node.names:
+            self._imports.append((node.lineno, line, name.name))
+
+    def visit_ImportFrom(self, node: Any) -> None:
+        line = _get_source(self._source, node)
+        p = re.compile("from +([^ ]+)")
+        m = p.match(line)
+        assert m is not None
+        self._imports.append((node.lineno, line, m.group(1)))
+
+
+def _detect_by_node_visitor(module_to_proj: dict[str, str], data: bytes) -> List[_IllegalImportDetected]:  # type: ignore  # reason: dict
+    tree = ast.parse(data)
+    return _NodeVisitorDetector(module_to_proj, data.decode().split("\n"), tree).detect()
+
+
+def _detect(module_to_proj: dict[str, str], data: bytes) -> List[_IllegalImportDetected]:  # type: ignore  # reason: dict
+    return _validate_imports(module_to_proj, Path(), _extract_bytes(data), _Lines(data))
+
+
+def _n_nodes(tree: Any) -> Tuple[int, int]:
+    """
+    Numbers of nodes visited by `ast.NodeVisitor` and by `_ImportCollector`, which visits only statements.
+    """
+    types = tuple(_BODY_FIELDS_OF_TYPES.keys()) + (ast.stmt,)
+    nodes = list(ast.walk(tree))
+    return (len(nodes) - 1, sum(1 for node in nodes if isinstance(node, types)))
+
+
+def _measure(detects: List[Callable[[], List[_IllegalImportDetected]]], repeat: int) -> Tuple[float, float, int]:
+    """
+    Seconds of the fastest run over all files, the mean of peak bytes allocated while detecting a file, and the number of
+    violations.
+    """
+    seconds = min(_timed(lambda: [detect() for detect in detects]) for _ in range(repeat))
+    peaks = []
+    violations = 0
+    tracemalloc.start()
+    try:
+        for detect in detects:
+            tracemalloc.reset_peak()
+            (base, _) = tracemalloc.get_traced_memory()
+            violations += len(detect())
+            (_, peak) = tracemalloc.get_traced_memory()
+            peaks.append(peak - base)
+    finally:
+        tracemalloc.stop()
+    return (seconds, sum(peaks) / len(peaks), violations)
+
+
+def _timed(f: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def _bench_micro(params: _Params, repeat: int) -> dict[str, Any]:  # type: ignore  # reason: dict
+    """
+    Detect imports of `params.files` generated sources with both implementations.  Figures are per file.
+    """
+    rng = random.Random(params.seed)
+    module_to_proj = dict((_dep_module(i), f"dep-{i}") for i in range(params.deps))
+    sources = [_source(rng, params, ["synthetic"]).encode() for _ in range(params.files)]
+
+    old = [partial(_detect_by_node_visitor, module_to_proj, data) for data in sources]
+    new = [partial(_detect, module_to_proj, data) for data in sources]
+    nodes = [_n_nodes(ast.parse(data)) for data in sources]
+    ret = {}
+    for (name, detects, n_visited) in [
+        ("node_visitor", old, sum(x for (x, _) in nodes)),
+        ("statements", new, sum(y for (_, y) in nodes)),
+    ]:
+        (seconds, peak, violations) = _measure(detects, repeat)
+        ret[name] = {
+            "nodes_visited_per_file": n_visited / params.files,
+            "microseconds_per_file": seconds / params.files * 1e6,
+            "peak_bytes_per_file": peak,
+            "violations": violations,
+        }
+    return ret
+
+
+def _main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark of the detector core")
+    _add_params_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = _bench_micro(_params_of_args(args), args.repeat)
+    print(f"{'':<16} {'nodes/file':>12} {'us/file':>10} {'peak B/file':>12} {'violations':>11}")
+    for (name, x) in result.items():
+        print(
+            f"{name:<16} {x['nodes_visited_per_file']:>12.1f} {x['microseconds_per_file']:>10.1f} "
+            f"{x['peak_bytes_per_file']:>12.1f} {x['violations']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    _main()
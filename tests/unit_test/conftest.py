@@ -0,0 +1,48 @@
+from pathlib import Path
+from typing import Callable, Dict, Sequence
+
+import pytest
+
+# Writes files of a project, relative paths to texts, and changes the current directory to it.
+WriteProject = Callable[[Dict[str, str]], Path]
+
+
+@pytest.fixture
+def write_project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> WriteProject:
+    def write(files: Dict[str, str]) -> Path:
+        for (name, text) in files.items():
+            path = tmp_path / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+        monkeypatch.chdir(tmp_path)
+        return tmp_path
+
+    return write
+
+
+def write_dist(
+    site: Path,
+    name: str,
+    top_level: Sequence[str],
+    files: Sequence[str] = (),
+    requires: Sequence[str] = (),
+    version: str = "1.0",
+    description: str = "",
+) -> Path:
+    """
+    Writes an installed distribution as a wheel does, and returns its metadata directory.  `RECORD` is written if `files` are
+    given.
+    """
+    # Wheels escape `-` in names of metadata directories.
+    metadata_dir = site / (name.replace("-", "_") + f"-{version}.dist-info")
+    metadata_dir.mkdir(parents=True)
+    headers = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"] + [f"Requires-Dist: {x}" for x in requires]
+    (metadata_dir / "METADATA").write_text("\n".join(headers) + "\n\n" + description)
+    (metadata_dir / "top_level.txt").write_text("\n".join(top_level) + "\n")
+    if files:
+        records = list(files) + [f"{metadata_dir.name}/METADATA", f"{metadata_dir.name}/RECORD"]
+        (metadata_dir / "RECORD").write_text("".join(f"{f},,\n" for f in records))
+        for f in files:
+            (site / f).parent.mkdir(parents=True, exist_ok=True)
+            (site / f).write_text("")
+    return metadata_dir
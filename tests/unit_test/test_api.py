@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+from pyproject_indirect_import_detector import Session, Violation
+from pyproject_indirect_import_detector.pyproject import _PyProject
+
+from .conftest import WriteProject
+
+PYPROJECT = """
+[tool.poetry]
+name = "foo"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+toml = "*"
+
+[tool.poetry.dev-dependencies]
+pytest = "*"
+"""
+
+
+@pytest.fixture
+def project(write_project: WriteProject) -> Path:
+    return write_project(
+        {
+            "pyproject.toml": PYPROJECT,
+            "foo/__init__.py": "import os\nimport toml\n",
+            "foo/bar.py": "import pytest\n",
+            "tests/test_foo.py": "import pytest\n",
+        }
+    )
+
+
+def test_session(project: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    session = Session()
+    xs = session.check_paths()
+    assert [(x.path.as_posix(), x.ok) for x in xs] == [
+        ("foo/__init__.py", True),
+        ("foo/bar.py", False),
+        ("tests/test_foo.py", True),
+    ]
+    assert xs[1].violations == [Violation(Path("foo/bar.py"), 1, "import pytest", "pytest")]
+
+    # Later calls do not load `pyproject.toml` again.
+    def fail(*args: object) -> None:
+        raise AssertionError("loaded again")
+
+    monkeypatch.setattr(_PyProject, "load", fail)
+    assert [x.path.as_posix() for x in session.check_paths(["foo/bar.py", "README.md"])] == ["foo/bar.py"]
+
+    violations = session.check_source("foo/new.py", "import os\nimport yaml\n")
+    assert violations == [Violation(Path("foo/new.py"), 2, "import yaml", "yaml")]
+    assert session.check_source("foo/new.py", "import pytest\n") != []
+    assert session.check_source("tests/test_new.py", "import pytest\n") == []
+
+    with pytest.raises(AssertionError):
+        session.reload()
+        session.check_paths()
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from ..benchmark.bench import PHASES, _bench, _regressions
+from ..benchmark.generate import _Params
+from ..benchmark.micro import _bench_micro
+
+
+def test_bench(tmp_path: Path) -> None:
+    params = _Params(files=30, imports_per_file=50, lines_per_file=60, depth=2, deps=3)
+    result = _bench(tmp_path / "synthetic", params, "ast", 1, 1)
+    assert result["files"] == 30
+    assert result["violations"] > 0
+    assert list(result["seconds"].keys()) == PHASES
+    assert result["peak_memory_bytes"] > 0
+
+    assert _regressions(result, result, 0.25) == []
+    slow = {**result, "seconds": {**result["seconds"], "detect": result["seconds"]["detect"] * 2 + 1}}
+    assert [x.split(":")[0] for x in _regressions(result, slow, 0.25)] == ["detect"]
+
+
+def test_bench_micro() -> None:
+    params = _Params(files=10, imports_per_file=20, lines_per_file=60, deps=3)
+    result = _bench_micro(params, 1)
+    (old, new) = (result["node_visitor"], result["statements"])
+    assert old["violations"] == new["violations"] > 0
+    assert new["nodes_visited_per_file"] < old["nodes_visited_per_file"]
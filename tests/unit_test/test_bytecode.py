@@ -0,0 +1,88 @@
+import marshal
+import py_compile
+import sys
+from pathlib import Path
+
+import pytest
+from pyproject_indirect_import_detector import bytecode
+from pyproject_indirect_import_detector.bytecode import _CannotUseBytecode, _extract_file_by_bytecode
+from pyproject_indirect_import_detector.detector import _extract_file
+
+from .test_scanner import CASES
+
+requires_positions = pytest.mark.skipif(sys.version_info < (3, 11), reason="no positions of instructions")
+
+MORE_CASES = [
+    "from . module import x\nfrom .. import y\nfrom .a.b import c\n",
+    "import a\nclass A:\n    import b\n    def f(self):\n        from c import d\n    import e\n",
+    "def f():\n    import a\nimport b\n",
+    "x = [i for i in range(3)]\ndef g():\n    return lambda: __import__('x')\n",
+    "# -*- coding: latin-1 -*-\ns = '\xe9'; import a\n",
+    "\ufeffimport a\r\nimport b\r\n",
+]
+
+
+def write(tmp_path: Path, s: str, invalidation_mode: py_compile.PycInvalidationMode) -> Path:
+    path = tmp_path / "a.py"
+    path.write_bytes(s.encode("latin-1" if "latin-1" in s else "utf-8"))
+    py_compile.compile(str(path), doraise=True, invalidation_mode=invalidation_mode)
+    return path
+
+
+@pytest.mark.parametrize("s", CASES + MORE_CASES)
+@pytest.mark.parametrize("mode", list(py_compile.PycInvalidationMode))
+def test_bytecode_same_as_ast(tmp_path: Path, s: str, mode: py_compile.PycInvalidationMode) -> None:
+    path = write(tmp_path, s, mode)
+    assert bytecode._read_fresh_pyc(path, path.read_bytes()) is not None
+    assert _extract_file_by_bytecode(path, path.read_bytes()) == _extract_file(path, path.read_bytes())
+
+
+@requires_positions
+@pytest.mark.parametrize("s", MORE_CASES)
+def test_bytecode_is_used(tmp_path: Path, s: str) -> None:
+    path = write(tmp_path, s, py_compile.PycInvalidationMode.TIMESTAMP)
+    data = path.read_bytes()
+    marshalled = bytecode._read_fresh_pyc(path, data)
+    assert marshalled is not None
+    imports = bytecode._imports_of_code(marshal.loads(marshalled))
+    bytecode._check_no_dead_import(data, imports)
+    assert imports == _extract_file(path, data)
+
+
+FALLBACK_CASES = [
+    # Dropped by the compiler.
+    "if False:\n    import a\n",
+    "def f():\n    return\n    import a\n",
+    # Compiled twice.
+    "try:\n    pass\nfinally:\n    import a\n",
+    "import a, a\n",
+]
+
+
+@pytest.mark.parametrize("s", FALLBACK_CASES)
+def test_bytecode_falls_back(tmp_path: Path, s: str) -> None:
+    path = write(tmp_path, s, py_compile.PycInvalidationMode.TIMESTAMP)
+    assert _extract_file_by_bytecode(path, path.read_bytes()) == _extract_file(path, path.read_bytes())
+
+
+@requires_positions
+@pytest.mark.parametrize("s", FALLBACK_CASES)
+def test_bytecode_cannot_be_used(tmp_path: Path, s: str) -> None:
+    path = write(tmp_path, s, py_compile.PycInvalidationMode.TIMESTAMP)
+    data = path.read_bytes()
+    marshalled = bytecode._read_fresh_pyc(path, data)
+    assert marshalled is not None
+    with pytest.raises(_CannotUseBytecode):
+        imports = bytecode._imports_of_code(marshal.loads(marshalled))
+        bytecode._check_no_dead_import(data, imports)
+
+
+def test_stale_pyc(tmp_path: Path) -> None:
+    path = write(tmp_path, "import a\n", py_compile.PycInvalidationMode.TIMESTAMP)
+    path.write_text("import b\n\n")
+    assert bytecode._read_fresh_pyc(path, path.read_bytes()) is None
+    assert [imp.module for imp in _extract_file_by_bytecode(path, path.read_bytes())] == ["b"]
+
+    path = write(tmp_path, "import a\n", py_compile.PycInvalidationMode.UNCHECKED_HASH)
+    path.write_text("import b\n")
+    assert bytecode._read_fresh_pyc(path, path.read_bytes()) is None
@@ -0,0 +1,73 @@
+import os
+import threading
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+from pyproject_indirect_import_detector.daemon import _Daemon, _decode_results, _encode_results
+
+from .conftest import WriteProject
+
+PYPROJECT = """
+[tool.poetry]
+name = "foo"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+"""
+
+
+@pytest.fixture
+def project(write_project: WriteProject) -> Path:
+    return write_project({"pyproject.toml": PYPROJECT, "foo/__init__.py": "import os\n"})
+
+
+def summary(daemon: _Daemon) -> List[Tuple[str, List[str]]]:
+    return [(path.as_posix(), [e._module for e in es]) for (path, es) in daemon.results()]
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_daemon_rechecks_changed_files(project: Path, polling: bool) -> None:
+    daemon = _Daemon(Path(), polling=polling)
+    assert summary(daemon) == [("foo/__init__.py", [])]
+    n = daemon._state.n_checked
+
+    (project / "foo" / "__init__.py").write_text("import os\nimport yaml\n")
+    # Make sure that mtime changes even on coarse filesystems.
+    os.utime(project / "foo" / "__init__.py", ns=(0, 0))
+    assert summary(daemon) == [("foo/__init__.py", ["yaml"])]
+    assert daemon._state.n_checked == n + 1
+
+    (project / "foo" / "bar.py").write_text("import toml\n")
+    assert summary(daemon) == [("foo/__init__.py", ["yaml"]), ("foo/bar.py", ["toml"])]
+
+    (project / "foo" / "bar.py").unlink()
+    assert summary(daemon) == [("foo/__init__.py", ["yaml"])]
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_daemon_results_while_waiting(project: Path, polling: bool) -> None:
+    daemon = _Daemon(Path(), polling=polling)
+    # As the serve loop, which waits for changes in another thread.
+    thread = threading.Thread(target=daemon.wait_and_update, args=(0.5,))
+    thread.start()
+    try:
+        (project / "foo" / "__init__.py").write_text("import os\nimport yaml\n")
+        os.utime(project / "foo" / "__init__.py", ns=(0, 0))
+        # Changes are not taken by the waiting thread without applying them.
+        assert summary(daemon) == [("foo/__init__.py", ["yaml"])]
+    finally:
+        thread.join()
+    assert summary(daemon) == [("foo/__init__.py", ["yaml"])]
+
+
+def test_encode_results(project: Path) -> None:
+    (project / "foo" / "bar.py").write_text("import toml\nimport tomllib\n")
+    daemon = _Daemon(Path(), polling=True)
+    xs = daemon.results()
+    # Hints are kept, so that clients show them.
+    (toml, tomllib) = xs[1][1]
+    assert toml._provider is not None
+    tomllib._python_versions = ["3.9", "3.10"]
+    ys = _decode_results(_encode_results(xs))
+    assert [(p, [str(e) for e in es]) for (p, es) in xs] == [(p, [str(e) for e in es]) for (p, es) in ys]
@@ -1,8 +1,10 @@
 import ast
+import sys
 from pathlib import Path
-from typing import List
+from typing import Any, List
 
-from pyproject_indirect_import_detector.detector import _Detector, _IllegalImportDetected
+import pytest
+from pyproject_indirect_import_detector.detector import _Detector, _IllegalImportDetected, _ImportCollector, _validate_imports
 
 
 def aux_detect(s: str, module_to_proj=None) -> List[_IllegalImportDetected]:
@@ -94,3 +96,82 @@ def test_detector_import() -> None:
     res = aux_detect(s, {"m": "m"})
     assert len(res) == 1
     assert res[0]._module == "n"
+
+
+def test_detector_nested_statements() -> None:
+    s = """
+import a
+try:
+    import b
+except ImportError:
+    import c
+else:
+    import d
+finally:
+    import e
+with x:
+    class C:
+        def f(self):
+            from . import z
+            if True:
+                import f
+            else:
+                import g
+for _ in []:
+    pass
+else:
+    import i
+f = lambda: __import__("j")
+"""
+    res = aux_detect(s)
+    assert [(e._lineno, e._module) for e in res] == [
+        (2, "a"),
+        (4, "b"),
+        (6, "c"),
+        (8, "d"),
+        (10, "e"),
+        (16, "f"),
+        (18, "g"),
+        (22, "i"),
+    ]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="`match` is since python 3.10")
+def test_detector_match_statement() -> None:
+    s = """
+match x:
+    case 1:
+        import h
+    case _:
+        if True:
+            import i
+"""
+    res = aux_detect(s)
+    assert [(e._lineno, e._module) for e in res] == [(4, "h"), (7, "i")]
+
+
+def test_collector_module_of_import_from() -> None:
+    def aux(s: str) -> List[str]:
+        return [imp.module for imp in _ImportCollector(ast.parse(s)).collect()]
+
+    assert aux("from a.b import c") == ["a.b"]
+    assert aux("from .. import c") == [".."]
+    assert aux("from . module import c") == [".module"]
+    assert aux("from \\\n    a import c") == ["a"]
+
+
+def test_validate_imports_builds_only_illegal_lines() -> None:
+    class Lines(List[str]):
+        accessed: List[int]
+
+        def __getitem__(self, i: Any) -> Any:
+            self.accessed.append(i.start)
+            return super().__getitem__(i)
+
+    s = "import os\nimport yaml\nfrom toml import loads\n"
+    source = Lines(s.split("\n"))
+    source.accessed = []
+    imports = _ImportCollector(ast.parse(s)).collect()
+    errs = _validate_imports({"os": "<std>", "toml": "toml"}, Path(), imports, source)
+    assert [(e._lineno, e._line) for e in errs] == [(2, "import yaml")]
+    assert source.accessed == [1]
@@ -0,0 +1,51 @@
+import os
+import shutil
+from pathlib import Path
+
+from pyproject_indirect_import_detector.dist_cache import _DistCache, _warm
+from pyproject_indirect_import_detector.dist_index import _DistIndex
+
+from .conftest import write_dist
+
+
+def test_dist_cache(tmp_path: Path) -> None:
+    site = tmp_path / "site-packages"
+    cache_dir = tmp_path / "cache"
+    foo = write_dist(site, "foo", ["foo"])
+    write_dist(site, "bar", ["bar"], version="2.0")
+
+    cache = _DistCache.load(cache_dir)
+    assert _DistIndex.scan([str(site)], cache).modules("foo") == ["foo"]
+    assert (cache.hits, cache.misses) == (0, 1)
+    cache.save()
+
+    # Another run reads the cache instead of the distribution.
+    (foo / "top_level.txt").write_text("not_read\n")
+    os.utime(foo, ns=(foo.stat().st_atime_ns, foo.stat().st_mtime_ns))
+    cache = _DistCache.load(cache_dir)
+    assert _DistIndex.scan([str(site)], cache).modules("foo") == ["foo"]
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # Reinstalled.
+    os.utime(foo, ns=(0, foo.stat().st_mtime_ns + 1_000_000_000))
+    cache = _DistCache.load(cache_dir)
+    assert _DistIndex.scan([str(site)], cache).modules("foo") == ["not_read"]
+    cache.save()
+
+    # Concurrent runs append their own entries.  A broken line is ignored.
+    cache1 = _DistCache.load(cache_dir)
+    cache2 = _DistCache.load(cache_dir)
+    _DistIndex.scan([str(site)], cache1).modules("bar")
+    with open(cache_dir / "dists.jsonl", "a") as f:
+        f.write('{"v":1,"name":"ba')
+    cache1.save()
+    cache2.save()
+    cache = _DistCache.load(cache_dir)
+    assert cache.n_lines == 3
+    assert _warm(cache, [str(site)]) == 2
+    assert (cache.hits, cache.misses) == (2, 0)
+
+    # Entries of the old install of `foo` and removed `bar` are pruned.
+    shutil.rmtree(site / "bar-2.0.dist-info")
+    assert cache.prune() == 2
+    assert _DistCache.load(cache_dir).n_lines == 1
@@ -1,6 +1,9 @@
 from importlib.metadata import Distribution
+from pathlib import Path
 
-from pyproject_indirect_import_detector.domain import _get_modules_by_files, _get_modules_by_toplevel_txt
+from pyproject_indirect_import_detector.dist_index import _DistIndex
+
+from .conftest import write_dist
 
 PACKAGES = [
     "pysen",
@@ -11,10 +14,53 @@ PACKAGES = [
 ]
 
 
-def test_coherence_of_get_modules() -> None:
+def test_dist_index() -> None:
+    index = _DistIndex.scan()
     for package in PACKAGES:
-        dist = Distribution.from_name(package)
-        lhs = _get_modules_by_toplevel_txt(dist)
-        rhs = _get_modules_by_files(dist)
-        if lhs is not None:
-            assert set(lhs) == set(rhs)
+        files = Distribution.from_name(package).files
+        assert files is not None
+        # fmt: off
+        expected = set(path.parts[0].split(".")[0]
+                       for path in files
+                       if (path.parts[0] not in ("..", "__pycache__"))
+                       and not path.parts[0].endswith((".dist-info", ".egg-info")))
+        assert set(m.split(".")[0] for m in index.modules(package)) == expected
+    # Lookups are normalized as PEP 503.
+    assert index.modules("Stdlib_List") == index.modules("stdlib-list")
+
+
+def test_egg_info_without_top_level_txt(tmp_path: Path) -> None:
+    egg_info = tmp_path / "foo-1.0-py3.9.egg-info"
+    egg_info.mkdir()
+    (egg_info / "PKG-INFO").write_text("Name: foo\n")
+    (egg_info / "installed-files.txt").write_text("../foo/__init__.py\n../foo/bar.py\nPKG-INFO\n")
+    egg_info = tmp_path / "bar-1.0-py3.9.egg-info"
+    egg_info.mkdir()
+    (egg_info / "SOURCES.txt").write_text("bar.py\nsetup.py\n")
+    egg_info = tmp_path / "baz-1.0-py3.9.egg-info"
+    egg_info.mkdir()
+
+    index = _DistIndex.scan([str(tmp_path)])
+    assert index.modules("foo") == ["foo"]
+    assert index.modules("bar") == ["bar", "setup"]
+    assert index.modules("baz") == []
+
+
+def test_egg_info_of_single_file(tmp_path: Path) -> None:
+    (tmp_path / "foo-1.0-py3.9.egg-info").write_text("Metadata-Version: 1.0\nName: Foo\n")
+
+    index = _DistIndex.scan([str(tmp_path)])
+    assert index.names() == ["foo"]
+    assert index.modules("foo") == []
+    assert index.metadata("foo") == ("Foo", [])
+
+
+def test_record_sorted_by_pip_is_read_up_to_top_level(tmp_path: Path) -> None:
+    # `zz` is not in `top_level.txt`.  It is found only if `RECORD` is read to the end.
+    files = ["google/protobuf/__init__.py", "google/protobuf/message.py", "zz/__init__.py"]
+    metadata_dir = write_dist(tmp_path / "a", "protobuf", ["google"], files)
+    assert _DistIndex.scan([str(tmp_path / "a")]).modules("protobuf") == ["google.protobuf", "zz"]
+
+    metadata_dir = write_dist(tmp_path / "b", "protobuf", ["google"], files)
+    (metadata_dir / "INSTALLER").write_text("pip\n")
+    assert _DistIndex.scan([str(tmp_path / "b")]).modules("protobuf") == ["google.protobuf"]
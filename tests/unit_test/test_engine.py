@@ -0,0 +1,147 @@
+import os
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+from pyproject_indirect_import_detector import reader
+from pyproject_indirect_import_detector.cache import _FileCache
+from pyproject_indirect_import_detector.engine import _check_files, _requires_full_scan, _targets_of_paths
+from pyproject_indirect_import_detector.pyproject import _PyProject
+
+from .conftest import WriteProject
+
+
+def modules_of(res: List[Tuple[Path, list]]) -> List[Tuple[str, List[str]]]:
+    return [(p.name, [e._module for e in es]) for (p, es) in res]
+
+
+def test_check_files_parallel_keeps_order(tmp_path: Path) -> None:
+    targets = []
+    for i in range(8):
+        path = tmp_path / f"m{i}.py"
+        # Vary sizes so that the largest-first schedule differs from the given order.
+        path.write_text("import os\n" + "import x\n" * i)
+        targets.append((path, ("main",)))
+    scope_to_module_to_proj = {"main": {"os": "<std>"}}
+
+    serial = _check_files(scope_to_module_to_proj, targets, 1).unwrap()
+    parallel = _check_files(scope_to_module_to_proj, targets, 4).unwrap()
+
+    assert [p for (p, _) in parallel] == [p for (p, _) in targets]
+    assert [[(e._lineno, e._module) for e in es] for (_, es) in parallel] == [
+        [(e._lineno, e._module) for e in es] for (_, es) in serial
+    ]
+
+
+def test_check_files_scopes(tmp_path: Path) -> None:
+    a = tmp_path / "a.py"
+    a.write_text("import os\nimport x\nimport y\n")
+    scope_to_module_to_proj = {
+        "main": {"os": "<std>"},
+        "dev": {"os": "<std>", "x": "x"},
+    }
+
+    res = _check_files(scope_to_module_to_proj, [(a, ("dev",))], 1).unwrap()
+    assert modules_of(res) == [("a.py", ["y"])]
+
+    # An import illegal in several scopes is reported once.
+    res = _check_files(scope_to_module_to_proj, [(a, ("dev", "main"))], 1).unwrap()
+    assert modules_of(res) == [("a.py", ["x", "y"])]
+
+
+def test_check_files_cache(tmp_path: Path) -> None:
+    a = tmp_path / "a.py"
+    b = tmp_path / "b.py"
+    a.write_text("import os\nimport x\n")
+    b.write_text("import y\n")
+    scope_to_module_to_proj = {"main": {"os": "<std>"}}
+    targets = [(a, ("main",)), (b, ("main",))]
+    cache_dir = tmp_path / "cache"
+
+    def run() -> Tuple[List[Tuple[str, List[str]]], _FileCache]:
+        cache = _FileCache.load(cache_dir)
+        res = _check_files(scope_to_module_to_proj, targets, 1, cache).unwrap()
+        cache.save()
+        return (modules_of(res), cache)
+
+    (res, cache) = run()
+    assert res == [("a.py", ["x"]), ("b.py", ["y"])]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    (res, cache) = run()
+    assert res == [("a.py", ["x"]), ("b.py", ["y"])]
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert (cache.verdict_hits, cache.verdict_misses) == (2, 0)
+
+    # Only the modified file is parsed again.
+    b.write_text("import os\nimport z\n")
+    (res, cache) = run()
+    assert res == [("a.py", ["x"]), ("b.py", ["z"])]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Entries for deleted files are evicted.
+    b.unlink()
+    cache = _FileCache.load(cache_dir)
+    cache.lookup_imports(a)
+    cache.save()
+    assert list(_FileCache.load(cache_dir)._entries) == [str(a)]
+
+
+def test_check_files_cache_reads_only_misses(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    paths = [tmp_path / f"{i}.py" for i in range(40)]
+    for path in paths:
+        path.write_text("import os\n")
+    targets = [(path, ("main",)) for path in paths]
+    cache_dir = tmp_path / "cache"
+
+    read = []
+    original = reader._read_bytes
+
+    def read_bytes(path: Path) -> bytes:
+        read.append(path)
+        return original(path)
+
+    monkeypatch.setattr(reader, "_read_bytes", read_bytes)
+
+    def run() -> None:
+        read.clear()
+        cache = _FileCache.load(cache_dir)
+        # With prefetching by default.
+        _check_files({"main": {"os": "<std>"}}, targets, 1, cache).unwrap()
+        cache.save()
+
+    run()
+    assert sorted(read) == sorted(paths)
+    run()
+    assert read == []
+    paths[3].write_text("import os\nimport os.path\n")
+    run()
+    assert read == [paths[3]]
+
+    # A file whose stat alone changed is read once, to be both hashed and parsed.  Its verdicts are kept.
+    verdicts = _FileCache.load(cache_dir)._entries[str(paths[5])]["verdicts"]
+    os.utime(paths[5], ns=(0, 0))
+    run()
+    assert read == [paths[5]]
+    assert _FileCache.load(cache_dir)._entries[str(paths[5])]["verdicts"] == verdicts
+
+
+def test_targets_of_paths(write_project: WriteProject) -> None:
+    files = ["foo/__init__.py", "foo/a.py", "foo/__pycache__/b.py", "tests/test_a.py", "docs/conf.py"]
+    pyproject_toml = '[tool.poetry]\nname = "foo"\n\n[tool.poetry.dependencies]\npython = "^3.9"\n'
+    root = write_project({"pyproject.toml": pyproject_toml, **{f: "" for f in files}})
+    pyproject = _PyProject.load(Path()).unwrap()
+    paths = [
+        Path("tests/test_a.py"),
+        root / "foo" / "a.py",
+        Path("./foo/a.py"),
+        Path("foo/__pycache__/b.py"),
+        Path("docs/conf.py"),
+        Path("foo/deleted.py"),
+        Path("README.md"),
+    ]
+    targets = _targets_of_paths(pyproject, pyproject.scopes(), paths)
+
+    assert targets == [(Path("foo/a.py"), ("main",)), (Path("tests/test_a.py"), ("dev",))]
+    assert _requires_full_scan(pyproject, [Path("foo/a.py"), Path("./pyproject.toml")])
+    assert not _requires_full_scan(pyproject, [Path("foo/a.py")])
@@ -0,0 +1,51 @@
+import json
+from io import StringIO
+from pathlib import Path
+
+from pyproject_indirect_import_detector.detector import _IllegalImportDetected
+from pyproject_indirect_import_detector.dist_index import _DistIndex
+from pyproject_indirect_import_detector.explain import _Explainer, _Provider
+from pyproject_indirect_import_detector.reporters import _make_reporter, _write_report
+
+from .conftest import write_dist
+
+
+def _index(tmp_path: Path) -> _DistIndex:
+    # Only headers are read.
+    not_header = "Requires-Dist: not-a-header\n"
+    write_dist(tmp_path, "foo", ["foo"], requires=["Bar-Lib (>=1.0)", "extra-only ; extra == 'test'"], description=not_header)
+    write_dist(tmp_path, "Bar-Lib", ["bar"], requires=["PyYAML", "foo"])
+    write_dist(tmp_path, "PyYAML", ["_yaml", "yaml"])
+    write_dist(tmp_path, "ruamel-yaml", ["yaml"])
+    write_dist(tmp_path, "extra-only", ["extra"])
+    write_dist(tmp_path, "qux", ["qux"])
+    return _DistIndex.scan([str(tmp_path)])
+
+
+def test_explainer(tmp_path: Path) -> None:
+    explainer = _Explainer(_index(tmp_path), ["foo", "qux"])
+    # The reachable one wins over `ruamel-yaml`.  Requirements cycle, and extras are not followed.  Names are normalized.
+    assert explainer.provider("yaml") == _Provider("pyyaml", ["foo", "bar-lib", "pyyaml"])
+    assert explainer.provider("extra") == _Provider("extra-only", [])
+    assert explainer.provider("qux") == _Provider("qux", ["qux"])
+    assert explainer.provider("missing") is None
+
+    es = [_IllegalImportDetected(Path("a.py"), 1, "import yaml.loader", "yaml")]
+    explainer.annotate(es)
+    assert str(es[0]).splitlines()[-1] == "    Provided by pyyaml, installed as a dependency of foo -> bar-lib -> pyyaml."
+
+    out = StringIO()
+    _write_report(_make_reporter("jsonl", out, False), [(Path("a.py"), es)])
+    x = json.loads(out.getvalue().splitlines()[0])
+    assert (x["provider"], x["chain"]) == ("pyyaml", ["foo", "bar-lib", "pyyaml"])
+
+
+def test_explainer_is_linear(tmp_path: Path) -> None:
+    # A chain of 500 distributions.  Each is read once however many modules are looked up.
+    n = 500
+    for i in range(n):
+        write_dist(tmp_path, f"d{i}", [f"m{i}"], requires=[] if i == n - 1 else [f"d{i + 1}"])
+    index = _DistIndex.scan([str(tmp_path)])
+    explainer = _Explainer(index, ["d0"])
+    assert len(explainer.provider(f"m{n - 1}").chain) == n
+    assert all(explainer.provider(f"m{i}").chain[-1] == f"d{i}" for i in range(n))
@@ -0,0 +1,84 @@
+import io
+from pathlib import Path
+
+import pytest
+from pyproject_indirect_import_detector.detector import _Import
+from pyproject_indirect_import_detector.engine import _detect
+from pyproject_indirect_import_detector.inventory import _Inventory, _unused_dependencies
+from pyproject_indirect_import_detector.module_index import _build_module_to_proj
+from pyproject_indirect_import_detector.pyproject import _PyProject
+from pyproject_indirect_import_detector.reporters import _make_reporter
+
+from .conftest import WriteProject
+
+PYPROJECT = """
+[tool.poetry]
+name = "foo"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+toml = "*"
+result = "*"
+
+[tool.poetry.dev-dependencies]
+pytest = "*"
+stdlib-list = "*"
+
+[tool.pyproject-indirect-import-detector]
+ignore_unused = ["stdlib-list"]
+"""
+
+
+@pytest.fixture
+def project(write_project: WriteProject) -> Path:
+    return write_project(
+        {
+            "pyproject.toml": PYPROJECT,
+            "foo/__init__.py": "import os\nimport os.path\nimport toml\nfrom . import bar\n",
+            "foo/bar.py": "import toml.decoder\nimport yaml\n",
+            "tests/test_foo.py": "import foo\n",
+        }
+    )
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_inventory(project: Path, jobs: int) -> None:
+    pyproject = _PyProject.load(Path()).unwrap()
+    inventory = _Inventory()
+    res = _detect(pyproject, jobs, None, "ast", None, None, inventory)
+    assert sum(len(es) for (_, es) in res.unwrap()) == 1
+
+    unused = _unused_dependencies(pyproject, inventory)
+    assert unused == [("result", "dependencies"), ("pytest", "dev-dependencies")]
+    report = inventory.report(unused)
+    assert report["scopes"]["main"] == {
+        "files": 2,
+        "modules": {"os": 2, "toml": 2, "yaml": 1},
+        "projects": {"<std>": 2, "toml": 2},
+    }
+    assert report["scopes"]["dev"] == {"files": 1, "modules": {"foo": 1}, "projects": {"foo": 1}}
+    assert report["unused"] == [
+        {"project": "result", "table": "dependencies"},
+        {"project": "pytest", "table": "dev-dependencies"},
+    ]
+
+    out = io.StringIO()
+    reporter = _make_reporter("text", out, False)
+    reporter.unused(unused)
+    assert not reporter.finish()
+    assert out.getvalue().endswith(
+        "Unused dependencies:\n"
+        "    result is in dependencies, but not imported.\n"
+        "    pytest is in dev-dependencies, but not imported.\n\n"
+    )
+
+
+def test_inventory_of_namespace() -> None:
+    inventory = _Inventory()
+    imports = [_Import(1, 0, 1, 32, "google.cloud", ("storage",))]
+    imports += [_Import(2, 0, 2, 27, "google", ("protobuf",))]
+    inventory.add(("main",), imports)
+    inventory.module_maps = {
+        "main": _build_module_to_proj([("google-cloud-storage", ["google.cloud.storage"]), ("protobuf", ["google.protobuf"])])
+    }
+    assert inventory.used_projects() == {"google-cloud-storage", "protobuf"}
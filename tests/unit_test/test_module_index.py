@@ -0,0 +1,67 @@
+import site
+import sys
+from pathlib import Path
+
+import pytest
+from pyproject_indirect_import_detector.dist_index import _DistIndex, _search_paths_of, _sys_path_of_python
+from pyproject_indirect_import_detector.module_index import NAMESPACE, _build_module_to_proj, _missing_module
+
+from .conftest import write_dist
+from .test_detector import aux_detect
+
+
+def test_namespace_packages(tmp_path: Path) -> None:
+    write_dist(tmp_path, "protobuf", ["google"], ["google/protobuf/__init__.py", "google/protobuf/message.py"])
+    write_dist(tmp_path, "google-cloud-core", ["google"], ["google/cloud/client.py", "google/cloud/core/__init__.py"])
+    write_dist(tmp_path, "six", ["six"], ["six.py"])
+
+    index = _DistIndex.scan([str(tmp_path)])
+    assert index.modules("protobuf") == ["google.protobuf"]
+    assert index.modules("google-cloud-core") == ["google.cloud.client", "google.cloud.core"]
+    assert index.modules("six") == ["six"]
+
+    module_to_proj = _build_module_to_proj([("protobuf", index.modules("protobuf"))])
+    assert module_to_proj == {"google": NAMESPACE, "google.protobuf": "protobuf"}
+    assert _missing_module(module_to_proj, "google.protobuf.message") is None
+    assert _missing_module(module_to_proj, "google.cloud.storage") == "google.cloud"
+
+    res = aux_detect("import google.protobuf\nfrom google.cloud import storage\nfrom google import protobuf", module_to_proj)
+    assert [(e._lineno, e._module) for e in res] == [(2, "google.cloud")]
+
+
+def test_from_import_of_namespace() -> None:
+    module_to_proj = _build_module_to_proj([("google-cloud-core", ["google.cloud.client", "google.cloud.core"])])
+    s = "from google.cloud import core\nfrom google.cloud import client, storage\nfrom google.cloud.core import x\n"
+    res = aux_detect(s, module_to_proj)
+    assert [(e._lineno, e._module) for e in res] == [(2, "google.cloud.storage")]
+
+
+def test_regular_package_owns_submodules() -> None:
+    module_to_proj = _build_module_to_proj([("foo", ["foo"]), ("foo-plugin", ["foo.plugin"])])
+    # `foo` is not a namespace, so the deeper entry does not matter.
+    assert module_to_proj["foo"] == "foo"
+    assert _missing_module(module_to_proj, "foo.bar.baz") is None
+    assert _missing_module(module_to_proj, "bar.baz") == "bar"
+
+
+def test_search_paths_of_another_environment(tmp_path: Path) -> None:
+    write_dist(tmp_path, "six", ["six"], ["six.py"])
+    search_paths = _search_paths_of([tmp_path], None)
+    assert search_paths == [str(tmp_path)]
+    index = _DistIndex.scan(search_paths)
+    assert index.names() == ["six"]
+    assert index.modules("six") == ["six"]
+
+
+def test_sys_path_of_python(tmp_path: Path) -> None:
+    paths = _sys_path_of_python(sys.executable)
+    assert "" not in paths
+    assert set(site.getsitepackages()) <= set(paths)
+    assert _search_paths_of([tmp_path], sys.executable) == [str(tmp_path)] + paths
+
+    with pytest.raises(OSError):
+        _sys_path_of_python(str(tmp_path / "python"))
+    (tmp_path / "python").write_text("#!/bin/sh\nexit 3\n")
+    (tmp_path / "python").chmod(0o755)
+    with pytest.raises(OSError, match="exited with 3"):
+        _sys_path_of_python(str(tmp_path / "python"))
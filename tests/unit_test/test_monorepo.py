@@ -0,0 +1,83 @@
+from pathlib import Path
+
+from pyproject_indirect_import_detector.monorepo import (
+    EXIT_ERROR,
+    EXIT_NG,
+    EXIT_OK,
+    _check_projects,
+    _discover_projects,
+    _read_manifest,
+)
+
+from .conftest import write_dist
+
+PYPROJECT = """
+[tool.poetry]
+name = "{name}"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+toml = "*"
+"""
+
+
+def make_project(root: Path, name: str, source: str) -> Path:
+    root.mkdir(parents=True)
+    (root / "pyproject.toml").write_text(PYPROJECT.format(name=name))
+    (root / name).mkdir()
+    (root / name / "__init__.py").write_text(source)
+    return root
+
+
+def test_discover_projects(tmp_path: Path) -> None:
+    a = make_project(tmp_path / "a", "a", "import os\n")
+    b = make_project(tmp_path / "libs" / "b", "b", "import os\n")
+    make_project(tmp_path / "node_modules" / "c", "c", "import os\n")
+    (tmp_path / "tools").mkdir()
+    (tmp_path / "tools" / "pyproject.toml").write_text("[tool.black]\n")
+    assert _discover_projects(tmp_path) == [a, b]
+
+
+def test_read_manifest(tmp_path: Path) -> None:
+    (tmp_path / "projects.txt").write_text("# comment\na\n\nlibs/b\n")
+    assert _read_manifest(tmp_path / "projects.txt") == [tmp_path / "a", tmp_path / "libs" / "b"]
+
+
+def test_check_projects(tmp_path: Path) -> None:
+    ok = make_project(tmp_path / "ok", "ok", "import os\nimport toml\n")
+    ng = make_project(tmp_path / "ng", "ng", "import yaml\n")
+    broken = tmp_path / "broken"
+    broken.mkdir()
+    (broken / "pyproject.toml").write_text("[tool.poetry]\n")
+
+    for jobs in [1, 2]:
+        results = _check_projects([ok, ng, broken], jobs)
+        assert [r.root for r in results] == [ok, ng, broken]
+        assert [r.exit_code() for r in results] == [EXIT_OK, EXIT_NG, EXIT_ERROR]
+        [(_, es)] = results[1].result.unwrap()
+        assert [e._module for e in es] == ["yaml"]
+
+
+def test_check_projects_in_another_environment(tmp_path: Path) -> None:
+    # `toml` of the environment provides another module.
+    site = tmp_path / "site-packages"
+    write_dist(site, "toml", ["tomlx"], ["tomlx/__init__.py"])
+    p = make_project(tmp_path / "p", "p", "import toml\nimport tomlx\n")
+
+    [result] = _check_projects([p], 1, search_paths=[str(site)])
+    [(_, es)] = result.result.unwrap()
+    assert [e._module for e in es] == ["toml"]
+
+
+def test_check_projects_error_in_worker(tmp_path: Path) -> None:
+    ok = make_project(tmp_path / "ok", "ok", "import os\n")
+    unsupported = make_project(tmp_path / "unsupported", "unsupported", "import os\n")
+    pyproject_toml = unsupported / "pyproject.toml"
+    pyproject_toml.write_text(pyproject_toml.read_text().replace("^3.9", "^3.99"))
+
+    # The error is pickled from a worker with `jobs = 2`, and has the same message.
+    for jobs in [1, 2]:
+        results = _check_projects([ok, unsupported], jobs)
+        assert [r.exit_code() for r in results] == [EXIT_OK, EXIT_ERROR]
+        err = results[1].result.unwrap_err()
+        assert str(err) == 'pyproject.toml: "tool/poetry/dependencies/python": `stdlib-list` does not support 3.99'
@@ -0,0 +1,62 @@
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from pyproject_indirect_import_detector.engine import _detect
+from pyproject_indirect_import_detector.profiling import Profiler, ProfileHook, _profiling
+from pyproject_indirect_import_detector.pyproject import _PyProject
+
+from .conftest import WriteProject
+
+PYPROJECT = """
+[tool.poetry]
+name = "foo"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+toml = "*"
+"""
+
+
+@pytest.fixture
+def project(write_project: WriteProject) -> Path:
+    return write_project(
+        {"pyproject.toml": PYPROJECT, "foo/__init__.py": "import os\n", "foo/big.py": "import toml\n" + "x = 1\n" * 10000}
+    )
+
+
+class Hook(ProfileHook):
+    events: List[Any]
+
+    def __init__(self) -> None:
+        self.events = []
+
+    def on_file(self, path: Path, seconds: float) -> None:
+        self.events.append(("file", path))
+
+    def on_distribution(self, name: str, seconds: float) -> None:
+        self.events.append(("distribution", name))
+
+    def on_finish(self, report: dict[str, Any]) -> None:  # type: ignore  # reason: dict
+        self.events.append(("finish", report["files"]))
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_profile(project: Path, jobs: int) -> None:
+    hook = Hook()
+    profiler = Profiler([hook])
+    with _profiling(profiler):
+        _detect(_PyProject.load(Path()).unwrap(), jobs).unwrap()
+    report = profiler.report(top=1)
+
+    expected = {"resolve", "walk", "detect"} | ({"read", "parse", "collect"} if jobs == 1 else set())
+    assert set(report["phases"].keys()) == expected
+    assert report["files"] == 2
+    size = (project / "foo/big.py").stat().st_size
+    assert [(x["path"], x["size"]) for x in report["slowest_files"]] == [("foo/big.py", size)]
+    assert list(report["distributions"].keys()) == ["toml"]
+    assert report["peak_memory_bytes"] > 0
+
+    assert ("distribution", "toml") in hook.events
+    assert sorted(x for (k, x) in hook.events if k == "file") == [Path("foo/__init__.py"), Path("foo/big.py")]
+    assert hook.events[-1] == ("finish", 2)
@@ -145,3 +145,29 @@ def test_pyproject() -> None:
     pyproject = PyProject.test_load(s).unwrap()
     assert pyproject.dependencies(False) == ["result", "stdlib-list", "toml"]
     assert pyproject.dependencies(True) == ["pysen", "pytest", "result", "stdlib-list", "toml"]
+
+    # Groups.
+    s = dummy_toml(
+        """
+        [tool.poetry]
+        name = "foo"
+
+        [tool.poetry.dependencies]
+        python = "^3.9"
+        result = "^0.6.0"
+
+        [tool.poetry.group.test.dependencies]
+        pytest = "^5.2"
+
+        [tool.poetry.group.docs.dependencies]
+        sphinx = "^4.0"
+
+        [tool.pyproject-indirect-import-detector.group_dirs]
+        docs = ["docs"]
+        """
+    )
+    pyproject = PyProject.test_load(s).unwrap()
+    assert pyproject.dependencies(True) == ["pytest", "result", "sphinx"]
+    assert pyproject.scopes() == ["main", "dev", "group.docs"]
+    assert pyproject.scope_dependencies("main") == ["result"]
+    assert pyproject.scope_dependencies("group.docs") == ["result", "sphinx"]
@@ -0,0 +1,84 @@
+import ast
+import threading
+from pathlib import Path
+from typing import List
+
+import pytest
+from pyproject_indirect_import_detector import reader
+from pyproject_indirect_import_detector.detector import _extract_file, _Import, _ImportCollector
+from pyproject_indirect_import_detector.reader import _Lines, _Prefetcher, _prefetching, _read_source
+
+
+def by_str(s: str) -> List[_Import]:
+    return _ImportCollector(ast.parse(s)).collect()
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"import a\nfrom b import c\n",
+        b"import a\r\nfrom b import (\r\n    c,\r\n)\r\n",
+        b"import a\rimport b",
+        b"\xef\xbb\xbfimport a\n",
+        b"s = '\xc3\xa9'\nfrom b import c  # \xc3\xa9\n",
+        b"# -*- coding: latin-1 -*-\ns = '\xe9'\nfrom b import c  # \xe9\n",
+    ],
+)
+def test_extract_file_same_as_str(tmp_path: Path, data: bytes) -> None:
+    path = tmp_path / "a.py"
+    path.write_bytes(data)
+    with open(path, "r", encoding="latin-1" if b"latin-1" in data else "utf-8-sig") as f:
+        s = f.read()
+    imports = _extract_file(path, data)
+    assert imports == by_str(s)
+    assert list(_Lines(data)) == s.split("\n")
+    assert [imp.line(_Lines(data)) for imp in imports] == [imp.line(s.split("\n")) for imp in imports]
+
+
+def test_lines_index() -> None:
+    lines = _Lines(b"a\nb")
+    assert (lines[0], lines[-1], len(lines)) == ("a", "b", 2)
+    with pytest.raises(IndexError):
+        lines[2]
+
+
+def test_prefetcher_order_and_depth(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    paths = []
+    for i in range(20):
+        paths.append(tmp_path / f"{i}.py")
+        paths[-1].write_bytes(f"import m{i}\n".encode())
+
+    lock = threading.Lock()
+    read = []
+    original = reader._read_bytes
+
+    def read_bytes(path: Path) -> bytes:
+        with lock:
+            read.append(path)
+        return original(path)
+
+    monkeypatch.setattr(reader, "_read_bytes", read_bytes)
+    prefetcher = _Prefetcher(depth=3, threads=2)
+    try:
+        seen = []
+        # Skip some files as hits of the cache, which are not read ahead.
+        hits = set(paths[::3])
+        for (i, path) in enumerate(prefetcher.iter(paths, lambda x: None if x in hits else x)):
+            seen.append(path)
+            # Not more than the window is submitted.
+            assert len(prefetcher._futures) <= 4
+            if path not in hits:
+                assert prefetcher.read(path) == f"import m{i}\n".encode()
+        assert seen == paths
+        assert prefetcher._futures == {}
+        assert sorted(read) == sorted(set(paths) - hits)
+    finally:
+        prefetcher.close()
+
+
+def test_prefetching_inactive_by_zero(tmp_path: Path) -> None:
+    path = tmp_path / "a.py"
+    path.write_bytes(b"import a\n")
+    with _prefetching(0) as prefetcher:
+        assert prefetcher is None
+        assert _read_source(path, prefetcher) == b"import a\n"
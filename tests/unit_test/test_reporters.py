@@ -0,0 +1,81 @@
+import io
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import List, Tuple
+
+from pyproject_indirect_import_detector.detector import _IllegalImportDetected
+from pyproject_indirect_import_detector.reporters import _make_reporter, _write_report
+
+
+def results() -> List[Tuple[Path, List[_IllegalImportDetected]]]:
+    a = Path("foo/a.py")
+    b = Path("foo/b&c.py")
+    return [
+        (a, []),
+        (b, [_IllegalImportDetected(b, 1, "import yaml", "yaml"), _IllegalImportDetected(b, 3, "from x.y import <z>", "x")]),
+    ]
+
+
+def report(format_: str, verbose: bool = False) -> Tuple[bool, str]:
+    out = io.StringIO()
+    ok = _write_report(_make_reporter(format_, out, verbose), results())
+    return (ok, out.getvalue())
+
+
+def test_text() -> None:
+    (ok, s) = report("text", verbose=True)
+    assert not ok
+    assert s.startswith("Checking 2 files... ")
+    assert "foo/a.py\n" in s
+    assert s.count("is imported, but not in dependency.") == 2
+
+    out = io.StringIO()
+    assert _write_report(_make_reporter("text", out, False), [])
+
+
+def test_jsonl() -> None:
+    (ok, s) = report("jsonl")
+    assert not ok
+    xs = [json.loads(line) for line in s.splitlines()]
+    assert [(x["type"], x.get("line")) for x in xs] == [("violation", 1), ("violation", 3), ("summary", None)]
+    assert xs[-1] == {"type": "summary", "files": 2, "violations": 2, "ok": False}
+
+
+def test_sarif() -> None:
+    (_, s) = report("sarif")
+    [run] = json.loads(s)["runs"]
+    assert [r["locations"][0]["physicalLocation"]["region"]["startLine"] for r in run["results"]] == [1, 3]
+    assert run["results"][0]["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] == "foo/b%26c.py"
+    assert run["properties"] == {"files": 2, "violations": 2}
+
+    out = io.StringIO()
+    _write_report(_make_reporter("sarif", out, False), [])
+    assert json.loads(out.getvalue())["runs"][0]["results"] == []
+
+
+def test_junit() -> None:
+    (_, s) = report("junit")
+    suite = ET.fromstring(s).find("testsuite")
+    assert suite is not None
+    assert (suite.get("tests"), suite.get("failures")) == ("2", "1")
+    cases = suite.findall("testcase")
+    assert [c.get("name") for c in cases] == ["foo/a.py", "foo/b&c.py"]
+    failure = cases[1].find("failure")
+    assert failure is not None and "from x.y import <z>" in (failure.text or "")
+
+
+def test_summary() -> None:
+    p = Path("foo/c.py")
+    xs = results() + [(p, [_IllegalImportDetected(p, i, "import yaml", "yaml") for i in range(1, 6)])]
+
+    out = io.StringIO()
+    assert not _write_report(_make_reporter("jsonl", out, False, 2), xs)
+    ys = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(y["module"], y["count"], len(y["locations"])) for y in ys[:-1]] == [("yaml", 6, 2), ("x", 1, 1)]
+    assert ys[0]["locations"][0] == {"path": "foo/b&c.py", "line": 1, "source": "import yaml"}
+    assert ys[-1]["violations"] == 7
+
+    out = io.StringIO()
+    _write_report(_make_reporter("text", out, False, 2), xs)
+    assert "... and 4 more" in out.getvalue()
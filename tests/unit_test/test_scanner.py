@@ -0,0 +1,66 @@
+import ast
+from pathlib import Path
+from typing import List
+
+import pytest
+from pyproject_indirect_import_detector.detector import _Import, _ImportCollector, _read_file
+from pyproject_indirect_import_detector.scanner import _CannotScan, _scan_imports
+
+ROOT = Path(__file__).parent.parent.parent
+
+CASES = [
+    "",
+    "x = 1\n",
+    "import m\n",
+    "import m, n\n",
+    "import m.x as y, n.z\n",
+    "from module import name\n",
+    "from module.x import name\n",
+    "from . import name\n",
+    "from .module import name\n",
+    "from ..module.x import name\n",
+    "from ... import name\n",
+    "from .... import name\n",
+    "from m import (\n    a,\n    b,  # comment\n)\n",
+    "from m import a as x, b\n",
+    "from m import (a as x)\n",
+    "from m import *\n",
+    "from \\\n    module \\\n    import name # comment",
+    "def f():\\\n    from module  import x, y # comment",
+    "def f():\n    import a\n    if True:\n        from b import c\n",
+    "class A: import a\n",
+    "import a; import b\n",
+    "x = 1; from a import b; y = 2\n",
+    "def f():\n    yield from g()\n",
+    "try:\n    raise E from None\nexcept E:\n    import a\n",
+    's = "import x"\n# import y\n',
+    '"""\nimport z\n"""\nimport a\n',
+    "import a  # no trailing newline",
+    "from __future__ import annotations\nimport a\n",
+    "x = {'a': 1}\nimport a\n",
+    "async def f():\n    import a\n",
+    "if x:\n    pass\nelse:\n    import a\n",
+]
+
+
+def by_ast(s: str) -> List[_Import]:
+    return _ImportCollector(ast.parse(s)).collect()
+
+
+@pytest.mark.parametrize("s", CASES)
+def test_scanner_same_as_ast(s: str) -> None:
+    assert _scan_imports(s.encode()) == by_ast(s)
+
+
+def test_scanner_same_as_ast_on_this_repo() -> None:
+    for path in sorted(ROOT.glob("**/*.py")):
+        with open(path, "rb") as f:
+            data = f.read()
+        assert _scan_imports(data) == by_ast(_read_file(path)), path
+
+
+def test_scanner_cannot_scan() -> None:
+    with pytest.raises(_CannotScan):
+        _scan_imports(b"import (\n")
+    with pytest.raises(_CannotScan):
+        _scan_imports(b"from import x\n")
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# Cumulative import time of the command line in microseconds.  It was about 330ms with `pkg_resources`, and is about 100ms
+# without it on a developer machine.  The default leaves room for slow CI machines.  Set `IMPORTTIME_BUDGET_US` to change it.
+BUDGET_US = int(os.environ.get("IMPORTTIME_BUDGET_US", "250000"))
+
+# Not needed unless there is something to check, or only for some modes.
+LAZY_MODULES = [
+    "pkg_resources",
+    "toml",
+    "stdlib_list",
+    "termcolor",
+    "importlib.metadata",
+    "importlib.util",
+    "opcode",
+    "concurrent.futures.process",
+    "cProfile",
+    "hashlib",
+    "tempfile",
+    "tracemalloc",
+    "xml.sax.saxutils",
+    "pyproject_indirect_import_detector.api",
+    "pyproject_indirect_import_detector.cache",
+    "pyproject_indirect_import_detector.daemon",
+    "pyproject_indirect_import_detector.dist_cache",
+    "pyproject_indirect_import_detector.explain",
+    "pyproject_indirect_import_detector.inventory",
+    "pyproject_indirect_import_detector.monorepo",
+    "pyproject_indirect_import_detector.stdlib_matrix",
+    "pyproject_indirect_import_detector.vcs",
+    "pyproject_indirect_import_detector.wheelhouse",
+    "zipfile",
+]
+
+
+def importtime(module: str) -> Tuple[int, Dict[str, int]]:
+    """
+    Run `python -X importtime` and returns the cumulative time of `module` and the self time of each imported module.
+    """
+    p = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        text=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    total = None
+    modules = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        (self_, cumulative, name) = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(self_)
+        if name.strip() == module:
+            total = int(cumulative)
+    assert total is not None
+    return (total, modules)
+
+
+def test_lazy_imports() -> None:
+    (_, modules) = importtime("pyproject_indirect_import_detector.main")
+    assert [m for m in LAZY_MODULES if m in modules] == []
+
+
+def test_importtime_budget() -> None:
+    # The minimum of some runs, as the first run may compile bytecode and others may be noisy.
+    total = min(importtime("pyproject_indirect_import_detector.main")[0] for _ in range(3))
+    assert total <= BUDGET_US, f"import takes {total}us, more than budget {BUDGET_US}us"
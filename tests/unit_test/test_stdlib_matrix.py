@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from pyproject_indirect_import_detector.detector import _IllegalImportDetected
+from pyproject_indirect_import_detector.pyproject import _parse_python_versions
+from pyproject_indirect_import_detector.reporters import _provider_fields
+from pyproject_indirect_import_detector.stdlib_matrix import MATRIX_VERSIONS, _StdlibMatrix
+
+
+def test_matrix_tables() -> None:
+    matrix = _StdlibMatrix(MATRIX_VERSIONS)
+    assert "os" in matrix.common
+    assert "distutils" not in matrix.common
+    assert matrix.missing_in("tomllib") == ["3.8", "3.9", "3.10"]
+    assert matrix.missing_in("zoneinfo") == ["3.8"]
+    assert matrix.missing_in("imp") == ["3.12", "3.13"]
+    assert matrix.missing_in("telnetlib") == ["3.13"]
+    assert matrix.missing_in("yaml") == []
+
+
+def test_matrix_versions_sorted_and_unique() -> None:
+    matrix = _StdlibMatrix(["3.13", "3.9", "3.13"])
+    assert matrix.versions == ["3.9", "3.13"]
+    assert matrix.missing_in("distutils") == ["3.13"]
+
+
+def test_annotate() -> None:
+    es = [
+        _IllegalImportDetected(Path("a.py"), 1, "import distutils.core", "distutils"),
+        _IllegalImportDetected(Path("a.py"), 2, "import yaml", "yaml"),
+    ]
+    _StdlibMatrix(["3.11", "3.12"]).annotate(es)
+    assert es[0]._python_versions == ["3.12"]
+    assert "Not in stdlib of python 3.12." in str(es[0])
+    assert _provider_fields(es[0]) == {"python_versions": ["3.12"]}
+    assert es[1]._python_versions is None
+    assert _provider_fields(es[1]) == {}
+
+
+def test_parse_python_versions() -> None:
+    assert _parse_python_versions("^3.8", MATRIX_VERSIONS).unwrap() == MATRIX_VERSIONS
+    assert _parse_python_versions("^3.11", MATRIX_VERSIONS).unwrap() == ["3.11", "3.12", "3.13"]
+    assert _parse_python_versions("3.10.*", MATRIX_VERSIONS).unwrap() == ["3.10"]
+    assert _parse_python_versions("^2.7", MATRIX_VERSIONS).is_err()
+    assert _parse_python_versions("*", MATRIX_VERSIONS).is_err()
+    assert _parse_python_versions(">=3.8,<4", MATRIX_VERSIONS).unwrap() == MATRIX_VERSIONS
+    assert _parse_python_versions(">=3.9 <3.12", MATRIX_VERSIONS).unwrap() == ["3.9", "3.10", "3.11"]
+    assert _parse_python_versions(">=3.8,<3.11 || >=3.13", MATRIX_VERSIONS).unwrap() == ["3.8", "3.9", "3.10", "3.13"]
+    assert _parse_python_versions("~3.10", MATRIX_VERSIONS).unwrap() == ["3.10"]
+    assert _parse_python_versions("~=3.10", MATRIX_VERSIONS).unwrap() == ["3.10", "3.11", "3.12", "3.13"]
+    assert _parse_python_versions(">=3.8,<3.8", MATRIX_VERSIONS).is_err()
+    assert _parse_python_versions("python3", MATRIX_VERSIONS).is_err()
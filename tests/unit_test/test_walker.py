@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+from typing import List
+
+from pyproject_indirect_import_detector.walker import _IgnoreRules, _walk_python_files
+
+
+def touch(root: Path, rel: str, content: str = "") -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def walk(root: Path, top: str, ignore: _IgnoreRules) -> List[str]:
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        return [path.as_posix() for path in _walk_python_files(Path(top), ignore)]
+    finally:
+        os.chdir(cwd)
+
+
+def test_walk_order(tmp_path: Path) -> None:
+    for rel in ["a/b.py", "a/b/c.py", "a/a.py", "a/ba.py", "a/b/z/y.py", "a/c.txt", "a/_.py"]:
+        touch(tmp_path, rel)
+
+    got = walk(tmp_path, "a", _IgnoreRules(Path(), use_gitignore=False))
+    # fmt: off
+    expected = sorted(Path(d) / f
+                      for (d, _, fs) in os.walk(tmp_path / "a")
+                      for f in fs
+                      if f.endswith(".py"))
+    assert got == [path.relative_to(tmp_path).as_posix() for path in expected]
+
+
+def test_walk_prune(tmp_path: Path) -> None:
+    for rel in [
+        "src/foo/__init__.py",
+        "src/foo/__pycache__/x.py",
+        "src/foo/node_modules/x.py",
+        # Not pruned because it is a package.
+        "src/foo/build/__init__.py",
+        "src/foo/generated/x.py",
+        "src/foo/gen.py",
+        "src/foo/keep_gen.py",
+        "src/foo/fixtures/data/x.py",
+        "src/foo/sub/ignored_here.py",
+        "src/foo/sub/x.py",
+    ]:
+        touch(tmp_path, rel)
+    touch(tmp_path, ".gitignore", "# comment\n/src/foo/generated/\n*gen.py\n!keep_gen.py\n")
+    touch(tmp_path, "src/foo/sub/.gitignore", "ignored_here.py\n")
+
+    ignore = _IgnoreRules(Path(), exclude_globs=["src/**/fixtures"])
+    assert walk(tmp_path, "src/foo", ignore) == [
+        "src/foo/__init__.py",
+        "src/foo/build/__init__.py",
+        "src/foo/keep_gen.py",
+        "src/foo/sub/x.py",
+    ]
+
+    ignore = _IgnoreRules(Path(), use_gitignore=False)
+    assert "src/foo/generated/x.py" in walk(tmp_path, "src/foo", ignore)
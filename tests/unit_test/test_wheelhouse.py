@@ -0,0 +1,90 @@
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+from pyproject_indirect_import_detector import Session, Violation
+from pyproject_indirect_import_detector.exception import WheelNotFoundError
+from pyproject_indirect_import_detector.wheelhouse import _WheelIndex
+
+from .conftest import WriteProject
+
+PYPROJECT = """
+[tool.poetry]
+name = "foo"
+
+[tool.poetry.dependencies]
+python = "^3.9"
+fake-yaml = "*"
+fake-protobuf = "*"
+"""
+
+POETRY_LOCK = """
+[[package]]
+name = "fake-yaml"
+version = "5.4.1"
+
+[[package]]
+name = "fake-protobuf"
+version = "3.17.0"
+
+[[package]]
+name = "fake-unbuilt"
+version = "1.0"
+"""
+
+
+def _write_wheel(path: Path, files: Dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w") as z:
+        for (name, text) in files.items():
+            z.writestr(name, text)
+
+
+@pytest.fixture
+def project(write_project: WriteProject) -> Path:
+    root = write_project(
+        {
+            "pyproject.toml": PYPROJECT,
+            "poetry.lock": POETRY_LOCK,
+            "foo/__init__.py": "import fake_yaml\nimport google.protobuf\nimport google.cloud\n",
+        }
+    )
+    wheelhouse = root / "wheelhouse"
+    _write_wheel(
+        wheelhouse / "fake_yaml-5.4.1-cp39-cp39-manylinux1_x86_64.whl",
+        {"fake_yaml/__init__.py": "", "fake_yaml-5.4.1.dist-info/top_level.txt": "_fake_yaml\nfake_yaml\n"},
+    )
+    # Not the pinned version.
+    _write_wheel(
+        wheelhouse / "old" / "fake_yaml-5.3-py3-none-any.whl",
+        {"old_yaml/__init__.py": "", "fake_yaml-5.3.dist-info/top_level.txt": "old_yaml\n"},
+    )
+    # Nested as caches of poetry.  `google` is a namespace package.
+    _write_wheel(
+        wheelhouse / "ab" / "cd" / "fake_protobuf-3.17.0-py2.py3-none-any.whl",
+        {
+            "google/protobuf/__init__.py": "",
+            "fake_protobuf-3.17.0.dist-info/top_level.txt": "google\n",
+            "fake_protobuf-3.17.0.dist-info/RECORD": "",
+        },
+    )
+    return root
+
+
+def test_wheel_index(project: Path) -> None:
+    index = _WheelIndex.load(project / "poetry.lock", [project / "wheelhouse"])
+    assert index.names() == ["fake-protobuf", "fake-yaml"]
+    assert index.modules("Fake_YAML") == ["_fake_yaml", "fake_yaml"]
+    assert index.modules("fake-protobuf") == ["google.protobuf"]
+
+    with pytest.raises(WheelNotFoundError, match="fake-unbuilt==1.0 is locked"):
+        index.modules("fake-unbuilt")
+    with pytest.raises(WheelNotFoundError, match="not locked"):
+        index.modules("unknown")
+
+
+def test_session_with_wheel_index(project: Path) -> None:
+    index = _WheelIndex.load(project / "poetry.lock", [project / "wheelhouse"])
+    xs = Session(index=index).check_paths()
+    assert xs[0].violations == [Violation(Path("foo/__init__.py"), 3, "import google.cloud", "google.cloud")]